@@ -0,0 +1,66 @@
+"""
+Micro-benchmark of the per-request auth path.
+
+Replays a stream of requests where a small set of active users sends most of the
+traffic (Zipf distributed token reuse, like mobile clients polling with a long lived
+token) and compares verifying the HS256 signature on every call with the verified
+token cache.
+
+Run from the API directory:
+    python -m benchmarks.auth_benchmark --requests 200000 --users 2000
+"""
+import argparse
+import random
+import time
+
+from starlette.requests import Request
+from utils.helpers import jwt_utils
+from utils.helpers.jwt_utils import JwtUtils
+from utils.helpers.lru_cache import LRUCache
+
+
+def build_requests(users: int, requests: int, skew: float, seed: int) -> list:
+    rng = random.Random(seed)
+    tokens = [JwtUtils.encode_token(user_id) for user_id in range(1, users + 1)]
+    weights = [1 / rank ** skew for rank in range(1, users + 1)]
+    picked = rng.choices(tokens, weights=weights, k=requests)
+
+    return [
+        Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+        for token in picked
+    ]
+
+
+def run(requests: list, cache_size: int) -> float:
+    # a fresh cache per run, a size of 0 turns it into "verify every time"
+    jwt_utils.verified_tokens = LRUCache(cache_size)
+
+    start = time.perf_counter()
+    for request in requests:
+        JwtUtils.auth_wrapper(request)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of token reuse")
+    parser.add_argument("--cache-size", type=int, default=jwt_utils.verified_tokens.max_entries)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    requests = build_requests(args.users, args.requests, args.skew, args.seed)
+
+    uncached = run(requests, cache_size=0)
+    cached = run(requests, cache_size=args.cache_size)
+    stats = jwt_utils.verified_tokens.stats()
+
+    print(f"{args.requests} requests from {args.users} users (skew {args.skew})")
+    print(f"verify every time: {uncached / args.requests * 1e6:8.2f} us/request")
+    print(f"verified cache:    {cached / args.requests * 1e6:8.2f} us/request  (hit ratio {stats['hit_ratio']})")
+    print(f"speedup:           {uncached / cached:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
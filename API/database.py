@@ -1,26 +1,248 @@
 import os
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from middleware.auth_middleware import get_auth_context
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.util import greenlet_spawn
+from utils.helpers.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from utils.helpers.read_your_writes import USE_PRIMARY, build_recent_writers
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# "sync" keeps the classic psycopg2 engine and runs every route in the threadpool.
+# "async" drives the same repositories over asyncpg on the event loop.
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+ASYNC_DB = DB_MODE == "async"
+
+# Pool sizing, size it against the number of uvicorn workers: each worker process owns its own pool
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+}
+
+
+def _to_async_url(url: str) -> str:
+    """
+    Rewrites a postgres url so it uses the asyncpg driver.
+    """
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+REPLICA_DATABASE_URL = os.getenv("DATABASE_REPLICA_URL")
+# after a write, the writer keeps reading from the primary for this many seconds
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+
+# session.info keys, USE_PRIMARY is defined next to RecentWriters so repositories can read it
+REPLICA_BIND = "replica_bind"
+HAS_WRITTEN = "has_written"
+
+recent_writers = build_recent_writers(READ_YOUR_WRITES_SECONDS)
+# gunicorn and uvicorn read the number of worker processes from WEB_CONCURRENCY
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+if REPLICA_DATABASE_URL and WEB_CONCURRENCY > 1 and not recent_writers.shared:
+    raise RuntimeError(
+        "DATABASE_REPLICA_URL with several workers needs DB_READ_YOUR_WRITES_URL (redis), "
+        "a per process registry would let a writer's next request read the replica before it caught up."
+    )
+
+
+class RoutingSession(Session):
+    """
+    Session that sends plain SELECTs to the read replica when one is configured.
+    Flushes, DML, locking reads and every statement after the session wrote something
+    go to the primary, so a request always reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replica = self.info.get(REPLICA_BIND)
+        if (
+            replica is not None
+            and not self.info.get(USE_PRIMARY)
+            and not self._flushing
+            and clause is not None
+            and clause.is_select
+            and getattr(clause, "_for_update_arg", None) is None
+        ):
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _pin_to_primary_after_flush(session, flush_context):
+    session.info[USE_PRIMARY] = True
+    session.info[HAS_WRITTEN] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _pin_to_primary_on_dml(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[USE_PRIMARY] = True
+        orm_execute_state.session.info[HAS_WRITTEN] = True
+
+
+engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+replica_engine = None
+if REPLICA_DATABASE_URL:
+    replica_engine = create_engine(REPLICA_DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+    info={REPLICA_BIND: replica_engine},
+)
 Base = declarative_base()
 
-def get_db():
+async_engine = None
+async_replica_engine = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    async_engine = create_async_engine(
+        os.getenv("ASYNC_DATABASE_URL") or _to_async_url(DATABASE_URL),
+        poolclass=InstrumentedAsyncQueuePool,
+        **POOL_OPTIONS,
+    )
+    if REPLICA_DATABASE_URL:
+        async_replica_engine = create_async_engine(
+            os.getenv("ASYNC_DATABASE_REPLICA_URL") or _to_async_url(REPLICA_DATABASE_URL),
+            poolclass=InstrumentedAsyncQueuePool,
+            **POOL_OPTIONS,
+        )
+    AsyncSessionLocal = async_sessionmaker(
+        sync_session_class=RoutingSession,
+        autocommit=False,
+        autoflush=False,
+        bind=async_engine,
+        info={REPLICA_BIND: async_replica_engine.sync_engine if async_replica_engine else None},
+    )
+
+
+def get_pool_stats() -> dict:
+    """
+    Returns live pool statistics for every engine of this process.
+    """
+    engines = {
+        "sync": engine,
+        "sync_replica": replica_engine,
+        "async": async_engine,
+        "async_replica": async_replica_engine,
+    }
+    stats = {"mode": DB_MODE}
+    for name, current_engine in engines.items():
+        if current_engine is not None:
+            stats[name] = current_engine.pool.stats()
+
+    return stats
+
+
+def _writer_key(request: Request):
+    """
+    Identifies the caller for the read-your-writes window by user id, so every token
+    and device of the same user reads its own writes.
+    """
+    return get_auth_context(request).user_id
+
+
+def _start_session(db: Session, request: Request):
+    writer_key = _writer_key(request)
+    # without a replica every read is on the primary anyway, skip the lookup
+    if REPLICA_DATABASE_URL and recent_writers.is_recent(writer_key):
+        db.info[USE_PRIMARY] = True
+    return writer_key
+
+
+def _finish_session(db: Session, writer_key) -> None:
+    if db.info.get(HAS_WRITTEN):
+        recent_writers.mark(writer_key)
+
+
+def _get_sync_db(request: Request):
     db = SessionLocal()
+    writer_key = _start_session(db, request)
     try:
         yield db
+        _finish_session(db, writer_key)
         db.rollback()
         db.close()
-    
+
     except:
+        _finish_session(db, writer_key)
         db.rollback()
         db.close()
         raise
-    
\ No newline at end of file
+
+
+async def _get_async_db(request: Request):
+    """
+    Yields the sync facade of an AsyncSession. Repositories use it unchanged, as long as
+    they are called through run_db_call, which runs them inside SQLAlchemy's greenlet bridge.
+    """
+    async with AsyncSessionLocal() as db:
+        writer_key = _start_session(db.sync_session, request)
+        try:
+            yield db.sync_session
+        finally:
+            _finish_session(db.sync_session, writer_key)
+            await db.rollback()
+
+
+get_db = _get_async_db if ASYNC_DB else _get_sync_db
+
+
+async def run_db_call(fn, *args, **kwargs):
+    """
+    Runs a blocking service call without tying up the event loop.
+
+    In sync mode the call goes to the threadpool, like a plain def route would.
+    In async mode it runs in a greenlet on the event loop, so every database round trip
+    is awaited on asyncpg and no worker thread is held while Postgres answers.
+    The session yielded by get_db must then only be used inside run_db_call or UnitOfWork.run:
+    a query, flush or lazy load of a relationship anywhere else (e.g. directly in a route body
+    or while serializing the response) raises MissingGreenlet. Services return plain data or
+    pydantic models for that reason.
+    For the same reason a service must not do CPU heavy work in async mode, it would stall
+    every other request of the worker: wrap it in utils.helpers.offload.run_cpu_bound, as
+    PasswordUtil does for bcrypt.
+    """
+    if ASYNC_DB:
+        return await greenlet_spawn(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, *args, **kwargs)
+
+
+class UnitOfWork:
+    """
+    Request scoped unit of work. Repositories only flush, the whole request is committed
+    once by run(), so multi-step operations are atomic and pay a single commit.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _run_and_commit(self, fn, *args, **kwargs):
+        try:
+            result = fn(*args, **kwargs)
+            self.db.commit()
+        except:
+            self.db.rollback()
+            raise
+
+        return result
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Runs a write operation and commits it before the response is sent.
+        """
+        return await run_db_call(self._run_and_commit, fn, *args, **kwargs)
@@ -1,5 +1,6 @@
-from database import get_db
-from fastapi import Depends
+from database import UnitOfWork, get_db
+from fastapi import Depends, Request
+from middleware.auth_middleware import get_auth_context
 from repositories.category_repository import CategoryRepository, ICategoryRepository
 from repositories.expense_payment_repository import (
     ExpensePaymentRepository,
@@ -7,8 +8,27 @@ from repositories.expense_payment_repository import (
 )
 from repositories.expense_repository import ExpenseRepository, IExpenseRepository
 from repositories.group_log_repository import GroupLogRepository, IGroupLogRepository
+from repositories.group_member_total_repository import (
+    GroupMemberTotalRepository,
+    IGroupMemberTotalRepository,
+)
 from repositories.group_repository import GroupRepository, IGroupRepository
-from repositories.user_group_repository import IUserGroupRepository, UserGroupRepository
+from repositories.receipt_job_repository import (
+    IReceiptJobRepository,
+    ReceiptJobRepository,
+)
+from repositories.resource_version_repository import (
+    IResourceVersionRepository,
+    ResourceVersionRepository,
+)
+from repositories.user_group_repository import (
+    CachedUserGroupRepository,
+    IUserGroupRepository,
+)
+from repositories.user_monthly_spend_repository import (
+    IUserMonthlySpendRepository,
+    UserMonthlySpendRepository,
+)
 from repositories.user_repository import IUserRepository, UserRepository
 from services.category_service import CategoryService, ICategoryService
 from services.expense_payment_service import (
@@ -18,10 +38,39 @@ from services.expense_payment_service import (
 from services.expense_service import ExpenseService, IExpenseService
 from services.group_log_service import GroupLogService, IGroupLogService
 from services.group_service import GroupService, IGroupService
+from services.receipt_job_service import IReceiptJobService, ReceiptJobService
 from services.receipt_service import IReceiptService, ReceiptService
+from services.resource_version_service import (
+    IResourceVersionService,
+    ResourceVersionService,
+)
 from services.user_group_service import IUserGroupService, UserGroupService
 from services.user_service import IUserService, UserService
 from sqlalchemy.orm import Session
+from utils.helpers.category_cache import category_cache
+from utils.helpers.invite_qr import INVITE_QR_PRERENDER, invite_qr_cache
+from utils.helpers.keyword_classifier import (
+    RECEIPT_LOCAL_CLASSIFIER,
+    keyword_classifier_cache,
+)
+from utils.helpers.membership_cache import membership_cache
+from utils.helpers.model_client import receipt_model_client
+from utils.helpers.prompt_cache import RECEIPT_PROMPT_CACHE, prompt_context_cache
+from utils.helpers.receipt_cache import receipt_result_cache
+from utils.helpers.receipt_image import receipt_image_preprocessor
+
+# Get authenticated user
+
+def get_current_user_id(request: Request) -> int:
+    """
+    Returns the authenticated user id, verified once per request by AuthMiddleware.
+    """
+    return get_auth_context(request).require_user_id()
+
+# Get unit of work
+
+def get_unit_of_work(db: Session = Depends(get_db)) -> UnitOfWork:
+    return UnitOfWork(db)
 
 # Get repositories
 
@@ -35,7 +84,7 @@ def get_expense_repository(db: Session = Depends(get_db)) -> IExpenseRepository:
     return ExpenseRepository(db)
 
 def get_user_group_repository(db: Session = Depends(get_db)) -> IUserGroupRepository:
-    return UserGroupRepository(db)
+    return CachedUserGroupRepository(db, membership_cache)
 
 def get_category_repository(db: Session = Depends(get_db)) -> ICategoryRepository:
     return CategoryRepository(db)
@@ -46,21 +95,42 @@ def get_group_log_repository(db: Session = Depends(get_db)) -> IGroupLogReposito
 def get_expense_payment_repository(db: Session = Depends(get_db)) -> IExpensePaymentRepository:
     return ExpensePaymentRepository(db)
 
+def get_group_member_total_repository(db: Session = Depends(get_db)) -> IGroupMemberTotalRepository:
+    return GroupMemberTotalRepository(db)
+
+def get_user_monthly_spend_repository(db: Session = Depends(get_db)) -> IUserMonthlySpendRepository:
+    return UserMonthlySpendRepository(db)
+
+def get_receipt_job_repository(db: Session = Depends(get_db)) -> IReceiptJobRepository:
+    return ReceiptJobRepository(db)
+
+def get_resource_version_repository(db: Session = Depends(get_db)) -> IResourceVersionRepository:
+    return ResourceVersionRepository(db)
+
 # Get services
 
-def get_user_service(repo: IUserRepository = Depends(get_user_repository)) -> IUserService:
-    return UserService(repo)
+def get_user_service(
+    repo: IUserRepository = Depends(get_user_repository),
+    spend_repository: IUserMonthlySpendRepository = Depends(get_user_monthly_spend_repository),
+    user_group_repository: IUserGroupRepository = Depends(get_user_group_repository)
+) -> IUserService:
+    return UserService(repo, spend_repository, user_group_repository)
 
 def get_expense_service(
     repo: IExpenseRepository = Depends(get_expense_repository),
     group_repo: IGroupRepository = Depends(get_group_repository),
     user_group_repository: IUserGroupRepository = Depends(get_user_group_repository),
-    category_repository: ICategoryRepository = Depends(get_category_repository)
+    category_repository: ICategoryRepository = Depends(get_category_repository),
+    totals_repository: IGroupMemberTotalRepository = Depends(get_group_member_total_repository),
+    spend_repository: IUserMonthlySpendRepository = Depends(get_user_monthly_spend_repository)
 ) -> IExpenseService:
-    return ExpenseService(repo, group_repo, user_group_repository, category_repository)
+    return ExpenseService(repo, group_repo, user_group_repository, category_repository, totals_repository, category_cache, spend_repository)
 
-def get_group_service(repo: IGroupRepository = Depends(get_group_repository)) -> IGroupService:
-    return GroupService(repo)
+def get_group_service(
+    repo: IGroupRepository = Depends(get_group_repository),
+    spend_repository: IUserMonthlySpendRepository = Depends(get_user_monthly_spend_repository)
+) -> IGroupService:
+    return GroupService(repo, invite_qr_cache, INVITE_QR_PRERENDER, spend_repository)
 
 def get_group_log_repository(db: Session = Depends(get_db)) -> IGroupLogRepository:
     return GroupLogRepository(db)
@@ -98,8 +168,28 @@ def get_expense_payment_service(
 ) -> IExpensePaymentService:
     return ExpensePaymentService(repo, expense_repository, group_repository, user_repository)
 
-def get_category_service(repo: ICategoryRepository = Depends(get_category_repository)) -> ICategoryService:
-    return CategoryService(repo)
+def get_category_service(
+    repo: ICategoryRepository = Depends(get_category_repository),
+    spend_repository: IUserMonthlySpendRepository = Depends(get_user_monthly_spend_repository)
+) -> ICategoryService:
+    return CategoryService(repo, category_cache, spend_repository)
 
 def get_receipt_service(category_repository: ICategoryRepository = Depends(get_category_repository)) -> IReceiptService:
-    return ReceiptService(category_repository)
\ No newline at end of file
+    # every collaborator is a process wide singleton, building the service per request costs nothing
+    return ReceiptService(
+        category_repository,
+        category_cache,
+        receipt_result_cache,
+        receipt_image_preprocessor,
+        receipt_model_client,
+        keyword_classifier_cache if RECEIPT_LOCAL_CLASSIFIER else None,
+        prompt_context_cache if RECEIPT_PROMPT_CACHE else None,
+    )
+
+def get_resource_version_service(
+    repo: IResourceVersionRepository = Depends(get_resource_version_repository)
+) -> IResourceVersionService:
+    return ResourceVersionService(repo)
+
+def get_receipt_job_service(repo: IReceiptJobRepository = Depends(get_receipt_job_repository)) -> IReceiptJobService:
+    return ReceiptJobService(repo)
@@ -1,19 +1,45 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from middleware.auth_middleware import AuthMiddleware
+from middleware.body_size_middleware import (
+    MAX_REQUEST_BYTES,
+    RECEIPT_REQUEST_MAX_BYTES,
+    BodySizeLimitMiddleware,
+)
 from routes.auth_routes import router as auth_router
 from routes.category_routes import router as category_router
 from routes.expense_payment_routes import router as expense_payment_router
 from routes.expense_routes import router as expense_router
 from routes.group_log_routes import router as group_log_router
 from routes.group_routes import router as group_router
+from routes.internal_routes import router as internal_router
 
 # ReceiptService specific
 from routes.receipt_routes import router as receipt_router
 from routes.user_routes import router as user_router
+from utils.helpers.model_client import receipt_model_client
+from utils.helpers.receipt_image import receipt_image_preprocessor
+from workers.receipt_job_worker import receipt_job_workers
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one model client and connection pool per process, shared by every request and job worker
+    receipt_model_client.open()
+    # receipt jobs are processed in the background of every API process
+    receipt_job_workers.start()
+    yield
+    await run_in_threadpool(receipt_job_workers.stop)
+    await run_in_threadpool(receipt_image_preprocessor.shutdown)
+    receipt_model_client.close()
+
 
-app = FastAPI(title="GitPushForce API")
+app = FastAPI(title="GitPushForce API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +50,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
+)
+
+# verifies the caller once per request, routes read it through dependencies.di.get_current_user_id
+app.add_middleware(AuthMiddleware)
+
+# refuses oversized bodies before the multipart parser spools them
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_size=MAX_REQUEST_BYTES,
+    limits={"/receipt": RECEIPT_REQUEST_MAX_BYTES},
 )
 
 app.include_router(expense_router, prefix="/expenses", tags=["Expenses"])
@@ -34,6 +71,7 @@ app.include_router(category_router, prefix="/categories", tags=["Categories"])
 app.include_router(expense_payment_router, prefix="/expenses_payments")
 app.include_router(group_log_router, prefix="/group_logs")
 app.include_router(receipt_router, prefix="/receipt")
+app.include_router(internal_router, prefix="/internal", include_in_schema=False)
 
 @app.get("/")
 def root():
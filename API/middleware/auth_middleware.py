@@ -0,0 +1,70 @@
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+from utils.helpers.jwt_utils import JwtUtils
+
+AUTH_STATE = "auth"
+
+
+class AuthContext:
+    """
+    Result of authenticating a request, built once and read by every dependency that needs the caller.
+    """
+
+    def __init__(self, user_id: Optional[int] = None, error: Optional[HTTPException] = None):
+        self.user_id = user_id
+        self.error = error
+
+    @property
+    def is_authenticated(self) -> bool:
+        return self.user_id is not None
+
+    def require_user_id(self) -> int:
+        """
+        Returns the caller's id or raises the 401 explaining why there is none.
+        """
+        if self.error is not None:
+            raise self.error
+        return self.user_id
+
+    @classmethod
+    def from_request(cls, request: Request) -> "AuthContext":
+        token = JwtUtils.get_token(request)
+        if not token:
+            return cls(error=HTTPException(status_code=401, detail="Missing authentication token."))
+
+        try:
+            return cls(user_id=JwtUtils.decode_token(token))
+        except HTTPException as error:
+            return cls(error=error)
+
+
+def get_auth_context(request: Request) -> AuthContext:
+    """
+    Returns the auth context of the request, building it if the middleware did not run.
+    """
+    context = getattr(request.state, AUTH_STATE, None)
+    if context is None:
+        context = AuthContext.from_request(request)
+        setattr(request.state, AUTH_STATE, context)
+
+    return context
+
+
+class AuthMiddleware:
+    """
+    Pure ASGI middleware that authenticates every HTTP request once and stores the
+    AuthContext on request.state. It never rejects a request itself, public routes
+    simply ignore the context and protected ones raise its error.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            request = Request(scope)
+            setattr(request.state, AUTH_STATE, AuthContext.from_request(request))
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,76 @@
+import os
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from utils.helpers.constants import STATUS_PAYLOAD_TOO_LARGE
+
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(1024 * 1024)))
+RECEIPT_REQUEST_MAX_BYTES = int(os.getenv("RECEIPT_REQUEST_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+class BodySizeLimitMiddleware:
+    """
+    Pure ASGI middleware that caps the size of request bodies, so an oversized upload is
+    refused before it is parsed or spooled. `limits` maps path prefixes to their own cap,
+    every other path gets `max_body_size`.
+
+    A Content-Length above the cap is answered with 413 right away. Bodies without one are
+    counted while the route reads them and cut off with the same 413 once they cross it.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int, limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.limits = sorted((limits or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _limit_for(self, path: str) -> int:
+        for prefix, limit in self.limits:
+            if path.startswith(prefix):
+                return limit
+        return self.max_body_size
+
+    def _too_large(self, limit: int) -> HTTPException:
+        return HTTPException(
+            status_code=STATUS_PAYLOAD_TOO_LARGE,
+            detail=f"Request body is larger than {limit} bytes.",
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self._limit_for(scope["path"])
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            error = self._too_large(limit)
+            await JSONResponse({"detail": error.detail}, status_code=error.status_code)(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI passes HTTPExceptions raised while reading the body through unchanged
+                    raise self._too_large(limit)
+            return message
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as error:
+            if response_started or error.status_code != STATUS_PAYLOAD_TOO_LARGE:
+                raise
+            await JSONResponse({"detail": error.detail}, status_code=error.status_code)(scope, receive, send)
@@ -1,7 +1,14 @@
 from models.base import Base
+from models.category import Category
 from models.expense import Expense
+from models.expense_payment import ExpensePayment
 from models.group import Group
+from models.group_log import GroupLog
+from models.group_member_total import GroupMemberTotal
+from models.receipt_job import ReceiptJob
+from models.resource_version import ResourceVersion, ResourceVersionChange
 from models.user import User
 from models.user_group import UserGroup
+from models.user_monthly_spend import UserMonthlySpend
 
-__all__ = ["Base", "User", "Expense", "Group", "UserGroup"]
+__all__ = ["Base", "User", "Expense", "Group", "UserGroup", "Category", "ExpensePayment", "GroupLog", "GroupMemberTotal", "ResourceVersion", "ResourceVersionChange", "UserMonthlySpend", "ReceiptJob"]
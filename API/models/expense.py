@@ -20,6 +20,8 @@ class Expense(Base):
     """
 
     __tablename__ = "expenses"
+    # server defaults come back in the RETURNING of the INSERT/UPDATE, no refresh round trip
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
@@ -5,6 +5,7 @@ from models.base import Base
 
 class ExpensePayment(Base):
     __tablename__ = "expense_payments"
+    __mapper_args__ = {"eager_defaults": True}
 
     expense_id = Column(Integer, ForeignKey("expenses.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
@@ -24,6 +24,7 @@ class Group(Base):
     """
 
     __tablename__ = "groups"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
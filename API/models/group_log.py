@@ -13,6 +13,7 @@ from models.base import Base
 
 class GroupLog(Base):
     __tablename__ = "group_logs"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True)
     group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=False)
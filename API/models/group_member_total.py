@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Float, ForeignKey, Integer
+
+from models.base import Base
+
+
+class GroupMemberTotal(Base):
+    """
+    Running total of what a member paid in a group, maintained on every expense write.
+    """
+
+    __tablename__ = "group_member_totals"
+
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_paid = Column(Float, nullable=False, server_default="0")
+    expense_count = Column(Integer, nullable=False, server_default="0")
@@ -0,0 +1,40 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    func,
+)
+from sqlalchemy.dialects.postgresql import JSONB
+
+from models.base import Base
+
+RECEIPT_JOB_QUEUED = "queued"
+RECEIPT_JOB_RUNNING = "running"
+RECEIPT_JOB_SUCCEEDED = "succeeded"
+RECEIPT_JOB_FAILED = "failed"
+
+
+class ReceiptJob(Base):
+    """
+    Receipt analysis waiting for, or processed by, the receipt job workers.
+    """
+
+    __tablename__ = "receipt_jobs"
+    __mapper_args__ = {"eager_defaults": True}
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String(16), nullable=False, server_default=RECEIPT_JOB_QUEUED)
+    image = Column(LargeBinary, nullable=True)
+    mime_type = Column(String(64), nullable=False)
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,27 @@
+from sqlalchemy import BigInteger, Column, String
+
+from models.base import Base
+
+
+class ResourceVersion(Base):
+    """
+    Folded version counter of a scope (e.g. 'expenses:group:4'). The scope's version is this counter
+    plus its resource_version_changes, only the fold writes here.
+    """
+
+    __tablename__ = "resource_versions"
+
+    scope = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False)
+
+
+class ResourceVersionChange(Base):
+    """
+    Change of a scope appended by the database triggers, insert only so concurrent writers never wait on each other.
+    """
+
+    __tablename__ = "resource_version_changes"
+
+    id = Column(BigInteger, primary_key=True)
+    scope = Column(String(64), nullable=False)
+    changes = Column(BigInteger, nullable=False, server_default="1")
@@ -9,6 +9,7 @@ class User(Base):
     User model. This is how the user is represented in the database schema.
     """
     __tablename__ = "users"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(255), nullable=False)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Date, Float, ForeignKey, Integer
+
+from models.base import Base
+
+
+class UserMonthlySpend(Base):
+    """
+    Running total of what a user spent in a calendar month (Europe/Bucharest), maintained on every expense write.
+    """
+
+    __tablename__ = "user_monthly_spend"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(Date, primary_key=True)
+    total_spent = Column(Float, nullable=False, server_default="0")
+    expense_count = Column(Integer, nullable=False, server_default="0")
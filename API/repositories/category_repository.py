@@ -1,15 +1,19 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Callable, List
 
 from models.category import Category
-from sqlalchemy import ARRAY, Text, asc, cast, desc, or_, select
+from sqlalchemy import ARRAY, Text, asc, cast, desc, insert, or_, select
 from sqlalchemy.orm import Session
+from utils.helpers.transaction_hooks import call_after_commit
 
 
 class ICategoryRepository(ABC):
     @abstractmethod
     def add(self, category: Category) -> int: ...
 
+    @abstractmethod
+    def add_many(self, rows: List[dict]) -> List[int]: ...
+
     @abstractmethod
     def get_all(self, sort_by: str, order: str) -> List[Category]: ...
 
@@ -19,16 +23,25 @@ class ICategoryRepository(ABC):
     @abstractmethod
     def delete(self, category_id: int) -> None: ...
 
+    @abstractmethod
+    def after_commit(self, callback: Callable[[], None]) -> None: ...
+
 class CategoryRepository(ICategoryRepository):
     def __init__(self, db: Session):
         self.db = db
 
     def add(self, category: Category) -> int:
         self.db.add(category)
-        self.db.commit()
-        self.db.refresh(category)
+        self.db.flush()
         return category.id
 
+    def add_many(self, rows: List[dict]) -> List[int]:
+        """
+        Method for inserting several categories in one statement, returns their ids in the order of rows.
+        """
+        statement = insert(Category).returning(Category.id, sort_by_parameter_order=True)
+        return list(self.db.scalars(statement, rows))
+
     def get_by_title_or_keywords(self, user_id: int, title: str, keywords: list[str]) -> bool:
         statement = (select(Category.id).where(
                 Category.user_id == user_id,
@@ -50,19 +63,20 @@ class CategoryRepository(ICategoryRepository):
         return list(self.db.scalars(statement))
 
     def get_by_id(self, category_id: int) -> Category:
-        statement = select(Category).where(Category.id == category_id)
-        return self.db.scalars(statement).first()
+        return self.db.get(Category, category_id)
 
     def update(self, category_id: int, fields: dict) -> int:
         category = self.get_by_id(category_id)
         for key, value in fields.items():
             if hasattr(category, key):
                 setattr(category, key, value)
-        self.db.commit()
-        self.db.refresh(category)
+        self.db.flush()
         return category_id
 
     def delete(self, category_id: int) -> None:
         category = self.get_by_id(category_id)
         self.db.delete(category)
-        self.db.commit()
+        self.db.flush()
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        call_after_commit(self.db, callback)
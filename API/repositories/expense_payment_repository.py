@@ -38,8 +38,7 @@ class ExpensePaymentRepository(IExpensePaymentRepository):
         """
         payment = ExpensePayment(expense_id=expense_id, user_id=user_id)
         self.db.add(payment)
-        self.db.commit()
-        self.db.refresh(payment)
+        self.db.flush()
         return payment
 
     def remove(self, expense_id: int, user_id: int) -> None:
@@ -49,17 +48,13 @@ class ExpensePaymentRepository(IExpensePaymentRepository):
         payment = self.get_payment(expense_id, user_id)
         if payment:
             self.db.delete(payment)
-            self.db.commit()
+            self.db.flush()
 
     def get_payment(self, expense_id: int, user_id: int) -> Optional[ExpensePayment]:
         """
         Retrieves a single payment record for a user-expense pair.
         """
-        stmt = select(ExpensePayment).where(
-            ExpensePayment.expense_id == expense_id,
-            ExpensePayment.user_id == user_id
-        )
-        return self.db.scalars(stmt).first()
+        return self.db.get(ExpensePayment, (expense_id, user_id))
 
     def get_all_by_expense(self, expense_id: int) -> List[ExpensePayment]:
         """
@@ -1,17 +1,30 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, List, Optional, Tuple
 
 from models.category import Category
 from models.expense import Expense
 from models.user_group import UserGroup
-from sqlalchemy import and_, asc, desc, or_, select
+from sqlalchemy import and_, any_, asc, desc, exists, func, insert, or_, select, tuple_
 from sqlalchemy.orm import Session
 
+# columns the listings can be sorted (and keyset paginated) by, anything else falls back to created_at
+EXPENSE_SORT_FIELDS = ("created_at", "amount", "title", "category_id", "id")
+
+
+def resolve_sort_field(sort_by: str) -> str:
+    """
+    Returns the expense field a listing is actually sorted by.
+    """
+    return sort_by if sort_by in EXPENSE_SORT_FIELDS else "created_at"
+
 
 class IExpenseRepository(ABC):
     @abstractmethod
     def add(self, expense: Expense) -> int: ...
+
+    @abstractmethod
+    def add_many(self, rows: List[dict]) -> List[int]: ...
     
     @abstractmethod
     def get_by_id(self, expense_id: int) -> Optional[Expense]: ...
@@ -27,7 +40,8 @@ class IExpenseRepository(ABC):
         max_price: Optional[float] = None,
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        cursor: Optional[Tuple[Any, int]] = None
     ) -> List[Expense]: ...
     
     @abstractmethod
@@ -43,7 +57,8 @@ class IExpenseRepository(ABC):
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
         category: Optional[str] = None,
-        group_ids: Optional[List[int]] = None
+        group_ids: Optional[List[int]] = None,
+        cursor: Optional[Tuple[Any, int]] = None
     ) -> List[Expense]: ...
     
     @abstractmethod
@@ -58,9 +73,13 @@ class IExpenseRepository(ABC):
         max_price: Optional[float] = None,
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        cursor: Optional[Tuple[Any, int]] = None
     ) -> List[Expense]: ... 
     
+    @abstractmethod
+    def get_group_statistics(self, group_id: int, user_id: int) -> Tuple[float, float, int]: ...
+    
     @abstractmethod
     def update(self, expense_id: int, fields: dict) -> int: ...
     
@@ -72,27 +91,85 @@ class ExpenseRepository(IExpenseRepository):
     def __init__(self, db: Session):
         self.db = db
 
-    def _resolve_category_ids(self, category_name: str) -> list[int]:
-        stmt = select(Category.id).where(Category.title.ilike(category_name))
-        return list(self.db.scalars(stmt))
+    def _filter(
+        self,
+        statement,
+        conditions: list,
+        min_price: Optional[float],
+        max_price: Optional[float],
+        date_from: Optional[datetime],
+        date_to: Optional[datetime],
+        category: Optional[str]
+    ):
+        """
+        Internal method for adding the common listing filters to a statement.
+        The category name is matched through a join, in the same round trip as the listing.
+        """
+        if min_price is not None:
+            conditions.append(Expense.amount >= min_price)
+        if max_price is not None:
+            conditions.append(Expense.amount <= max_price)
+        if date_from is not None:
+            conditions.append(Expense.created_at >= date_from)
+        if date_to is not None:
+            conditions.append(Expense.created_at <= date_to)
+        if category is not None:
+            statement = statement.join(Category, Category.id == Expense.category_id)
+            conditions.append(Category.title.ilike(category))
+
+        if conditions:
+            statement = statement.where(and_(*conditions))
+
+        return statement
+
+    def _paginate(self, statement, offset: int, limit: int, sort_by: str, order: str, cursor: Optional[Tuple[Any, int]]):
+        """
+        Internal method for applying sorting and pagination to an expense listing.
+        The id is always the tie breaker, so (sort column, id) is unique and a cursor can
+        seek straight past the last row it saw instead of counting OFFSET rows.
+        """
+        sort_field = resolve_sort_field(sort_by)
+        # titles are nullable, NULLs would never match a row comparison
+        sort_column = func.coalesce(Expense.title, "") if sort_field == "title" else getattr(Expense, sort_field)
+        descending = order.lower() == "desc"
+        direction = desc if descending else asc
+
+        keys = [sort_column, Expense.id] if sort_field != "id" else [Expense.id]
+        if cursor is not None:
+            last_value, last_id = cursor
+            values = [last_value, last_id] if sort_field != "id" else [last_id]
+            if descending:
+                statement = statement.where(tuple_(*keys) < tuple_(*values))
+            else:
+                statement = statement.where(tuple_(*keys) > tuple_(*values))
+        else:
+            statement = statement.offset(offset)
+
+        return statement.order_by(*[direction(key) for key in keys]).limit(limit)
 
     def add(self, expense: Expense) -> int:
         """
         Method for adding a new expense.
         """
         self.db.add(expense)
-        self.db.commit()
-        self.db.refresh(expense)
+        self.db.flush()
         
         return expense.id
 
+    def add_many(self, rows: List[dict]) -> List[int]:
+        """
+        Method for adding several expenses at once. The rows go out as one multi-row INSERT
+        ... RETURNING id instead of an INSERT per expense, the ids come back in the order of rows.
+        """
+        statement = insert(Expense).returning(Expense.id, sort_by_parameter_order=True)
+
+        return list(self.db.scalars(statement, rows))
+
     def get_by_id(self, expense_id: int) -> Optional[Expense]:
         """
         Method for retrieving expense by id.
         """
-        statement = select(Expense).where(Expense.id == expense_id)
-        
-        return self.db.scalars(statement).first()
+        return self.db.get(Expense, expense_id)
 
     def get_all(
         self, 
@@ -104,33 +181,17 @@ class ExpenseRepository(IExpenseRepository):
         max_price: Optional[float] = None,
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        cursor: Optional[Tuple[Any, int]] = None
     ) -> List[Expense]:
         """
         Method for retrieving expenses with pagination sorting and filtering.
         """
-        sort_column = getattr(Expense, sort_by, Expense.created_at)
-        sort_order = desc(sort_column) if order.lower() == "desc" else asc(sort_column)
-        
-        conditions = []
-        
-        if min_price is not None:
-            conditions.append(Expense.amount >= min_price)
-        if max_price is not None:
-            conditions.append(Expense.amount <= max_price)
-        if date_from is not None:
-            conditions.append(Expense.created_at >= date_from)
-        if date_to is not None:
-            conditions.append(Expense.created_at <= date_to)
-        if category is not None:
-            category_ids = self._resolve_category_ids(category)
-            if category_ids:
-                conditions.append(Expense.category_id.in_(category_ids))
-        
-        statement = select(Expense)
-        if conditions:
-            statement = statement.where(and_(*conditions))
-        statement = statement.order_by(sort_order).offset(offset).limit(limit)
+        statement = self._filter(
+            select(Expense), [],
+            min_price, max_price, date_from, date_to, category
+        )
+        statement = self._paginate(statement, offset, limit, sort_by, order, cursor)
         
         return list(self.db.scalars(statement))
 
@@ -146,52 +207,36 @@ class ExpenseRepository(IExpenseRepository):
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
         category: Optional[str] = None,
-        group_ids: Optional[List[int]] = None
+        group_ids: Optional[List[int]] = None,
+        cursor: Optional[Tuple[Any, int]] = None
     ) -> List[Expense]:
         """
         Method for retrieving expenses for a user with optional group and filter rules.
         """
-        sort_column = getattr(Expense, sort_by, Expense.created_at)
-        sort_order = desc(sort_column) if order.lower() == "desc" else asc(sort_column)
-        
-        user_group_ids_statement = select(UserGroup.group_id).where(UserGroup.user_id == user_id)
-        user_group_ids = list(self.db.scalars(user_group_ids_statement))
-        
-        conditions = []
-
         if group_ids:
-            allowed_filter_ids = [group_id for group_id in group_ids if group_id in user_group_ids]
-            if not allowed_filter_ids:
-                return []
-            
-            conditions.append(Expense.group_id.in_(allowed_filter_ids))
+            # only the requested groups the user is a member of
+            conditions = [
+                Expense.group_id.in_(group_ids),
+                exists().where(UserGroup.user_id == user_id, UserGroup.group_id == Expense.group_id)
+            ]
         else:
-            base_conditions = [
-                Expense.user_id == user_id,
-                Expense.group_id.in_(user_group_ids)
+            # the group ids are computed once as an InitPlan array, unlike a correlated EXISTS
+            # this keeps both branches of the OR indexable
+            user_group_ids = func.array(
+                select(UserGroup.group_id).where(UserGroup.user_id == user_id).scalar_subquery()
+            )
+            conditions = [
+                or_(
+                    Expense.user_id == user_id,
+                    Expense.group_id == any_(user_group_ids)
+                )
             ]
-            conditions.append(or_(*base_conditions))
-        
-        if min_price is not None:
-            conditions.append(Expense.amount >= min_price)
-        if max_price is not None:
-            conditions.append(Expense.amount <= max_price)
-        if date_from is not None:
-            conditions.append(Expense.created_at >= date_from)
-        if date_to is not None:
-            conditions.append(Expense.created_at <= date_to)
-        if category is not None:
-            category_ids = self._resolve_category_ids(category)
-            if category_ids:
-                conditions.append(Expense.category_id.in_(category_ids))
-        
-        statement = (
-            select(Expense)
-            .where(and_(*conditions))
-            .order_by(sort_order)
-            .offset(offset)
-            .limit(limit)
+
+        statement = self._filter(
+            select(Expense), conditions,
+            min_price, max_price, date_from, date_to, category
         )
+        statement = self._paginate(statement, offset, limit, sort_by, order, cursor)
         
         return list(self.db.scalars(statement))
 
@@ -206,39 +251,44 @@ class ExpenseRepository(IExpenseRepository):
         max_price: Optional[float] = None,
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        cursor: Optional[Tuple[Any, int]] = None
     ) -> List[Expense]:
         """
         Method for retrieving expenses for a group with pagination and filters.
         """
-        sort_column = getattr(Expense, sort_by, Expense.created_at)
-        sort_order = desc(sort_column) if order.lower() == "desc" else asc(sort_column)
-        
-        conditions = [Expense.group_id == group_id] 
-        
-        if min_price is not None:
-            conditions.append(Expense.amount >= min_price)
-        if max_price is not None:
-            conditions.append(Expense.amount <= max_price)
-        if date_from is not None:
-            conditions.append(Expense.created_at >= date_from)
-        if date_to is not None:
-            conditions.append(Expense.created_at <= date_to)
-        if category is not None:
-            category_ids = self._resolve_category_ids(category)
-            if category_ids:
-                conditions.append(Expense.category_id.in_(category_ids))
-            
-        statement = (
-            select(Expense)
-            .where(and_(*conditions)) 
-            .order_by(sort_order)
-            .offset(offset)
-            .limit(limit)
+        statement = self._filter(
+            select(Expense), [Expense.group_id == group_id],
+            min_price, max_price, date_from, date_to, category
         )
+        statement = self._paginate(statement, offset, limit, sort_by, order, cursor)
         
         return list(self.db.scalars(statement))
 
+    def get_group_statistics(self, group_id: int, user_id: int) -> Tuple[float, float, int]:
+        """
+        Method for aggregating a group in one statement: the group total, what the user paid
+        and the member count. Runs in the database, so the cost does not grow with the
+        number of rows shipped back.
+        """
+        member_count = (
+            select(func.count())
+            .select_from(UserGroup)
+            .where(UserGroup.group_id == group_id)
+            .scalar_subquery()
+        )
+        statement = (
+            select(
+                func.coalesce(func.sum(Expense.amount), 0.0),
+                func.coalesce(func.sum(Expense.amount).filter(Expense.user_id == user_id), 0.0),
+                member_count
+            )
+            .where(Expense.group_id == group_id)
+        )
+        total_group_spend, user_total_paid, members = self.db.execute(statement).one()
+
+        return total_group_spend, user_total_paid, members
+
     def update(self, expense_id: int, fields: dict) -> int:
         """
         Method for updating specific fields of an expense.
@@ -248,8 +298,7 @@ class ExpenseRepository(IExpenseRepository):
             if hasattr(expense, key):
                 setattr(expense, key, value)
                 
-        self.db.commit()
-        self.db.refresh(expense)
+        self.db.flush()
         
         return expense_id
 
@@ -259,6 +308,6 @@ class ExpenseRepository(IExpenseRepository):
         """
         expense = self.get_by_id(expense_id)
         self.db.delete(expense)
-        self.db.commit()
+        self.db.flush()
         
         return expense_id
\ No newline at end of file
@@ -23,8 +23,7 @@ class GroupLogRepository(IGroupLogRepository):
     def add(self, group_id: int, user_id: int, action: str) -> GroupLog:
         log = GroupLog(group_id=group_id, user_id=user_id, action=action)
         self.db.add(log)
-        self.db.commit()
-        self.db.refresh(log)
+        self.db.flush()
         return log
 
     def get_by_group(self, group_id: int) -> List[GroupLog]:
@@ -0,0 +1,134 @@
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+
+from models.expense import Expense
+from models.group_member_total import GroupMemberTotal
+from models.user_group import UserGroup
+from sqlalchemy import and_, delete, func, or_, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+# float sums drift in the last digits depending on the order they were added in
+TOTALS_TOLERANCE = 1e-6
+
+
+class IGroupMemberTotalRepository(ABC):
+    """
+    Interface for GroupMemberTotalRepository, useful for loosely coupling the components.
+    """
+    @abstractmethod
+    def add_delta(self, group_id: int, user_id: int, amount_delta: float, count_delta: int) -> None: ...
+
+    @abstractmethod
+    def get_group_statistics(self, group_id: int, user_id: int) -> Tuple[float, float, int]: ...
+
+    @abstractmethod
+    def find_mismatches(self) -> List[Tuple[int, int, float, float]]: ...
+
+    @abstractmethod
+    def rebuild(self) -> int: ...
+
+
+class GroupMemberTotalRepository(IGroupMemberTotalRepository):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add_delta(self, group_id: int, user_id: int, amount_delta: float, count_delta: int) -> None:
+        """
+        Method for adding to a member's running total, creating the row on first use.
+        The upsert only locks the row of this member, other members of the group are not blocked.
+        """
+        statement = insert(GroupMemberTotal).values(
+            group_id=group_id,
+            user_id=user_id,
+            total_paid=amount_delta,
+            expense_count=count_delta
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[GroupMemberTotal.group_id, GroupMemberTotal.user_id],
+            set_={
+                "total_paid": GroupMemberTotal.total_paid + statement.excluded.total_paid,
+                "expense_count": GroupMemberTotal.expense_count + statement.excluded.expense_count,
+            }
+        )
+        self.db.execute(statement)
+
+    def get_group_statistics(self, group_id: int, user_id: int) -> Tuple[float, float, int]:
+        """
+        Method for reading the group total, what the user paid and the member count.
+        Reads one primary key range (a row per member who ever paid), independent of the number of expenses.
+        """
+        member_count = (
+            select(func.count())
+            .select_from(UserGroup)
+            .where(UserGroup.group_id == group_id)
+            .scalar_subquery()
+        )
+        statement = (
+            select(
+                func.coalesce(func.sum(GroupMemberTotal.total_paid), 0.0),
+                func.coalesce(func.sum(GroupMemberTotal.total_paid).filter(GroupMemberTotal.user_id == user_id), 0.0),
+                member_count
+            )
+            .where(GroupMemberTotal.group_id == group_id)
+        )
+        total_group_spend, user_total_paid, members = self.db.execute(statement).one()
+
+        return total_group_spend, user_total_paid, members
+
+    def _actual_totals(self):
+        return (
+            select(
+                Expense.group_id,
+                Expense.user_id,
+                func.sum(Expense.amount).label("total_paid"),
+                func.count().label("expense_count")
+            )
+            .where(Expense.group_id.is_not(None))
+            .group_by(Expense.group_id, Expense.user_id)
+        )
+
+    def find_mismatches(self) -> List[Tuple[int, int, float, float]]:
+        """
+        Method for comparing the stored totals against the expenses table.
+        Returns (group_id, user_id, stored total, actual total) for every member that differs.
+        """
+        actual = self._actual_totals().subquery()
+        stored_total = func.coalesce(GroupMemberTotal.total_paid, 0.0)
+        actual_total = func.coalesce(actual.c.total_paid, 0.0)
+        statement = (
+            select(
+                func.coalesce(GroupMemberTotal.group_id, actual.c.group_id),
+                func.coalesce(GroupMemberTotal.user_id, actual.c.user_id),
+                stored_total,
+                actual_total
+            )
+            .select_from(GroupMemberTotal)
+            .join(
+                actual,
+                and_(GroupMemberTotal.group_id == actual.c.group_id, GroupMemberTotal.user_id == actual.c.user_id),
+                full=True
+            )
+            .where(or_(
+                func.abs(stored_total - actual_total) > TOTALS_TOLERANCE,
+                func.coalesce(GroupMemberTotal.expense_count, 0) != func.coalesce(actual.c.expense_count, 0)
+            ))
+        )
+
+        return [tuple(row) for row in self.db.execute(statement)]
+
+    def rebuild(self) -> int:
+        """
+        Method for recomputing every total from the expenses table.
+        Blocks expense writes until the surrounding transaction commits, so no delta is lost in between.
+        """
+        self.db.execute(text(f"LOCK TABLE {Expense.__tablename__} IN SHARE MODE"))
+        self.db.execute(delete(GroupMemberTotal))
+        result = self.db.execute(
+            insert(GroupMemberTotal).from_select(
+                ["group_id", "user_id", "total_paid", "expense_count"],
+                self._actual_totals()
+            )
+        )
+
+        return result.rowcount
@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 from models.group import Group
 from sqlalchemy import select
 from sqlalchemy.orm import Session
+from utils.helpers.transaction_hooks import call_after_commit
 
 
 class IGroupRepository(ABC):
@@ -28,6 +29,9 @@ class IGroupRepository(ABC):
     @abstractmethod
     def delete(self, group_id: int) -> int: ...
 
+    @abstractmethod
+    def after_commit(self, callback: Callable[[], None]) -> None: ...
+
 
 class GroupRepository(IGroupRepository):
     def __init__(self, db: Session):
@@ -38,8 +42,7 @@ class GroupRepository(IGroupRepository):
         Method for creating a new group.
         """
         self.db.add(group)
-        self.db.commit()
-        self.db.refresh(group)
+        self.db.flush()
         
         return group.id
 
@@ -47,9 +50,7 @@ class GroupRepository(IGroupRepository):
         """
         Method for retrieving group by id
         """
-        statement = select(Group).where(Group.id == group_id)
-        
-        return self.db.scalars(statement).first()
+        return self.db.get(Group, group_id)
 
     def get_by_invitation_code(self, code: str) -> Optional[Group]:
         """
@@ -76,8 +77,7 @@ class GroupRepository(IGroupRepository):
             if hasattr(group, key):
                 setattr(group, key, value)
                 
-        self.db.commit()
-        self.db.refresh(group)
+        self.db.flush()
         
         return group
 
@@ -88,6 +88,12 @@ class GroupRepository(IGroupRepository):
         group = self.get_by_id(group_id)
         
         self.db.delete(group)
-        self.db.commit()
+        self.db.flush()
         
         return group_id
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """
+        Method for running a callback once the current transaction commits.
+        """
+        call_after_commit(self.db, callback)
@@ -0,0 +1,172 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Optional
+
+from models.receipt_job import (
+    RECEIPT_JOB_FAILED,
+    RECEIPT_JOB_QUEUED,
+    RECEIPT_JOB_RUNNING,
+    RECEIPT_JOB_SUCCEEDED,
+    ReceiptJob,
+)
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+
+class IReceiptJobRepository(ABC):
+    """
+    Interface for ReceiptJobRepository, useful for loosely coupling the components.
+    """
+    @abstractmethod
+    def add(self, job: ReceiptJob) -> int: ...
+
+    @abstractmethod
+    def get_by_id(self, job_id: int) -> Optional[ReceiptJob]: ...
+
+    @abstractmethod
+    def claim_next(self, lease_seconds: float, max_attempts: int) -> Optional[ReceiptJob]: ...
+
+    @abstractmethod
+    def complete(self, job: ReceiptJob, result: dict) -> bool: ...
+
+    @abstractmethod
+    def fail(self, job: ReceiptJob, error: str) -> bool: ...
+
+    @abstractmethod
+    def release(self, job: ReceiptJob, error: str) -> bool: ...
+
+    @abstractmethod
+    def fail_abandoned(self, max_attempts: int) -> int: ...
+
+    @abstractmethod
+    def delete_finished_before(self, before: datetime) -> int: ...
+
+
+class ReceiptJobRepository(IReceiptJobRepository):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add(self, job: ReceiptJob) -> int:
+        """
+        Method for queueing a new job.
+        """
+        self.db.add(job)
+        self.db.flush()
+
+        return job.id
+
+    def get_by_id(self, job_id: int) -> Optional[ReceiptJob]:
+        """
+        Method for reading a job by id.
+        """
+        return self.db.get(ReceiptJob, job_id)
+
+    def claim_next(self, lease_seconds: float, max_attempts: int) -> Optional[ReceiptJob]:
+        """
+        Method for taking the oldest queued job, or a running one whose worker let its lease expire.
+        SKIP LOCKED lets every worker claim a different job without waiting on the others.
+        The job is returned detached from the session.
+        """
+        claimable = (
+            select(ReceiptJob.id)
+            .where(or_(
+                ReceiptJob.status == RECEIPT_JOB_QUEUED,
+                and_(
+                    ReceiptJob.status == RECEIPT_JOB_RUNNING,
+                    ReceiptJob.locked_until < func.now(),
+                    ReceiptJob.attempts < max_attempts
+                )
+            ))
+            .order_by(ReceiptJob.created_at, ReceiptJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        statement = (
+            update(ReceiptJob)
+            .where(ReceiptJob.id == claimable)
+            .values(
+                status=RECEIPT_JOB_RUNNING,
+                attempts=ReceiptJob.attempts + 1,
+                started_at=func.now(),
+                locked_until=func.now() + timedelta(seconds=lease_seconds)
+            )
+            .returning(ReceiptJob)
+            .execution_options(synchronize_session=False)
+        )
+
+        job = self.db.scalars(statement).first()
+        if job is not None:
+            # detached, so committing the claim does not expire it: the worker reads its fields
+            # during the model call without opening a transaction
+            self.db.expunge(job)
+
+        return job
+
+    def _finish(self, job: ReceiptJob, **values) -> bool:
+        """
+        Internal method for closing a claim. The attempt number fences it: once the lease expired and
+        another worker claimed the job, the late worker's write matches nothing.
+        """
+        statement = (
+            update(ReceiptJob)
+            .where(ReceiptJob.id == job.id)
+            .where(ReceiptJob.status == RECEIPT_JOB_RUNNING)
+            .where(ReceiptJob.attempts == job.attempts)
+            .values(locked_until=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+
+        return self.db.execute(statement).rowcount == 1
+
+    def complete(self, job: ReceiptJob, result: dict) -> bool:
+        """
+        Method for storing the result of a claimed job. The image is dropped, it is no longer needed.
+        """
+        return self._finish(job, status=RECEIPT_JOB_SUCCEEDED, result=result, error=None, image=None, finished_at=func.now())
+
+    def fail(self, job: ReceiptJob, error: str) -> bool:
+        """
+        Method for failing a claimed job for good.
+        """
+        return self._finish(job, status=RECEIPT_JOB_FAILED, error=error, image=None, finished_at=func.now())
+
+    def release(self, job: ReceiptJob, error: str) -> bool:
+        """
+        Method for putting a claimed job back in the queue after a transient error.
+        """
+        return self._finish(job, status=RECEIPT_JOB_QUEUED, error=error)
+
+    def fail_abandoned(self, max_attempts: int) -> int:
+        """
+        Method for failing jobs whose last allowed attempt lost its worker.
+        """
+        statement = (
+            update(ReceiptJob)
+            .where(ReceiptJob.status == RECEIPT_JOB_RUNNING)
+            .where(ReceiptJob.locked_until < func.now())
+            .where(ReceiptJob.attempts >= max_attempts)
+            .values(
+                status=RECEIPT_JOB_FAILED,
+                error="The job was interrupted too many times.",
+                image=None,
+                locked_until=None,
+                finished_at=func.now()
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+        return self.db.execute(statement).rowcount
+
+    def delete_finished_before(self, before: datetime) -> int:
+        """
+        Method for removing finished jobs older than the retention window.
+        """
+        statement = (
+            delete(ReceiptJob)
+            .where(ReceiptJob.status.in_((RECEIPT_JOB_SUCCEEDED, RECEIPT_JOB_FAILED)))
+            .where(ReceiptJob.finished_at < before)
+            .execution_options(synchronize_session=False)
+        )
+
+        return self.db.execute(statement).rowcount
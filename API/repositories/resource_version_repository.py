@@ -0,0 +1,109 @@
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+
+from models.resource_version import ResourceVersion, ResourceVersionChange
+from models.user_group import UserGroup
+from sqlalchemy import BigInteger, String, func, select, text, union_all
+from sqlalchemy.dialects.postgresql import array
+from sqlalchemy.orm import Session
+
+
+class IResourceVersionRepository(ABC):
+    """
+    Interface for ResourceVersionRepository, useful for loosely coupling the components.
+    """
+    @abstractmethod
+    def get_user_expenses_versions(self, user_id: int) -> List[Tuple[str, int]]: ...
+
+    @abstractmethod
+    def get_user_groups_versions(self, user_id: int) -> List[Tuple[str, int]]: ...
+
+    @abstractmethod
+    def get_user_categories_versions(self, user_id: int) -> List[Tuple[str, int]]: ...
+
+    @abstractmethod
+    def get_group_users_versions(self, group_id: int) -> List[Tuple[str, int]]: ...
+
+    @abstractmethod
+    def fold_changes(self, batch_size: int) -> int: ...
+
+
+class ResourceVersionRepository(IResourceVersionRepository):
+    """
+    Reads the version counters a listing depends on. Scope names must match the triggers
+    of the resource_versions migration.
+    """
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _get_versions(self, scopes: List[str], *scope_queries) -> List[Tuple[str, int]]:
+        """
+        Internal method for reading the versions of fixed scopes plus the scopes produced by subqueries,
+        in one statement so the folded counters and the changes appended since come from one snapshot.
+        Fixed scopes that never changed are reported as version 0, so they still tell apart the listings
+        of different users.
+        """
+        scope_source = union_all(
+            select(func.unnest(array(scopes, type_=String))),
+            *scope_queries
+        )
+        counters = union_all(
+            select(ResourceVersion.scope, ResourceVersion.version)
+            .where(ResourceVersion.scope.in_(scope_source)),
+            select(ResourceVersionChange.scope, ResourceVersionChange.changes)
+            .where(ResourceVersionChange.scope.in_(scope_source))
+        ).subquery()
+        statement = (
+            select(counters.c.scope, func.sum(counters.c.version).cast(BigInteger))
+            .group_by(counters.c.scope)
+        )
+
+        versions = dict.fromkeys(scopes, 0)
+        versions.update(self.db.execute(statement).all())
+
+        return sorted(versions.items())
+
+    def get_user_expenses_versions(self, user_id: int) -> List[Tuple[str, int]]:
+        """
+        Method for the versions behind a user's expense listing: own expenses, memberships
+        and the expenses of every group the user is in. Renaming a category bumps the expense
+        scopes of its expenses, so the category filter needs no scope of its own.
+        """
+        return self._get_versions(
+            [f"expenses:user:{user_id}", f"memberships:user:{user_id}"],
+            select(func.concat("expenses:group:", UserGroup.group_id)).where(UserGroup.user_id == user_id)
+        )
+
+    def get_user_groups_versions(self, user_id: int) -> List[Tuple[str, int]]:
+        """
+        Method for the versions behind the groups of a user.
+        """
+        return self._get_versions(
+            [f"user:{user_id}", f"memberships:user:{user_id}"],
+            select(func.concat("group:", UserGroup.group_id)).where(UserGroup.user_id == user_id)
+        )
+
+    def get_user_categories_versions(self, user_id: int) -> List[Tuple[str, int]]:
+        """
+        Method for the versions behind the categories of a user.
+        """
+        return self._get_versions([f"categories:user:{user_id}"])
+
+    def get_group_users_versions(self, group_id: int) -> List[Tuple[str, int]]:
+        """
+        Method for the versions behind the member list of a group.
+        """
+        return self._get_versions(
+            [f"group:{group_id}", f"memberships:group:{group_id}"],
+            select(func.concat("user:", UserGroup.user_id)).where(UserGroup.group_id == group_id)
+        )
+
+    def fold_changes(self, batch_size: int) -> int:
+        """
+        Method for folding up to batch_size of the oldest appended changes into the scope counters,
+        without changing any version. Returns the number of changes folded. Being a text statement,
+        the routing session sends it to the primary.
+        """
+        return self.db.execute(
+            text("SELECT fold_resource_version_changes(:batch_size)"), {"batch_size": batch_size}
+        ).scalar_one()
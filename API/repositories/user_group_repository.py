@@ -1,11 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from typing import FrozenSet, List, Tuple
 
 from models.group import Group
 from models.user import User
 from models.user_group import UserGroup
 from sqlalchemy import delete, func, select
 from sqlalchemy.orm import Session
+from utils.helpers.membership_cache import MembershipCache
+from utils.helpers.read_your_writes import USE_PRIMARY
+from utils.helpers.transaction_hooks import call_after_commit
 
 
 class IUserGroupRepository(ABC):
@@ -24,6 +27,9 @@ class IUserGroupRepository(ABC):
     @abstractmethod
     def remove_user_from_group(self, user_group: UserGroup) -> None: ...
     
+    @abstractmethod
+    def remove_user_from_all_groups(self, user_id: int) -> List[int]: ...
+    
     @abstractmethod
     def get_groups_by_user(self, user_id: int) -> List[Group]: ...
     
@@ -55,8 +61,7 @@ class UserGroupRepository(IUserGroupRepository):
         Method for adding a user to a group.
         """
         self.db.add(user_group)
-        self.db.commit()
-        self.db.refresh(user_group)
+        self.db.flush()
         
         return (user_group.group_id, user_group.user_id)
 
@@ -70,8 +75,7 @@ class UserGroupRepository(IUserGroupRepository):
         user_group = UserGroup(user_id=user_id, group_id=group.id)
             
         self.db.add(user_group)
-        self.db.commit()
-        self.db.refresh(user_group)
+        self.db.flush()
         
         return (group.id, user_id)
 
@@ -81,7 +85,14 @@ class UserGroupRepository(IUserGroupRepository):
         """
         statement = delete(UserGroup).where((UserGroup.user_id == user_group.user_id) & (UserGroup.group_id == user_group.group_id))
         self.db.execute(statement)
-        self.db.commit()
+
+    def remove_user_from_all_groups(self, user_id: int) -> List[int]:
+        """
+        Method for removing a user from every group, returns the ids of those groups.
+        """
+        statement = delete(UserGroup).where(UserGroup.user_id == user_id).returning(UserGroup.group_id)
+
+        return list(self.db.scalars(statement))
 
     def get_groups_by_user(self, user_id: int) -> List[Group]:
         """
@@ -111,6 +122,70 @@ class UserGroupRepository(IUserGroupRepository):
         """
         Method for verifying if a user belongs to a group.
         """
-        return self.db.query(UserGroup).filter_by(user_id=user_id, group_id=group_id).first() is not None
+        return self.db.get(UserGroup, (user_id, group_id)) is not None
+
+
+class CachedUserGroupRepository(UserGroupRepository):
+    """
+    UserGroupRepository that answers is_member and member counts from the membership cache.
+    Every membership change invalidates the group once the transaction commits.
+    """
+    def __init__(self, db: Session, membership_cache: MembershipCache):
+        super().__init__(db)
+        self.membership_cache = membership_cache
+
+    def _members(self, group_id: int) -> FrozenSet[int]:
+        # loaded from the primary, a lagging replica would cache members that already left
+        return self.membership_cache.get(
+            group_id,
+            lambda: self.db.connection().scalars(select(UserGroup.user_id).where(UserGroup.group_id == group_id))
+        )
+
+    def _invalidate(self, group_id: int) -> None:
+        call_after_commit(self.db, lambda: self.membership_cache.invalidate(group_id))
+
+    def add_user_to_group(self, user_group: UserGroup) -> tuple:
+        response = super().add_user_to_group(user_group)
+        self._invalidate(user_group.group_id)
+
+        return response
+
+    def add_user_to_group_by_invitation_code(self, user_id: int, invitation_code: str) -> tuple:
+        response = super().add_user_to_group_by_invitation_code(user_id, invitation_code)
+        self._invalidate(response[0])
+
+        return response
+
+    def remove_user_from_group(self, user_group: UserGroup) -> None:
+        super().remove_user_from_group(user_group)
+        self._invalidate(user_group.group_id)
+
+    def remove_user_from_all_groups(self, user_id: int) -> List[int]:
+        group_ids = super().remove_user_from_all_groups(user_id)
+        for group_id in group_ids:
+            self._invalidate(group_id)
+
+        return group_ids
+
+    def get_nr_of_users_from_group(self, group_id: int) -> int:
+        return len(self._members(group_id))
+
+    def is_member(self, user_id: int, group_id: int) -> bool:
+        """
+        Membership check used for authorization. A cached "member" is only trusted when every
+        worker shares the cache and its invalidations, and not for sessions pinned to the
+        primary by their own writes. A cached "not a member" is confirmed by the database
+        before the caller is refused.
+        """
+        if not self.membership_cache.shared or self.db.info.get(USE_PRIMARY):
+            return super().is_member(user_id, group_id)
+
+        if user_id in self._members(group_id):
+            return True
 
+        if super().is_member(user_id, group_id):
+            # the cached set missed a join, drop it so the next check reloads
+            self.membership_cache.invalidate(group_id)
+            return True
 
+        return False
@@ -0,0 +1,205 @@
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from models.category import Category
+from models.expense import Expense
+from models.group import Group
+from models.user_monthly_spend import UserMonthlySpend
+from sqlalchemy import (
+    Date,
+    DateTime,
+    and_,
+    cast,
+    delete,
+    func,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from utils.helpers.jwt_utils import ROMANIA_TZ
+
+# float sums drift in the last digits depending on the order they were added in
+SPEND_TOLERANCE = 1e-6
+
+
+def _month_of(timestamp):
+    """
+    First day of the Bucharest calendar month of a timestamp expression.
+    expenses.created_at is a plain TIMESTAMP holding the database's local time, the cast reads it
+    in the session time zone (as comparisons against an aware datetime do) before converting it.
+    """
+    return cast(func.date_trunc("month", func.timezone(ROMANIA_TZ.key, cast(timestamp, DateTime(timezone=True)))), Date)
+
+
+class IUserMonthlySpendRepository(ABC):
+    """
+    Interface for UserMonthlySpendRepository, useful for loosely coupling the components.
+    """
+    @abstractmethod
+    def add_delta(self, user_id: int, created_at: Optional[datetime], amount_delta: float, count_delta: int) -> None: ...
+
+    @abstractmethod
+    def subtract_group_expenses(self, group_id: int) -> None: ...
+
+    @abstractmethod
+    def subtract_category_expenses(self, category_id: int) -> None: ...
+
+    @abstractmethod
+    def get_spent(self, user_id: int, month: date) -> float: ...
+
+    @abstractmethod
+    def find_mismatches(self) -> List[Tuple[int, date, float, float]]: ...
+
+    @abstractmethod
+    def rebuild(self) -> int: ...
+
+
+class UserMonthlySpendRepository(IUserMonthlySpendRepository):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add_delta(self, user_id: int, created_at: Optional[datetime], amount_delta: float, count_delta: int) -> None:
+        """
+        Method for adding to the spend of the month an expense was created in, creating the row on first use.
+        Without created_at the expense is being inserted in this transaction, its created_at defaults to now().
+        """
+        month = _month_of(func.now() if created_at is None else created_at)
+        statement = insert(UserMonthlySpend).values(
+            user_id=user_id,
+            month=month,
+            total_spent=amount_delta,
+            expense_count=count_delta
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[UserMonthlySpend.user_id, UserMonthlySpend.month],
+            set_={
+                "total_spent": UserMonthlySpend.total_spent + statement.excluded.total_spent,
+                "expense_count": UserMonthlySpend.expense_count + statement.excluded.expense_count,
+            }
+        )
+        self.db.execute(statement)
+
+    def _subtract_expenses(self, condition) -> None:
+        """
+        Internal method for taking the expenses matching condition out of their users' months, one statement
+        for every (user, month) they fall in. The rows are locked, so an edit committed meanwhile is read
+        at its final amount.
+        """
+        removed = (
+            select(Expense.user_id, Expense.created_at, Expense.amount)
+            .where(condition)
+            .where(Expense.user_id.is_not(None))
+            .with_for_update()
+            .cte("removed")
+        )
+        month = _month_of(removed.c.created_at)
+        totals = (
+            select(
+                removed.c.user_id,
+                month.label("month"),
+                func.sum(removed.c.amount).label("total_spent"),
+                func.count().label("expense_count")
+            )
+            .group_by(removed.c.user_id, month)
+            .subquery()
+        )
+        statement = (
+            update(UserMonthlySpend)
+            .where(UserMonthlySpend.user_id == totals.c.user_id)
+            .where(UserMonthlySpend.month == totals.c.month)
+            .values(
+                total_spent=UserMonthlySpend.total_spent - totals.c.total_spent,
+                expense_count=UserMonthlySpend.expense_count - totals.c.expense_count
+            )
+        )
+        self.db.execute(statement)
+
+    def subtract_group_expenses(self, group_id: int) -> None:
+        """
+        Method for taking a group's expenses out of the monthly spend, before the group is deleted and its expenses
+        cascade with it. Locks the group first, so no expense is added to it until the delete commits.
+        """
+        self.db.execute(select(Group.id).where(Group.id == group_id).with_for_update())
+        self._subtract_expenses(Expense.group_id == group_id)
+
+    def subtract_category_expenses(self, category_id: int) -> None:
+        """
+        Method for taking a category's expenses out of the monthly spend, before the category is deleted and its
+        expenses cascade with it. Locks the category first, so no expense is filed under it until the delete commits.
+        """
+        self.db.execute(select(Category.id).where(Category.id == category_id).with_for_update())
+        self._subtract_expenses(Expense.category_id == category_id)
+
+    def get_spent(self, user_id: int, month: date) -> float:
+        """
+        Method for reading what a user spent in a month, a single primary key lookup.
+        """
+        statement = (
+            select(UserMonthlySpend.total_spent)
+            .where(UserMonthlySpend.user_id == user_id)
+            .where(UserMonthlySpend.month == month)
+        )
+
+        return self.db.scalar(statement) or 0.0
+
+    def _actual_spend(self):
+        month = _month_of(Expense.created_at)
+        return (
+            select(
+                Expense.user_id,
+                month.label("month"),
+                func.sum(Expense.amount).label("total_spent"),
+                func.count().label("expense_count")
+            )
+            .where(Expense.user_id.is_not(None))
+            .group_by(Expense.user_id, month)
+        )
+
+    def find_mismatches(self) -> List[Tuple[int, date, float, float]]:
+        """
+        Method for comparing the stored spend against the expenses table.
+        Returns (user_id, month, stored spend, actual spend) for every month that differs.
+        """
+        actual = self._actual_spend().subquery()
+        stored_total = func.coalesce(UserMonthlySpend.total_spent, 0.0)
+        actual_total = func.coalesce(actual.c.total_spent, 0.0)
+        statement = (
+            select(
+                func.coalesce(UserMonthlySpend.user_id, actual.c.user_id),
+                func.coalesce(UserMonthlySpend.month, actual.c.month),
+                stored_total,
+                actual_total
+            )
+            .select_from(UserMonthlySpend)
+            .join(
+                actual,
+                and_(UserMonthlySpend.user_id == actual.c.user_id, UserMonthlySpend.month == actual.c.month),
+                full=True
+            )
+            .where(or_(
+                func.abs(stored_total - actual_total) > SPEND_TOLERANCE,
+                func.coalesce(UserMonthlySpend.expense_count, 0) != func.coalesce(actual.c.expense_count, 0)
+            ))
+        )
+
+        return [tuple(row) for row in self.db.execute(statement)]
+
+    def rebuild(self) -> int:
+        """
+        Method for recomputing every month from the expenses table.
+        Blocks expense writes until the surrounding transaction commits, so no delta is lost in between.
+        """
+        self.db.execute(text(f"LOCK TABLE {Expense.__tablename__} IN SHARE MODE"))
+        self.db.execute(delete(UserMonthlySpend))
+        result = self.db.execute(
+            insert(UserMonthlySpend).from_select(
+                ["user_id", "month", "total_spent", "expense_count"],
+                self._actual_spend()
+            )
+        )
+
+        return result.rowcount
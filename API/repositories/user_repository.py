@@ -46,8 +46,7 @@ class UserRepository(IUserRepository):
         Method for creating an user. 
         """
         self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
+        self.db.flush()
         
         return user.id
 
@@ -55,9 +54,7 @@ class UserRepository(IUserRepository):
         """
         Method for retrieving an user by id.
         """
-        statement = select(User).where(User.id == user_id)
-
-        return self.db.scalars(statement).first()
+        return self.db.get(User, user_id)
 
     def get_by_email(self, email: str) -> Optional[User]:
         """
@@ -84,8 +81,7 @@ class UserRepository(IUserRepository):
             if hasattr(user, key):
                 setattr(user, key, value)
                       
-        self.db.commit()
-        self.db.refresh(user)
+        self.db.flush()
         return user
 
     def delete(self, user_id: int) -> None:
@@ -95,7 +91,7 @@ class UserRepository(IUserRepository):
         user = self.get_by_id(user_id)
         
         self.db.delete(user)
-        self.db.commit()
+        self.db.flush()
 
     def get_user_monthly_spent(self, user_id: int, month_start: datetime) -> float:
         statement = (
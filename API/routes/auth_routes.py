@@ -1,21 +1,15 @@
-from dependencies.di import get_user_service
+from database import UnitOfWork, run_db_call
+from dependencies.di import get_current_user_id, get_unit_of_work, get_user_service
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from schemas.user import UserCreate, UserLogin, UserPasswordReset
 from services.user_service import IUserService
 from utils.helpers import logger
 from utils.helpers.constants import ACCESS_TOKEN_FIELD
-from utils.helpers.jwt_utils import JwtUtils
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-def get_current_user_id(request: Request) -> int:
-    """
-    Returns the authenticated user id.
-    """
-    return JwtUtils.auth_wrapper(request)
-
 @router.post("/register")
-def register(user_in: UserCreate, user_service: IUserService = Depends(get_user_service)):
+async def register(user_in: UserCreate, user_service: IUserService = Depends(get_user_service), uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Registers a new user.
 
@@ -30,7 +24,7 @@ def register(user_in: UserCreate, user_service: IUserService = Depends(get_user_
         HTTPException returned when registration fails
     """
     try:
-        result = user_service.register_user(user_in)
+        result = await uow.run(user_service.register_user, user_in)
         return result
     except HTTPException as e:
         logger.Logger().error(e)
@@ -40,7 +34,7 @@ def register(user_in: UserCreate, user_service: IUserService = Depends(get_user_
         raise HTTPException(status_code=400, detail=str(e))
     
 @router.post("/login")
-def login(user_in: UserLogin, response: Response, user_service: IUserService = Depends(get_user_service)):
+async def login(user_in: UserLogin, response: Response, user_service: IUserService = Depends(get_user_service)):
     """
     Logs in a user.
 
@@ -57,7 +51,7 @@ def login(user_in: UserLogin, response: Response, user_service: IUserService = D
     """
     
     try:
-        result = user_service.login_user(user_in)
+        result = await run_db_call(user_service.login_user, user_in)
         response.set_cookie(
             key=ACCESS_TOKEN_FIELD,
             value=result.data[ACCESS_TOKEN_FIELD],
@@ -74,14 +68,14 @@ def login(user_in: UserLogin, response: Response, user_service: IUserService = D
         raise HTTPException(status_code=401, detail=str(e))
 
 @router.get("/me")
-def get_currently_logged_in_user(user_id: int = Depends(get_current_user_id), user_service: IUserService = Depends(get_user_service)):
+async def get_currently_logged_in_user(user_id: int = Depends(get_current_user_id), user_service: IUserService = Depends(get_user_service)):
     """
     Returns currently authenticated user.
     """
-    return user_service.get_by_id(user_id)
+    return await run_db_call(user_service.get_by_id, user_id)
 
 @router.post("/logout")
-def logout(response: Response):
+async def logout(response: Response):
     """
     Logs out a user.
 
@@ -100,7 +94,7 @@ def logout(response: Response):
 
 
 @router.post("/password-reset/request")
-def request_password_reset(request: Request, user_service = Depends(get_user_service)):
+async def request_password_reset(request: Request, user_service = Depends(get_user_service)):
     """
     Requests a password reset link.
 
@@ -120,7 +114,7 @@ def request_password_reset(request: Request, user_service = Depends(get_user_ser
     #return user_service.request_password_reset(user.email)
 
 @router.post("/password-reset/confirm")
-def confirm_password_reset(request: UserPasswordReset, user_service = Depends(get_user_service)):
+async def confirm_password_reset(request: UserPasswordReset, user_service = Depends(get_user_service), uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Confirms a password reset.
 
@@ -136,7 +130,7 @@ def confirm_password_reset(request: UserPasswordReset, user_service = Depends(ge
     """
 
     try:
-        user_service.reset_password(request.token, request.new_password)
+        await uow.run(user_service.reset_password, request.token, request.new_password)
         return {"message": "Password has been reset successfully."}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,44 +1,55 @@
-from dependencies.di import get_category_service
-from fastapi import APIRouter, Depends, Request
+from database import UnitOfWork, run_db_call
+from dependencies.di import (
+    get_category_service,
+    get_current_user_id,
+    get_resource_version_service,
+    get_unit_of_work,
+)
+from fastapi import APIRouter, Depends, Request, Response
 from fastapi.params import Query
 from schemas.category import CategoryCreate, CategoryUpdate
 from services.category_service import ICategoryService
-from utils.helpers.jwt_utils import JwtUtils
+from services.resource_version_service import IResourceVersionService
+from utils.helpers.etag import (
+    is_not_modified,
+    not_modified_response,
+    representation_key,
+    set_etag,
+)
 from utils.helpers.logger import Logger
 
 router = APIRouter(tags=["Categories"])
 logger = Logger()
 
-def get_current_user_id(request: Request) -> int:
-    """
-    Returns the authenticated user id.
-    """
-    return JwtUtils.auth_wrapper(request)
-
 @router.post("/")
-def create_category(category_in: CategoryCreate, user_id: int = Depends(get_current_user_id), category_service: ICategoryService = Depends(get_category_service)):
-    return category_service.create_category(category_in, user_id)
+async def create_category(category_in: CategoryCreate, user_id: int = Depends(get_current_user_id), category_service: ICategoryService = Depends(get_category_service), uow: UnitOfWork = Depends(get_unit_of_work)):
+    return await uow.run(category_service.create_category, category_in, user_id)
 
 @router.get("/")
-def get_all_categories(
+async def get_all_categories(
         _ = Depends(get_current_user_id),
         category_service: ICategoryService = Depends(get_category_service),
         sort_by: str = Query("title"),
         order: str = Query("asc", regex="^(asc|desc)$")
 ):
-    return category_service.get_all_categories(sort_by, order)
+    return await run_db_call(category_service.get_all_categories, sort_by, order)
 
 @router.get("/{user_id}")
-def get_user_categories(user_id: int = Depends(get_current_user_id), category_service: ICategoryService = Depends(get_category_service), sort_by: str = Query("title"), order: str = Query("asc", regex="^(asc|desc)$")):
-    return category_service.get_user_categories(user_id, sort_by, order)
+async def get_user_categories(request: Request, response: Response, user_id: int = Depends(get_current_user_id), category_service: ICategoryService = Depends(get_category_service), version_service: IResourceVersionService = Depends(get_resource_version_service), sort_by: str = Query("title"), order: str = Query("asc", regex="^(asc|desc)$")):
+    etag = await run_db_call(version_service.get_user_categories_etag, user_id, representation_key(request))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+
+    return await run_db_call(category_service.get_user_categories, user_id, sort_by, order)
 
 @router.put("/{category_id}")
-def update_category(category_id: int, category_in: CategoryUpdate, requester_id: int = Depends(get_current_user_id), category_service: ICategoryService = Depends(get_category_service)):
-    return category_service.update_category(category_id, category_in, requester_id)
+async def update_category(category_id: int, category_in: CategoryUpdate, requester_id: int = Depends(get_current_user_id), category_service: ICategoryService = Depends(get_category_service), uow: UnitOfWork = Depends(get_unit_of_work)):
+    return await uow.run(category_service.update_category, category_id, category_in, requester_id)
 
 @router.delete("/{category_id}")
-def delete_category(category_id: int, requester_id: int = Depends(get_current_user_id), category_service: ICategoryService = Depends(get_category_service)):
-    return category_service.delete_category(category_id, requester_id)
+async def delete_category(category_id: int, requester_id: int = Depends(get_current_user_id), category_service: ICategoryService = Depends(get_category_service), uow: UnitOfWork = Depends(get_unit_of_work)):
+    return await uow.run(category_service.delete_category, category_id, requester_id)
 
 
 
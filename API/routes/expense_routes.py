@@ -1,35 +1,57 @@
 from typing import List, Optional
 
-from dependencies.di import get_expense_service
-from fastapi import APIRouter, Depends, Query, Request
-from schemas.expense import ExpenseCreate, ExpenseUpdate
+from database import UnitOfWork, run_db_call
+from dependencies.di import (
+    get_current_user_id,
+    get_expense_service,
+    get_resource_version_service,
+    get_unit_of_work,
+)
+from fastapi import APIRouter, Depends, Query, Request, Response
+from schemas.expense import ExpenseCreate, ExpenseUpdate, ReceiptExpensesCreate
 from services.expense_service import IExpenseService
+from services.resource_version_service import IResourceVersionService
 from utils.helpers.convert_datetime_string import parse_date_string
-from utils.helpers.jwt_utils import JwtUtils
+from utils.helpers.cursor import decode_cursor
+from utils.helpers.etag import (
+    is_not_modified,
+    not_modified_response,
+    representation_key,
+    set_etag,
+)
 
 router = APIRouter(tags=["Expenses"])
 
 
-def get_current_user_id(request: Request) -> int:
-    """
-    Returns the authenticated user id.
-    """
-    return JwtUtils.auth_wrapper(request)
-
 @router.post("/")
-def create_expense(
+async def create_expense(
     expense_in: ExpenseCreate,
     user_id: int = Depends(get_current_user_id),
-    expense_service: IExpenseService = Depends(get_expense_service)
+    expense_service: IExpenseService = Depends(get_expense_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     """
     Method for creating a new expense (user_id taken from JWT, not request body)
     """
-    return expense_service.create_expense(expense_in, user_id)
+    return await uow.run(expense_service.create_expense, expense_in, user_id)
+
+
+@router.post("/from-receipt")
+async def create_expenses_from_receipt(
+    receipt_in: ReceiptExpensesCreate,
+    user_id: int = Depends(get_current_user_id),
+    expense_service: IExpenseService = Depends(get_expense_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
+    """
+    Method for saving a parsed receipt: creates its missing categories and all of its expenses
+    in one transaction and returns the new ids, instead of one request per expense and category.
+    """
+    return await uow.run(expense_service.create_expenses_from_receipt, receipt_in, user_id)
 
 
 @router.get("/all")
-def get_all_expenses(
+async def get_all_expenses(
     offset: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     sort_by: str = Query("created_at"),
@@ -39,6 +61,7 @@ def get_all_expenses(
     date_from: Optional[str] = Query(None),
     date_to: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, replaces offset"),
     expense_service: IExpenseService = Depends(get_expense_service)
 ):
     """
@@ -46,25 +69,30 @@ def get_all_expenses(
     """
     date_from_dt = parse_date_string(date_from)
     date_to_dt = parse_date_string(date_to)
+    last_seen = decode_cursor(cursor, sort_by, order)
 
-    return expense_service.get_all_expenses(
+    return await run_db_call(
+        expense_service.get_all_expenses,
         offset, limit, sort_by, order,
-        min_price, max_price, date_from_dt, date_to_dt, category
+        min_price, max_price, date_from_dt, date_to_dt, category,
+        cursor=last_seen
     )
 
 @router.get("/{expense_id}")
-def get_expense(
+async def get_expense(
     expense_id: int,
     expense_service: IExpenseService = Depends(get_expense_service)
 ):
     """
     Retrieves an expense by id.
     """
-    return expense_service.get_expense_by_id(expense_id)
+    return await run_db_call(expense_service.get_expense_by_id, expense_id)
 
 
 @router.get("/")
-def get_user_expenses(
+async def get_user_expenses(
+    request: Request,
+    response: Response,
     user_id: int = Depends(get_current_user_id),
     offset: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
@@ -76,23 +104,37 @@ def get_user_expenses(
     date_to: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     group_ids: Optional[List[int]] = Query(None),
-    expense_service: IExpenseService = Depends(get_expense_service)
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, replaces offset"),
+    expense_service: IExpenseService = Depends(get_expense_service),
+    version_service: IResourceVersionService = Depends(get_resource_version_service)
 ):
     """
     Retrieves expenses for the authenticated user with filtering.
+    Answers 304 when If-None-Match still matches, without loading the expenses.
     """
     date_from_dt = parse_date_string(date_from)
     date_to_dt = parse_date_string(date_to)
+    last_seen = decode_cursor(cursor, sort_by, order)
 
-    return expense_service.get_user_expenses(
+    etag = await run_db_call(
+        version_service.get_user_expenses_etag,
+        user_id, representation_key(request)
+    )
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+
+    return await run_db_call(
+        expense_service.get_user_expenses,
         user_id, offset, limit, sort_by, order,
         min_price, max_price, date_from_dt, date_to_dt,
-        category, group_ids
+        category, group_ids,
+        cursor=last_seen
     )
 
 
 @router.get("/group/{group_id}")
-def get_group_expenses(
+async def get_group_expenses(
     group_id: int,
     offset: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
@@ -103,6 +145,7 @@ def get_group_expenses(
     date_from: Optional[str] = Query(None),
     date_to: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page, replaces offset"),
     expense_service: IExpenseService = Depends(get_expense_service)
 ):
     """
@@ -110,33 +153,38 @@ def get_group_expenses(
     """
     date_from_dt = parse_date_string(date_from)
     date_to_dt = parse_date_string(date_to)
+    last_seen = decode_cursor(cursor, sort_by, order)
 
-    return expense_service.get_group_expenses(
+    return await run_db_call(
+        expense_service.get_group_expenses,
         group_id, offset, limit, sort_by, order,
-        min_price, max_price, date_from_dt, date_to_dt, category
+        min_price, max_price, date_from_dt, date_to_dt, category,
+        cursor=last_seen
     )
 
 
 @router.put("/{expense_id}")
-def update_expense(
+async def update_expense(
     expense_id: int,
     expense_in: ExpenseUpdate,
     requester_id: int = Depends(get_current_user_id),
-    expense_service: IExpenseService = Depends(get_expense_service)
+    expense_service: IExpenseService = Depends(get_expense_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     """
     Update allowed only if requester is the author.
     """
-    return expense_service.update_expense(expense_id, expense_in, requester_id)
+    return await uow.run(expense_service.update_expense, expense_id, expense_in, requester_id)
 
 
 @router.delete("/{expense_id}")
-def delete_expense(
+async def delete_expense(
     expense_id: int,
     requester_id: int = Depends(get_current_user_id),
-    expense_service: IExpenseService = Depends(get_expense_service)
+    expense_service: IExpenseService = Depends(get_expense_service),
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     """
     Delete allowed only if requester is the author.
     """
-    return expense_service.delete_expense(expense_id, requester_id)
+    return await uow.run(expense_service.delete_expense, expense_id, requester_id)
@@ -1,15 +1,14 @@
-
-from dependencies.di import get_group_log_service
+from database import run_db_call
+from dependencies.di import get_current_user_id, get_group_log_service
 from fastapi import APIRouter, Depends
 from services.group_log_service import IGroupLogService
-from utils.helpers.jwt_utils import JwtUtils
 
 router = APIRouter(tags=["Group Logs"])
 
 @router.get("/{group_id}")
-def get_group_logs(
+async def get_group_logs(
     group_id: int,
-    user_id: int = Depends(JwtUtils.auth_wrapper),
+    user_id: int = Depends(get_current_user_id),
     logs_service: IGroupLogService = Depends(get_group_log_service),
 ):
-    return logs_service.get_logs_for_group(user_id, group_id)
+    return await run_db_call(logs_service.get_logs_for_group, user_id, group_id)
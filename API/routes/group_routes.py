@@ -1,148 +1,165 @@
+from typing import Optional
 
+from database import UnitOfWork, run_db_call
 from dependencies.di import (
+    get_current_user_id,
     get_expense_service,
-    get_group_log_service,
     get_group_service,
+    get_resource_version_service,
+    get_unit_of_work,
     get_user_group_service,
 )
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Path, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from schemas.group import GroupCreate, GroupUpdate
 from services.expense_service import IExpenseService
-from services.group_log_service import GroupLogService, IGroupLogService
 from services.group_service import IGroupService
+from services.resource_version_service import IResourceVersionService
 from services.user_group_service import IUserGroupService
-from utils.helpers.jwt_utils import JwtUtils
+from utils.helpers.etag import (
+    CACHE_CONTROL,
+    is_not_modified,
+    not_modified_response,
+    representation_key,
+    set_etag,
+)
+from utils.helpers.invite_qr import invite_qr_etag, invite_qr_version
 
 router = APIRouter(tags=["Groups"])
 
+# only for URLs carrying the version of the current code; private, the image lets anyone join the group
+INVITE_QR_CACHE_CONTROL = "private, max-age=31536000"
+
 
 @router.post("/")
-def create_group(group_in: GroupCreate, group_service: IGroupService = Depends(get_group_service)):
+async def create_group(group_in: GroupCreate, group_service: IGroupService = Depends(get_group_service), uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Creates group.
     """
-    return group_service.create_group(group_in)
+    return await uow.run(group_service.create_group, group_in)
 
 
 @router.get("/{group_id}")
-def get_group(group_id: int, service: IGroupService = Depends(get_group_service)):
+async def get_group(group_id: int, service: IGroupService = Depends(get_group_service)):
     """
     Returns group by id.
     """
-    return service.get_group_by_id(group_id)
+    return await run_db_call(service.get_group_by_id, group_id)
 
 
 @router.get("/")
-def get_all_groups(offset: int = 0, limit: int = 100, group_service: IGroupService = Depends(get_group_service)):
+async def get_all_groups(offset: int = 0, limit: int = 100, group_service: IGroupService = Depends(get_group_service)):
     """
     Returns all groups.
     """
-    return group_service.get_all_groups(offset=offset, limit=limit)
+    return await run_db_call(group_service.get_all_groups, offset=offset, limit=limit)
 
 
 @router.put("/{group_id}")
-def update_group(group_id: int, group_in: GroupUpdate, group_service: IGroupService = Depends(get_group_service)):
+async def update_group(group_id: int, group_in: GroupUpdate, group_service: IGroupService = Depends(get_group_service), uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Updates group.
     """
-    return group_service.update_group(group_id, group_in)
+    return await uow.run(group_service.update_group, group_id, group_in)
 
 @router.delete("/{group_id}")
-def delete_group(group_id: int, group_service: IGroupService = Depends(get_group_service)):
+async def delete_group(group_id: int, group_service: IGroupService = Depends(get_group_service), uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Deletes a group.
     """
-    return group_service.delete_group(group_id)
+    return await uow.run(group_service.delete_group, group_id)
 
 
 @router.post("/{group_id}/users/{user_id}")
-def add_user_to_group(
+async def add_user_to_group(
     group_id: int,
     user_id: int,
     user_group_service: IUserGroupService = Depends(get_user_group_service),
-    log_service: IGroupLogService = Depends(get_group_log_service)
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     """
-    Adds user to group.
+    Adds user to group. The join is logged in the same transaction.
     """
-    response = user_group_service.add_user_to_group(user_id, group_id)
-    
-    if response.success is True:
-        log_service.log_join(group_id, user_id)
-        
-    return response
+    return await uow.run(user_group_service.add_user_to_group, user_id, group_id)
 
 
 @router.delete("/{group_id}/leave")
-def leave_group(
+async def leave_group(
     group_id: int,
-    requester_id: int = Depends(JwtUtils.auth_wrapper),
+    requester_id: int = Depends(get_current_user_id),
     user_group_service: IUserGroupService = Depends(get_user_group_service),
-    log_service: GroupLogService = Depends(get_group_log_service),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """
     Takes user out of group (this would be the route you theoretically call as an user)
     """
-
-    response = user_group_service.delete_user_from_group(requester_id, group_id)
-    if response.success:
-        log_service.log_leave(group_id, requester_id)
-
-    return response
+    return await uow.run(user_group_service.delete_user_from_group, requester_id, group_id)
 
 
 @router.delete("/{group_id}/users/{user_id}")
-def remove_user_from_group(
+async def remove_user_from_group(
     group_id: int,
     user_id: int,
     user_group_service: IUserGroupService = Depends(get_user_group_service),
-    log_service: IGroupLogService = Depends(get_group_log_service),
+    uow: UnitOfWork = Depends(get_unit_of_work),
 ):
     """
     Takes user out of group (this is more of an admin route, use the one above for leaving a group)
     """
-    response = user_group_service.delete_user_from_group(user_id, group_id)
-    if response.success:
-        log_service.log_leave(group_id, user_id)
-    
-    return response
+    return await uow.run(user_group_service.delete_user_from_group, user_id, group_id)
 
 
 @router.get("/user/{user_id}")
-def get_groups_by_user(
+async def get_groups_by_user(
     user_id: int,
-    user_group_service: IUserGroupService = Depends(get_user_group_service)
+    request: Request,
+    response: Response,
+    user_group_service: IUserGroupService = Depends(get_user_group_service),
+    version_service: IResourceVersionService = Depends(get_resource_version_service)
 ):
     """
-    Returns the groups a user is part of.
+    Returns the groups a user is part of, or 304 when If-None-Match still matches.
     """
-    return user_group_service.get_user_groups(user_id)
+    etag = await run_db_call(version_service.get_user_groups_etag, user_id, representation_key(request))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+
+    return await run_db_call(user_group_service.get_user_groups, user_id)
 
 
 @router.get("/{group_id}/users")
-def get_users_by_group(
+async def get_users_by_group(
     group_id: int,
-    user_group_service: IUserGroupService = Depends(get_user_group_service)
+    request: Request,
+    response: Response,
+    user_group_service: IUserGroupService = Depends(get_user_group_service),
+    version_service: IResourceVersionService = Depends(get_resource_version_service)
 ):
     """
-    Returns all users in a group
+    Returns all users in a group, or 304 when If-None-Match still matches
     """
-    return user_group_service.get_users_from_group(group_id)
+    etag = await run_db_call(version_service.get_group_users_etag, group_id, representation_key(request))
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+
+    return await run_db_call(user_group_service.get_users_from_group, group_id)
 
 
 @router.get("/{group_id}/users/nr")
-def get_nr_of_users_from_group(
+async def get_nr_of_users_from_group(
     group_id: int,
     user_group_service: IUserGroupService = Depends(get_user_group_service)
 ):
     """
     Returns number of users in a group
     """
-    return user_group_service.get_nr_of_users_from_group(group_id)
+    return await run_db_call(user_group_service.get_nr_of_users_from_group, group_id)
 
 
 @router.get("/{group_id}/expenses")
-def get_expenses_by_group(
+async def get_expenses_by_group(
         group_id: int,
         offset: int = 0,
         limit: int = 100,
@@ -153,24 +170,58 @@ def get_expenses_by_group(
     """
     Returns expenses by group
     """
-    return expense_service.get_group_expenses(group_id, offset, limit, sort_by, order)
+    return await run_db_call(expense_service.get_group_expenses, group_id, offset, limit, sort_by, order)
 
 
 @router.get("/{group_id}/invite-qr")
-def get_group_invite_qr(group_id: int, group_service: IGroupService = Depends(get_group_service)):
+async def get_group_invite_qr(group_id: int, group_service: IGroupService = Depends(get_group_service)):
     """
-    Returns QR code for joining group
+    Returns QR code for joining group, base64 encoded in the JSON envelope
     """
-    return group_service.generate_invite_qr(group_id)
+    invitation_code = await run_db_call(group_service.get_invitation_code, group_id)
+
+    return await run_in_threadpool(group_service.generate_invite_qr, invitation_code)
+
+
+@router.get("/{group_id}/invite-qr.{image_format}")
+async def get_group_invite_qr_image(
+    group_id: int,
+    request: Request,
+    image_format: str = Path(..., pattern="^(png|svg)$"),
+    v: Optional[str] = Query(None, description="version of the invitation code, from the Content-Location header"),
+    group_service: IGroupService = Depends(get_group_service)
+):
+    """
+    Returns QR code for joining group as a PNG or SVG image. Content-Location carries the
+    versioned URL of the image, which browsers may keep for long; any other URL is revalidated
+    with the ETag before every use.
+    """
+    invitation_code = await run_db_call(group_service.get_invitation_code, group_id)
+    version = invite_qr_version(invitation_code)
+    etag = invite_qr_etag(invitation_code, image_format)
+    cache_control = INVITE_QR_CACHE_CONTROL if v == version else CACHE_CONTROL
+    content_location = f"{request.url.path}?v={version}"
+    if is_not_modified(request, etag):
+        response = not_modified_response(etag, cache_control)
+        response.headers["Content-Location"] = content_location
+        return response
+
+    image = await run_in_threadpool(group_service.get_invite_qr, invitation_code, image_format)
+
+    return Response(
+        content=image.content,
+        media_type=image.media_type,
+        headers={"ETag": image.etag, "Cache-Control": cache_control, "Content-Location": content_location}
+    )
 
 
 @router.get("/{group_id}/statistics/user-summary")
-def get_user_group_statistics(
+async def get_user_group_statistics(
     group_id: int,
-    user_id: int = Depends(JwtUtils.auth_wrapper),
+    user_id: int = Depends(get_current_user_id),
     expense_service: IExpenseService = Depends(get_expense_service)
 ):
     """
     Returns statistics for the authenticated user within a specific group.
     """
-    return expense_service.get_user_group_statistics(user_id, group_id)
\ No newline at end of file
+    return await run_db_call(expense_service.get_user_group_statistics, user_id, group_id)
\ No newline at end of file
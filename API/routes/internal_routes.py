@@ -0,0 +1,70 @@
+import hmac
+import os
+
+from database import get_pool_stats
+from fastapi import APIRouter, Depends, Header, HTTPException
+from schemas.api_response import APIResponse
+from utils.helpers.category_cache import category_cache
+from utils.helpers.constants import STATUS_FORBIDDEN, STATUS_NOT_FOUND
+from utils.helpers.invite_qr import invite_qr_cache
+from utils.helpers.jwt_utils import verified_tokens
+from utils.helpers.keyword_classifier import keyword_classifier_cache
+from utils.helpers.membership_cache import membership_cache
+from utils.helpers.model_client import receipt_model_client
+from utils.helpers.prompt_cache import prompt_context_cache
+from utils.helpers.receipt_cache import receipt_result_cache
+
+router = APIRouter(tags=["Internal"])
+
+INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
+
+def require_internal_key(x_internal_key: str = Header(None)) -> None:
+    """
+    Guards the internal endpoints. They fail closed: without INTERNAL_API_KEY configured
+    they do not exist, with it the request needs a matching X-Internal-Key header.
+    """
+    if not INTERNAL_API_KEY:
+        raise HTTPException(status_code=STATUS_NOT_FOUND, detail="Not Found")
+    if x_internal_key is None or not hmac.compare_digest(x_internal_key.encode(), INTERNAL_API_KEY.encode()):
+        raise HTTPException(status_code=STATUS_FORBIDDEN, detail="Not allowed.")
+
+@router.get("/pool-stats", dependencies=[Depends(require_internal_key)])
+async def pool_stats():
+    """
+    Returns live connection pool statistics (checkout wait, in use, overflow) of this worker.
+    """
+    return APIResponse(
+        success=True,
+        data=get_pool_stats()
+    )
+
+
+@router.get("/cache-stats", dependencies=[Depends(require_internal_key)])
+async def cache_stats():
+    """
+    Returns size and hit/miss counters of the in-process caches of this worker.
+    """
+    return APIResponse(
+        success=True,
+        data={
+            "auth_tokens": verified_tokens.stats(),
+            "categories": category_cache.stats(),
+            "memberships": membership_cache.stats(),
+            "invite_qr": invite_qr_cache.stats(),
+            "receipts": receipt_result_cache.stats(),
+            "receipt_classifier": keyword_classifier_cache.stats(),
+            "receipt_prompt_contexts": prompt_context_cache.stats(),
+        }
+    )
+
+
+@router.get("/model-stats", dependencies=[Depends(require_internal_key)])
+async def model_stats():
+    """
+    Returns the circuit breaker state of the receipt model client of this worker, and the
+    input tokens and latency of its calls with and without a cached context.
+    """
+    return APIResponse(
+        success=True,
+        data={"receipt_model": receipt_model_client.stats()}
+    )
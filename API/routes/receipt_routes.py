@@ -1,16 +1,67 @@
-from dependencies.di import get_receipt_service
-from fastapi import APIRouter, Depends, File, Request, UploadFile
-from services.receipt_service import IReceiptService
-from utils.helpers.jwt_utils import JwtUtils
+import json
+from typing import List
+
+from database import UnitOfWork, run_db_call
+from dependencies.di import (
+    get_current_user_id,
+    get_receipt_job_service,
+    get_receipt_service,
+    get_unit_of_work,
+)
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from services.receipt_job_service import IReceiptJobService
+from services.receipt_service import RECEIPT_BATCH_MAX_IMAGES, IReceiptService
+from utils.helpers.constants import STATUS_ACCEPTED, STATUS_BAD_REQUEST
+from utils.helpers.receipt_image import check_upload_size
+from workers.receipt_job_worker import receipt_job_workers
 
 router = APIRouter(tags=["Receipt"])
 
-def get_current_user_id(request: Request) -> int:
+@router.post("/process-receipt")
+async def process_receipt(image: UploadFile = File(...), user_id: int = Depends(get_current_user_id), receipt_service: IReceiptService = Depends(get_receipt_service)):
+    # the category lookup is database work, the model call is plain blocking I/O and stays in the threadpool
+    categories = await run_db_call(receipt_service.load_user_categories, user_id)
+    return await run_in_threadpool(receipt_service.process_receipt_photo, image, user_id, categories)
+
+@router.post("/process-receipts")
+async def process_receipts(images: List[UploadFile] = File(...), stream: bool = False, user_id: int = Depends(get_current_user_id), receipt_service: IReceiptService = Depends(get_receipt_service)):
     """
-    Returns the authenticated user id.
+    Analyzes a stack of receipt photos with one category lookup and one prompt.
+    Returns every result in upload order, or with stream=true sends each one as an NDJSON line as soon as it is ready.
     """
-    return JwtUtils.auth_wrapper(request)
+    if len(images) > RECEIPT_BATCH_MAX_IMAGES:
+        raise HTTPException(status_code=STATUS_BAD_REQUEST, detail=f"At most {RECEIPT_BATCH_MAX_IMAGES} images can be processed at once.")
 
-@router.post("/process-receipt")
-def process_receipt(image: UploadFile = File(...), user_id: int = Depends(get_current_user_id), receipt_service: IReceiptService = Depends(get_receipt_service)):
-    return receipt_service.process_receipt_photo(image, user_id)
+    for image in images:
+        check_upload_size(image)
+    batch = [(image.filename, await image.read()) for image in images]
+    categories = await run_db_call(receipt_service.load_user_categories, user_id)
+    results = receipt_service.analyze_receipt_batch(batch, user_id, categories)
+
+    if stream:
+        # the generator is advanced in the threadpool, closing it on disconnect drops the photos not started yet
+        return StreamingResponse((json.dumps(entry) + "\n" for entry in results), media_type="application/x-ndjson")
+
+    entries = await run_in_threadpool(list, results)
+    return {"results": sorted(entries, key=lambda entry: entry["index"])}
+
+@router.post("/jobs", status_code=STATUS_ACCEPTED)
+async def create_receipt_job(image: UploadFile = File(...), user_id: int = Depends(get_current_user_id), job_service: IReceiptJobService = Depends(get_receipt_job_service), uow: UnitOfWork = Depends(get_unit_of_work)):
+    """
+    Queues a receipt photo and returns the job id right away, poll GET /receipt/jobs/{id} for the result.
+    """
+    check_upload_size(image)
+    image_bytes = await image.read()
+    response = await uow.run(job_service.submit_job, image_bytes, user_id)
+    # the job is committed, wake an idle worker of this process instead of waiting for its next poll
+    receipt_job_workers.notify()
+    return response
+
+@router.get("/jobs/{job_id}")
+async def get_receipt_job(job_id: int, user_id: int = Depends(get_current_user_id), job_service: IReceiptJobService = Depends(get_receipt_job_service)):
+    """
+    Returns the status of a receipt job, and its result once it succeeded.
+    """
+    return await run_db_call(job_service.get_job, job_id, user_id)
@@ -6,4 +6,8 @@ from pydantic import BaseModel
 class APIResponse(BaseModel):
     success: bool = True
     message: Optional[str] = None
-    data: Optional[Any] = None
\ No newline at end of file
+    data: Optional[Any] = None
+
+class PaginatedAPIResponse(APIResponse):
+    # pass it back as ?cursor= to get the next page, None on the last page
+    next_cursor: Optional[str] = None
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -46,3 +46,22 @@ class ExpenseResponse(ExpenseBase):
 
     class Config:
         from_attributes = True
+
+
+class ReceiptExpenseItem(BaseModel):
+    """
+    One item of a parsed receipt, as the receipt endpoints return it
+    """
+    name: str = Field(..., max_length=255)
+    price: float = Field(..., gt=0)
+    category: str = Field(..., min_length=1, max_length=30)
+    keywords: List[str] = []
+    description: Optional[str] = None
+
+
+class ReceiptExpensesCreate(BaseModel):
+    """
+    DTO for creating the expenses of a whole receipt at once
+    """
+    items: List[ReceiptExpenseItem] = Field(..., min_length=1, max_length=200)
+    group_id: Optional[int] = Field(None, description="Group these expenses belong to")
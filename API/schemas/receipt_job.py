@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+
+class ReceiptJobResponse(BaseModel):
+    """
+    DTO for the status of a receipt job. result holds the receipt analysis once the job succeeded.
+    """
+    id: int
+    status: str
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
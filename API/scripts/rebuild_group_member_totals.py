@@ -0,0 +1,47 @@
+"""
+Backfills and checks the group_member_totals table.
+
+Run from the API directory:
+    python -m scripts.rebuild_group_member_totals            recompute every total from the expenses
+    python -m scripts.rebuild_group_member_totals --verify   only report members whose total drifted
+"""
+import argparse
+import sys
+
+from database import SessionLocal
+from repositories.group_member_total_repository import GroupMemberTotalRepository
+
+
+def verify(repository: GroupMemberTotalRepository) -> int:
+    mismatches = repository.find_mismatches()
+    for group_id, user_id, stored, actual in mismatches:
+        print(f"group {group_id} user {user_id}: stored {stored}, expenses say {actual}")
+
+    print(f"{len(mismatches)} mismatched member totals")
+    return 1 if mismatches else 0
+
+
+def rebuild(repository: GroupMemberTotalRepository) -> int:
+    rows = repository.rebuild()
+    repository.db.commit()
+
+    print(f"rebuilt {rows} member totals")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verify", action="store_true", help="compare against the expenses without writing")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        repository = GroupMemberTotalRepository(db)
+        return verify(repository) if args.verify else rebuild(repository)
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
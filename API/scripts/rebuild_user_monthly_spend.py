@@ -0,0 +1,47 @@
+"""
+Backfills and checks the user_monthly_spend table.
+
+Run from the API directory:
+    python -m scripts.rebuild_user_monthly_spend            recompute every month from the expenses
+    python -m scripts.rebuild_user_monthly_spend --verify   only report months whose spend drifted
+"""
+import argparse
+import sys
+
+from database import SessionLocal
+from repositories.user_monthly_spend_repository import UserMonthlySpendRepository
+
+
+def verify(repository: UserMonthlySpendRepository) -> int:
+    mismatches = repository.find_mismatches()
+    for user_id, month, stored, actual in mismatches:
+        print(f"user {user_id} {month:%Y-%m}: stored {stored}, expenses say {actual}")
+
+    print(f"{len(mismatches)} mismatched months")
+    return 1 if mismatches else 0
+
+
+def rebuild(repository: UserMonthlySpendRepository) -> int:
+    rows = repository.rebuild()
+    repository.db.commit()
+
+    print(f"rebuilt {rows} user months")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verify", action="store_true", help="compare against the expenses without writing")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        repository = UserMonthlySpendRepository(db)
+        return verify(repository) if args.verify else rebuild(repository)
+    finally:
+        db.rollback()
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,13 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 from fastapi import HTTPException
 from models.category import Category
 from repositories.category_repository import ICategoryRepository
+from repositories.user_monthly_spend_repository import IUserMonthlySpendRepository
 from schemas.api_response import APIResponse
 from schemas.category import CategoryCreate, CategoryResponse, CategoryUpdate
+from utils.helpers.category_cache import CategoryCache
 from utils.helpers.constants import (
     ID_FIELD,
     STATUS_BAD_REQUEST,
@@ -28,9 +31,16 @@ class ICategoryService(ABC):
     def delete_category(self, category_id: int, requester_id: int) -> APIResponse: ...
 
 class CategoryService(ICategoryService):
-    def __init__(self, repository: ICategoryRepository):
+    def __init__(self, repository: ICategoryRepository, category_cache: Optional[CategoryCache] = None, spend_repository: Optional[IUserMonthlySpendRepository] = None):
         self.logger = Logger()
         self.repository = repository
+        self.category_cache = category_cache
+        self.spend_repository = spend_repository
+
+    def _invalidate_cache(self, user_id: int) -> None:
+        # only once committed, otherwise a concurrent read could cache the old rows again
+        if self.category_cache:
+            self.repository.after_commit(lambda: self.category_cache.invalidate(user_id))
 
     def _validate_category(self, category_id: int) -> Category:
         category = self.repository.get_by_id(category_id)
@@ -57,6 +67,7 @@ class CategoryService(ICategoryService):
             keywords = data.keywords
         )
         id = self.repository.add(category)
+        self._invalidate_cache(user_id)
         return APIResponse(
             success=True,
             data={
@@ -92,6 +103,7 @@ class CategoryService(ICategoryService):
         if not fields:
             raise HTTPException(status_code=STATUS_BAD_REQUEST, detail="No fields provided for update")
         id = self.repository.update(category_id, fields)
+        self._invalidate_cache(requester_id)
         return APIResponse(
             success=True,
             data={
@@ -103,7 +115,11 @@ class CategoryService(ICategoryService):
         self.logger.info(f"Deleting category with id {category_id}")
 
         self._validate_owner(category_id, requester_id)
+        # its expenses are deleted with it, take them out of the monthly spend first
+        if self.spend_repository:
+            self.spend_repository.subtract_category_expenses(category_id)
         self.repository.delete(category_id)
+        self._invalidate_cache(requester_id)
         return APIResponse(
             success=True
         )
@@ -1,16 +1,29 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
 
 from fastapi import HTTPException
 from models.category import Category
 from models.expense import Expense
 from models.group import Group
 from repositories.category_repository import ICategoryRepository
-from repositories.expense_repository import IExpenseRepository
+from repositories.expense_repository import IExpenseRepository, resolve_sort_field
+from repositories.group_member_total_repository import IGroupMemberTotalRepository
 from repositories.group_repository import IGroupRepository
 from repositories.user_group_repository import IUserGroupRepository
-from schemas.api_response import APIResponse
-from schemas.expense import ExpenseCreate, ExpenseResponse, ExpenseUpdate
+from repositories.user_monthly_spend_repository import IUserMonthlySpendRepository
+from schemas.api_response import APIResponse, PaginatedAPIResponse
+from schemas.expense import (
+    ExpenseCreate,
+    ExpenseResponse,
+    ExpenseUpdate,
+    ReceiptExpensesCreate,
+)
+from sqlalchemy.exc import IntegrityError
+from utils.helpers.category_cache import CategoryCache
 from utils.helpers.constants import (
+    CREATED_CATEGORIES_FIELD,
+    EXPENSE_IDS_FIELD,
     ID_FIELD,
     MY_SHARE_OF_EXPENSES,
     MY_TOTAL_PAID,
@@ -20,6 +33,25 @@ from utils.helpers.constants import (
     STATUS_NOT_FOUND,
     TOTAL_GROUP_SPEND,
 )
+from utils.helpers.cursor import encode_cursor
+
+# SQLSTATE of a foreign key violation, both psycopg2 and asyncpg errors carry it as pgcode
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def _is_missing_category(error: IntegrityError) -> bool:
+    """
+    Tells whether a write failed because its category no longer exists.
+    """
+    orig = error.orig
+    return getattr(orig, "pgcode", None) == FOREIGN_KEY_VIOLATION and "categor" in str(orig)
+
+
+def _category_key(title: str) -> str:
+    """
+    Compares category titles the way a user reads them, "Food " and "food" are the same category.
+    """
+    return title.strip().casefold()
 
 
 class IExpenseService(ABC):
@@ -28,18 +60,60 @@ class IExpenseService(ABC):
     """
     @abstractmethod
     def create_expense(self, data: ExpenseCreate, user_id: int) -> APIResponse: ...
+
+    @abstractmethod
+    def create_expenses_from_receipt(self, data: ReceiptExpensesCreate, user_id: int) -> APIResponse: ...
     
     @abstractmethod
     def get_expense_by_id(self, expense_id: int) -> APIResponse: ...
     
     @abstractmethod
-    def get_all_expenses(self, *args, **kwargs) -> APIResponse: ...
+    def get_all_expenses(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        sort_by: str = "created_at",
+        order: str = "desc",
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        category: Optional[str] = None,
+        cursor: Optional[Tuple[Any, int]] = None
+    ) -> PaginatedAPIResponse: ...
     
     @abstractmethod
-    def get_user_expenses(self, *args, **kwargs) -> APIResponse: ...
+    def get_user_expenses(
+        self,
+        user_id: int,
+        offset: int = 0,
+        limit: int = 100,
+        sort_by: str = "created_at",
+        order: str = "desc",
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        category: Optional[str] = None,
+        group_ids: Optional[List[int]] = None,
+        cursor: Optional[Tuple[Any, int]] = None
+    ) -> PaginatedAPIResponse: ...
     
     @abstractmethod
-    def get_group_expenses(self, *args, **kwargs) -> APIResponse: ...
+    def get_group_expenses(
+        self,
+        group_id: int,
+        offset: int = 0,
+        limit: int = 100,
+        sort_by: str = "created_at",
+        order: str = "desc",
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        category: Optional[str] = None,
+        cursor: Optional[Tuple[Any, int]] = None
+    ) -> PaginatedAPIResponse: ...
     
     @abstractmethod
     def update_expense(self, expense_id: int, data: ExpenseUpdate, requester_id: int) -> APIResponse: ...
@@ -55,7 +129,7 @@ class ExpenseService(IExpenseService):
     """
     Implementation for the interface
     """
-    def __init__(self, repository: IExpenseRepository, group_repository: IGroupRepository, user_group_repository: IUserGroupRepository, category_repository: ICategoryRepository):
+    def __init__(self, repository: IExpenseRepository, group_repository: IGroupRepository, user_group_repository: IUserGroupRepository, category_repository: ICategoryRepository, totals_repository: Optional[IGroupMemberTotalRepository] = None, category_cache: Optional[CategoryCache] = None, spend_repository: Optional[IUserMonthlySpendRepository] = None):
         """
         Constructor method
         """
@@ -63,6 +137,20 @@ class ExpenseService(IExpenseService):
         self.group_repository = group_repository
         self.user_group_repository = user_group_repository
         self.category_repository = category_repository
+        self.totals_repository = totals_repository
+        self.category_cache = category_cache
+        self.spend_repository = spend_repository
+
+    def _track_totals(self, group_id: Optional[int], user_id: int, created_at: Optional[datetime], amount_delta: float, count_delta: int) -> None:
+        """
+        Internal method for keeping the running group totals and monthly spend in step with an expense write.
+        It runs in the same transaction as the write, so both commit or roll back together.
+        created_at is None for an expense inserted in this transaction.
+        """
+        if self.totals_repository and group_id is not None:
+            self.totals_repository.add_delta(group_id, user_id, amount_delta, count_delta)
+        if self.spend_repository:
+            self.spend_repository.add_delta(user_id, created_at, amount_delta, count_delta)
 
     def _validate_expense(self, expense_id: int) -> Expense:
         """
@@ -104,10 +192,21 @@ class ExpenseService(IExpenseService):
         
         return expense
 
-    def _validate_category(self, category_id: int, requester_id: int) -> Category:
+    def _validate_category(self, category_id: int, requester_id: int) -> Optional[Category]:
         """
-        Internal method for validating that a category exists
+        Internal method for validating that a category exists.
+        A cached snapshot may still list a category another worker just deleted, writes go
+        through _write_with_category so the foreign key turns that into a 404 as well.
         """
+        # the common case, one of the requester's own categories, is answered from the cache
+        if self.category_cache:
+            snapshot = self.category_cache.get(
+                requester_id,
+                lambda: self.category_repository.get_by_user(requester_id, "title", "asc")
+            )
+            if category_id in snapshot:
+                return None
+
         category = self.category_repository.get_by_id(category_id)
         if not category:
             raise HTTPException(status_code=STATUS_NOT_FOUND, detail="Category not found")
@@ -116,6 +215,17 @@ class ExpenseService(IExpenseService):
 
         return category
 
+    def _write_with_category(self, write, *args):
+        """
+        Internal method for running a repository write that references a validated category.
+        """
+        try:
+            return write(*args)
+        except IntegrityError as error:
+            if _is_missing_category(error):
+                raise HTTPException(status_code=STATUS_NOT_FOUND, detail="Category not found")
+            raise
+
     def create_expense(self, data: ExpenseCreate, user_id: int) -> APIResponse:
         """
         Method for creating an expense
@@ -128,7 +238,8 @@ class ExpenseService(IExpenseService):
             self._validate_group(data.group_id)
         self._validate_category(data.category_id, user_id)
 
-        id = self.repository.add(expense)
+        id = self._write_with_category(self.repository.add, expense)
+        self._track_totals(expense.group_id, user_id, None, expense.amount, 1)
         
         return APIResponse(
             success=True,
@@ -137,6 +248,64 @@ class ExpenseService(IExpenseService):
             }
         )
 
+    def create_expenses_from_receipt(self, data: ReceiptExpensesCreate, user_id: int) -> APIResponse:
+        """
+        Method for creating every item of a parsed receipt as an expense, together with the
+        categories the receipt introduced. Categories and expenses are each inserted with one
+        statement, in the transaction of the request.
+        """
+        if data.group_id is not None:
+            self._validate_group(data.group_id)
+
+        # read from the database, not the cache: the new rows must not duplicate or reference stale categories
+        categories = self.category_repository.get_by_user(user_id, "title", "asc")
+        category_ids = {_category_key(category.title): category.id for category in categories}
+        used_keywords = {keyword.casefold() for category in categories for keyword in category.keywords or ()}
+
+        new_categories = {}
+        for item in data.items:
+            key = _category_key(item.category)
+            if key in category_ids or key in new_categories:
+                continue
+            # keywords must not overlap between a user's categories, like create_category enforces
+            keywords = [
+                keyword for keyword in dict.fromkeys(keyword.strip() for keyword in item.keywords)
+                if keyword and keyword.casefold() not in used_keywords
+            ]
+            used_keywords.update(keyword.casefold() for keyword in keywords)
+            new_categories[key] = {"user_id": user_id, "title": item.category.strip(), "keywords": keywords}
+
+        created = {}
+        if new_categories:
+            ids = self.category_repository.add_many(list(new_categories.values()))
+            for key, category_id in zip(new_categories, ids):
+                category_ids[key] = category_id
+                created[new_categories[key]["title"]] = category_id
+            if self.category_cache:
+                self.category_repository.after_commit(lambda: self.category_cache.invalidate(user_id))
+
+        expense_ids = self._write_with_category(self.repository.add_many, [
+            {
+                "user_id": user_id,
+                "group_id": data.group_id,
+                "title": item.name,
+                "amount": item.price,
+                "description": item.description,
+                "category_id": category_ids[_category_key(item.category)],
+            }
+            for item in data.items
+        ])
+        # one delta for the whole receipt, a single upsert per totals table
+        self._track_totals(data.group_id, user_id, None, sum(item.price for item in data.items), len(expense_ids))
+
+        return APIResponse(
+            success=True,
+            data={
+                EXPENSE_IDS_FIELD: expense_ids,
+                CREATED_CATEGORIES_FIELD: created
+            }
+        )
+
     def get_expense_by_id(self, expense_id: int) -> APIResponse:
         """
         Method for returning an expense by its id
@@ -150,57 +319,116 @@ class ExpenseService(IExpenseService):
             data=expense_response
         )
 
-    def get_all_expenses(self, *args, **kwargs) -> APIResponse:
+    def _paginated_response(self, expenses: List[Expense], limit: int, sort_by: str, order: str) -> PaginatedAPIResponse:
         """
-        Method for returning all expenses
+        Internal method for wrapping a page of expenses, with the cursor of the next page
+        when this one came back full.
         """
-        expenses = self.repository.get_all(*args, **kwargs)
-        
-        expenses_response = [ExpenseResponse.model_validate(expense) for expense in expenses]
-        
-        return APIResponse(
+        next_cursor = None
+        if expenses and len(expenses) == limit:
+            last = expenses[-1]
+            sort_field = resolve_sort_field(sort_by)
+            value = getattr(last, sort_field)
+            if sort_field == "title" and value is None:
+                value = ""
+            next_cursor = encode_cursor(sort_by, order.lower(), value, last.id)
+
+        return PaginatedAPIResponse(
             success=True,
-            data=expenses_response
+            data=[ExpenseResponse.model_validate(expense) for expense in expenses],
+            next_cursor=next_cursor
+        )
+
+    def get_all_expenses(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        sort_by: str = "created_at",
+        order: str = "desc",
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        category: Optional[str] = None,
+        cursor: Optional[Tuple[Any, int]] = None
+    ) -> PaginatedAPIResponse:
+        """
+        Method for returning all expenses
+        """
+        expenses = self.repository.get_all(
+            offset, limit, sort_by, order,
+            min_price, max_price, date_from, date_to, category,
+            cursor=cursor
         )
 
-    def get_user_expenses(self, *args, **kwargs) -> APIResponse:
+        return self._paginated_response(expenses, limit, sort_by, order)
+
+    def get_user_expenses(
+        self,
+        user_id: int,
+        offset: int = 0,
+        limit: int = 100,
+        sort_by: str = "created_at",
+        order: str = "desc",
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        category: Optional[str] = None,
+        group_ids: Optional[List[int]] = None,
+        cursor: Optional[Tuple[Any, int]] = None
+    ) -> PaginatedAPIResponse:
         """
         Method for returing user expenses
         """
-        expenses = self.repository.get_by_user(*args, **kwargs)
-        
-        expenses_response = [ExpenseResponse.model_validate(expense) for expense in expenses]
-        
-        return APIResponse(
-            success=True,
-            data=expenses_response
+        expenses = self.repository.get_by_user(
+            user_id, offset, limit, sort_by, order,
+            min_price, max_price, date_from, date_to, category, group_ids,
+            cursor=cursor
         )
 
-    def get_group_expenses(self, group_id: int, *args, **kwargs) -> APIResponse:
+        return self._paginated_response(expenses, limit, sort_by, order)
+
+    def get_group_expenses(
+        self,
+        group_id: int,
+        offset: int = 0,
+        limit: int = 100,
+        sort_by: str = "created_at",
+        order: str = "desc",
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        category: Optional[str] = None,
+        cursor: Optional[Tuple[Any, int]] = None
+    ) -> PaginatedAPIResponse:
         """
         Method for returning group expenses
         """
         self._validate_group(group_id)
-        expenses = self.repository.get_by_group(group_id, *args, **kwargs)
-        
-        expenses_response = [ExpenseResponse.model_validate(expense) for expense in expenses]
-
-        return APIResponse(
-            success=True,
-            data=expenses_response
+        expenses = self.repository.get_by_group(
+            group_id, offset, limit, sort_by, order,
+            min_price, max_price, date_from, date_to, category,
+            cursor=cursor
         )
 
+        return self._paginated_response(expenses, limit, sort_by, order)
+
     def update_expense(self, expense_id: int, data: ExpenseUpdate, requester_id: int) -> APIResponse:
         """
         Method for updating an expense. It checks that the user owns the expense.
         """
-        self._validate_owner(expense_id, requester_id)
+        expense = self._validate_owner(expense_id, requester_id)
         self._validate_category(data.category_id, requester_id)
 
         fields = data.model_dump(exclude_unset=True)
         fields.pop("user_id", None)
         
-        id = self.repository.update(expense_id, fields)
+        previous_amount, created_at = expense.amount, expense.created_at
+        id = self._write_with_category(self.repository.update, expense_id, fields)
+        if expense.amount != previous_amount:
+            self._track_totals(expense.group_id, expense.user_id, created_at, expense.amount - previous_amount, 0)
         
         return APIResponse(
             success=True,
@@ -213,9 +441,11 @@ class ExpenseService(IExpenseService):
         """
         Method for deleting an expense. It checks that the user owns the expense.
         """
-        self._validate_owner(expense_id, requester_id)
+        expense = self._validate_owner(expense_id, requester_id)
+        group_id, user_id, amount, created_at = expense.group_id, expense.user_id, expense.amount, expense.created_at
         
         id = self.repository.delete(expense_id)
+        self._track_totals(group_id, user_id, created_at, -amount, -1)
         
         return APIResponse(
             success=True,
@@ -231,14 +461,12 @@ class ExpenseService(IExpenseService):
         self._validate_group(group_id)
         self._validate_user_is_in_group(user_id, group_id)
 
-        group_expenses = self.repository.get_by_group(group_id, offset=0, limit=100000)
-        total_group_spend = sum(e.amount for e in group_expenses)
-
-        my_expenses = [e for e in group_expenses if e.user_id == user_id]
-        my_total_paid = sum(e.amount for e in my_expenses)
+        if self.totals_repository:
+            total_group_spend, my_total_paid, member_count = self.totals_repository.get_group_statistics(group_id, user_id)
+        else:
+            total_group_spend, my_total_paid, member_count = self.repository.get_group_statistics(group_id, user_id)
         
         rest_of_expenses = total_group_spend - my_total_paid
-        member_count = self.user_group_repository.get_nr_of_users_from_group(group_id)
 
         my_share = 0
         if member_count > 0:
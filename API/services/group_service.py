@@ -1,15 +1,16 @@
-import io
+import base64
 from abc import ABC, abstractmethod
+from typing import Optional
 
-import qrcode
 from fastapi import HTTPException
 from models.group import Group
 from repositories.group_repository import IGroupRepository
+from repositories.user_monthly_spend_repository import IUserMonthlySpendRepository
 from schemas.api_response import APIResponse
 from schemas.group import GroupCreate, GroupResponse, GroupUpdate
 from utils.helpers.constants import ID_FIELD, STATUS_BAD_REQUEST, STATUS_NOT_FOUND
 from utils.helpers.generate_invitation_code import generate_invitation_code
-import base64
+from utils.helpers.invite_qr import InviteQRCache, QRImage, render_invite_qr
 
 
 class IGroupService(ABC):
@@ -33,15 +34,30 @@ class IGroupService(ABC):
     def delete_group(self, group_id: int) -> APIResponse: ...
     
     @abstractmethod
-    def generate_invite_qr(self, group_id: int) -> APIResponse: ...
+    def get_invitation_code(self, group_id: int) -> str: ...
+
+    @abstractmethod
+    def get_invite_qr(self, invitation_code: str, image_format: str) -> QRImage: ...
+
+    @abstractmethod
+    def generate_invite_qr(self, invitation_code: str) -> APIResponse: ...
 
 
 class GroupService(IGroupService):
-    def __init__(self, repository: IGroupRepository):
+    def __init__(
+        self,
+        repository: IGroupRepository,
+        qr_cache: Optional[InviteQRCache] = None,
+        prerender_qr: bool = False,
+        spend_repository: Optional[IUserMonthlySpendRepository] = None,
+    ):
         """
         Constructor method.
         """
         self.repository = repository
+        self.qr_cache = qr_cache
+        self.prerender_qr = prerender_qr
+        self.spend_repository = spend_repository
 
     def _validate_group(self, group_id: int):
         group = self.repository.get_by_id(group_id)
@@ -65,6 +81,9 @@ class GroupService(IGroupService):
         )
 
         id = self.repository.add(group)
+
+        if self.qr_cache and self.prerender_qr:
+            self.repository.after_commit(lambda: self.qr_cache.prerender(code))
         
         return APIResponse(
             success=True,
@@ -122,10 +141,12 @@ class GroupService(IGroupService):
 
     def delete_group(self, group_id: int) -> APIResponse:
         """
-        Method for deleting a group.
+        Method for deleting a group. Its expenses are deleted with it, so they leave the monthly spend first.
         """
         self._validate_group(group_id)
-        
+
+        if self.spend_repository:
+            self.spend_repository.subtract_group_expenses(group_id)
         id = self.repository.delete(group_id)
         
         return APIResponse(
@@ -135,29 +156,31 @@ class GroupService(IGroupService):
             }
         )
 
-    def generate_invite_qr(self, group_id: int) -> APIResponse:
+    def get_invitation_code(self, group_id: int) -> str:
         """
-        Method for generating qr code for group invite.
+        Method for retrieving the invitation code of a group.
         """
         group = self._validate_group(group_id)
-        
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(group.invitation_code)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        buffer.seek(0)
-        
-        # fastapi is throwing error when returning bytes directly, so encode it to base64
-        b64_bytes = base64.b64encode(buffer.read()).decode("utf-8")
+
+        return group.invitation_code
+
+    def get_invite_qr(self, invitation_code: str, image_format: str) -> QRImage:
+        """
+        Method for the QR code of an invitation code, rendered once and then served from the cache.
+        Rendering is CPU bound, call it from a worker thread.
+        """
+        if self.qr_cache:
+            return self.qr_cache.get(invitation_code, image_format)
+
+        return QRImage(invitation_code, image_format, render_invite_qr(invitation_code, image_format))
+
+    def generate_invite_qr(self, invitation_code: str) -> APIResponse:
+        """
+        Method for the base64 encoded PNG QR code, kept for clients that read it from JSON.
+        """
+        image = self.get_invite_qr(invitation_code, "png")
 
         return APIResponse(
             success=True,
-            data=b64_bytes
+            data=base64.b64encode(image.content).decode("utf-8")
         )
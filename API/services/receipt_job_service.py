@@ -0,0 +1,153 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from models.receipt_job import ReceiptJob
+from repositories.receipt_job_repository import IReceiptJobRepository
+from schemas.api_response import APIResponse
+from schemas.receipt_job import ReceiptJobResponse
+from utils.helpers.constants import (
+    ID_FIELD,
+    STATUS_BAD_REQUEST,
+    STATUS_NOT_FOUND,
+    STATUS_SERVICE_UNAVAILABLE,
+)
+from utils.helpers.logger import Logger
+from utils.helpers.receipt_image import check_receipt_image
+
+from services.receipt_service import IReceiptService
+
+
+class IReceiptJobService(ABC):
+    @abstractmethod
+    def submit_job(self, image_bytes: bytes, user_id: int) -> APIResponse: ...
+
+    @abstractmethod
+    def get_job(self, job_id: int, user_id: int) -> APIResponse: ...
+
+    @abstractmethod
+    def claim_job(self) -> Optional[ReceiptJob]: ...
+
+    @abstractmethod
+    def load_categories(self, job: ReceiptJob) -> dict[str, List[str]]: ...
+
+    @abstractmethod
+    def run_job(self, job: ReceiptJob, categories: Optional[dict[str, List[str]]] = None) -> None: ...
+
+    @abstractmethod
+    def clean_up(self) -> Tuple[int, int]: ...
+
+
+class ReceiptJobService(IReceiptJobService):
+    """
+    Queues receipt photos and processes them outside the request. The queue is the receipt_jobs
+    table, so queued and interrupted jobs survive a restart of the API.
+    """
+    def __init__(
+        self,
+        repository: IReceiptJobRepository,
+        receipt_service: Optional[IReceiptService] = None,
+        lease_seconds: float = 300,
+        max_attempts: int = 3,
+        retention: timedelta = timedelta(hours=24),
+    ):
+        self.logger = Logger()
+        self.repository = repository
+        self.receipt_service = receipt_service
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retention = retention
+
+    def submit_job(self, image_bytes: bytes, user_id: int) -> APIResponse:
+        """
+        Method for queueing a receipt photo. Broken images are rejected here instead of failing later in a worker.
+        """
+        try:
+            mime_type = check_receipt_image(image_bytes)
+        except ValueError as error:
+            raise HTTPException(status_code=STATUS_BAD_REQUEST, detail=str(error))
+
+        job = ReceiptJob(user_id=user_id, image=image_bytes, mime_type=mime_type)
+        id = self.repository.add(job)
+        self.logger.info(f"Queued receipt job {id} for user {user_id}")
+
+        return APIResponse(
+            success=True,
+            data={
+                ID_FIELD: id,
+                "status": job.status,
+            }
+        )
+
+    def get_job(self, job_id: int, user_id: int) -> APIResponse:
+        """
+        Method for reading the status, and once done the result, of one of the user's jobs.
+        """
+        job = self.repository.get_by_id(job_id)
+        if not job or job.user_id != user_id:
+            raise HTTPException(status_code=STATUS_NOT_FOUND, detail=f"Receipt job with id {job_id} not found.")
+
+        return APIResponse(
+            success=True,
+            data=ReceiptJobResponse.model_validate(job)
+        )
+
+    def claim_job(self) -> Optional[ReceiptJob]:
+        """
+        Method for claiming the next job. Commit right after, so the lease is visible to the other workers.
+        """
+        return self.repository.claim_next(self.lease_seconds, self.max_attempts)
+
+    def load_categories(self, job: ReceiptJob) -> dict[str, List[str]]:
+        """
+        Method for reading the categories a job is analyzed against. Commit right after, so no transaction
+        stays open while run_job waits for the model.
+        """
+        return self.receipt_service.load_user_categories(job.user_id)
+
+    def run_job(self, job: ReceiptJob, categories: Optional[dict[str, List[str]]] = None) -> None:
+        """
+        Method for analyzing a claimed job and recording the outcome. With the categories given,
+        the database is only used to record the outcome, after the model answered.
+        Errors decided by the analysis (not a receipt, invalid answers) fail the job, anything else
+        puts it back in the queue until it runs out of attempts.
+        """
+        try:
+            result = self.receipt_service.analyze_receipt_image(job.image, job.user_id, categories)
+        except HTTPException as error:
+            if error.status_code != STATUS_SERVICE_UNAVAILABLE:
+                self._record(job, self.repository.fail(job, str(error.detail)), "failed")
+                return
+            # the model is down, not the photo's fault
+            self._retry_or_fail(job, error)
+            return
+        except Exception as error:
+            self._retry_or_fail(job, error)
+            return
+
+        self._record(job, self.repository.complete(job, result), "succeeded")
+
+    def _retry_or_fail(self, job: ReceiptJob, error: Exception) -> None:
+        self.logger.error(f"Receipt job {job.id} attempt {job.attempts} failed: {error!r}")
+        if job.attempts >= self.max_attempts:
+            self._record(job, self.repository.fail(job, "The receipt could not be processed."), "failed")
+        else:
+            self._record(job, self.repository.release(job, str(error)), "requeued")
+
+    def _record(self, job: ReceiptJob, applied: bool, outcome: str) -> None:
+        if applied:
+            self.logger.info(f"Receipt job {job.id} {outcome}")
+        else:
+            # the lease ran out and another worker owns the job now, its outcome wins
+            self.logger.warning(f"Receipt job {job.id} lost its lease before it {outcome}")
+
+    def clean_up(self) -> Tuple[int, int]:
+        """
+        Method for failing jobs that kept losing their worker and deleting finished jobs past the retention.
+        Returns (failed, deleted).
+        """
+        failed = self.repository.fail_abandoned(self.max_attempts)
+        deleted = self.repository.delete_finished_before(datetime.now(timezone.utc) - self.retention)
+
+        return failed, deleted
@@ -1,20 +1,45 @@
-import io
-import json
+import hashlib
 import os
-import re
-import time
 from abc import ABC, abstractmethod
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Optional, Sequence, Tuple
 
 from dotenv import load_dotenv
 from fastapi import HTTPException, UploadFile
-from google import genai
-from google.genai import types
-from PIL import Image
 from repositories.category_repository import ICategoryRepository
+from utils.helpers.category_cache import CategoryCache, UserCategories
+from utils.helpers.constants import STATUS_BAD_REQUEST, STATUS_SERVICE_UNAVAILABLE
+from utils.helpers.keyword_classifier import KeywordClassifierCache
+from utils.helpers.logger import Logger
+from utils.helpers.model_client import (
+    RECEIPT_MODEL,
+    IModelClient,
+    ModelUnavailableError,
+    receipt_model_client,
+)
+from utils.helpers.prompt_cache import PromptContextCache
+from utils.helpers.receipt_cache import ReceiptResultCache, receipt_cache_key
+from utils.helpers.receipt_image import (
+    ReceiptImagePreprocessor,
+    check_receipt_image,
+    check_upload_size,
+)
+from utils.helpers.receipt_pipeline import (
+    RECEIPT_SYSTEM_INSTRUCTION,
+    InvalidReceiptResponseError,
+    NotAReceiptError,
+    analyze_receipt,
+    analyze_receipt_with_classifier,
+    extract_json_from_response,
+    generate_prompt,
+)
 
 load_dotenv()
 
+# model calls running at once for one batch upload, and the most photos a batch may hold
+RECEIPT_BATCH_CONCURRENCY = int(os.getenv("RECEIPT_BATCH_CONCURRENCY", "4"))
+RECEIPT_BATCH_MAX_IMAGES = int(os.getenv("RECEIPT_BATCH_MAX_IMAGES", "20"))
+
 class IReceiptService(ABC):
     @abstractmethod
     def extract_json_from_response(self, text: str) -> str: ...
@@ -23,144 +48,223 @@ class IReceiptService(ABC):
     def generate_prompt(self, categories: dict[str, List[str]]) -> str: ...
 
     @abstractmethod
-    def process_receipt_photo(self, image: UploadFile, user_id: int): ...
+    def get_category_snapshot(self, user_id: int) -> UserCategories: ...
+
+    @abstractmethod
+    def load_user_categories(self, user_id: int) -> dict[str, List[str]]: ...
+
+    @abstractmethod
+    def process_receipt_photo(self, image: UploadFile, user_id: int, categories: Optional[dict[str, List[str]]] = None): ...
+
+    @abstractmethod
+    def analyze_receipt_image(self, image_bytes: bytes, user_id: int, categories: Optional[dict[str, List[str]]] = None) -> dict: ...
+
+    @abstractmethod
+    def analyze_receipt_batch(
+        self,
+        images: Sequence[Tuple[Optional[str], bytes]],
+        user_id: int,
+        categories: Optional[dict[str, List[str]]] = None,
+        concurrency: int = RECEIPT_BATCH_CONCURRENCY,
+    ) -> Iterator[dict]: ...
 
 
 class ReceiptService:
-    def __init__(self, category_repository: ICategoryRepository):
+    def __init__(
+        self,
+        category_repository: ICategoryRepository,
+        category_cache: Optional[CategoryCache] = None,
+        result_cache: Optional[ReceiptResultCache] = None,
+        image_preprocessor: Optional[ReceiptImagePreprocessor] = None,
+        model_client: Optional[IModelClient] = None,
+        classifier_cache: Optional[KeywordClassifierCache] = None,
+        context_cache: Optional[PromptContextCache] = None,
+    ):
         self.category_repository = category_repository
+        self.category_cache = category_cache
+        self.result_cache = result_cache
+        self.image_preprocessor = image_preprocessor
+        self.logger = Logger()
+        # timeouts, backoff and the circuit breaker live in the model client,
+        # max_retries only covers answers that are not valid receipt JSON
+        self.model_client = model_client or receipt_model_client
+        # with a classifier the photo call only extracts items, the user's keywords categorize them
+        self.classifier_cache = classifier_cache
+        # the instruction and each category list are stored with the model instead of re-sent
+        self.context_cache = context_cache
         self.max_retries = 3
-        self.delay = 2
-        self.API_KEY = os.getenv("API_KEY")
-        self.client = genai.Client(api_key=self.API_KEY)
-        self.SYSTEM_CONFIG = types.GenerateContentConfig(
-            system_instruction=("""
-                You are a receipt-processing assistant.
-                Your task is to analyze a photo of a receipt and extract only the purchased items, then categorize each item into one of the categories provided in the user prompt.
-                The categories will be provided in this format: category (a list of relevant keywords for this category), category ...
-                A keyword may be one word or a sentence describing the category.
-                You must output a single valid JSON object with the following structure:
-                {
-                  "items": [
-                    {
-                      "name": string,
-                      "quantity": number,
-                      "price": number,
-                      "category": string,
-                      "keywords": List(string)
-                    }
-                  ],
-                  "total": number
-                }
-        
-                Rules:
-                - Output ONLY JSON. No explanations. No commentary. No text outside the JSON.
-                - Output STRICT valid JSON (double quotes, no trailing commas, correct types).
-                - Do not include any fields other than those defined in the JSON schema.
-                - Prices, totals, and quantities must be numeric values only (no currency symbols).
-                - If the receipt does not specify quantity, use 1.
-                - If the receipt breaks an item into multiple lines, merge them into one coherent item.
-                - If there are multiple totals (e.g., subtotal, total with tax), always choose the total that includes taxes.
-                - The semantic meaning of the category always takes precedence over keyword matches. Keywords help, but only when the category meaning aligns with the actual type of the item.
-                - If an item matches one of the provided categories, add it in the response, along with its keywords; Do NOT generate any additional keywords for this category and make sure to include all of the provided keywords.
-                - If an item clearly does not match any provided category, you may create one new category, but:
-                    - Name it concisely (1–2 words).
-                    - Make it a general category that could reasonably include similar items, avoiding overly specific or niche categories.
-                    - Generate 5 relevant keywords for the category to include in the response.
-                    - Only create a new category if absolutely necessary; prefer mapping items to broader existing categories whenever possible.
-                - If a field is missing or ambiguous, deduce it cautiously from surrounding information.
-                - If there is no receipt in the provided image, return an empty JSON.
-                """
-                                )
-        )
+        self.delay = 0.5
 
     def extract_json_from_response(self, text: str) -> str:
-        fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL | re.IGNORECASE)
-        if fenced:
-            return fenced.group(1).strip()
-        return text.strip()
-
-    def _validate_image(self, image_bytes: bytes):
-        try:
-            Image.open(io.BytesIO(image_bytes))
-        except Exception:
-            raise ValueError("The provided image is not valid.")
+        return extract_json_from_response(text)
 
-    def _validate_receipt_response(self, response_json: str):
-        try:
-            data = json.loads(response_json)
-        except json.JSONDecodeError:
-            raise ValueError("Response JSON is not valid.")
-        if not data:
-            raise ValueError("The provided image is not a valid receipt image.")
-
-        required_top = {"items", "total"}
-        if not required_top.issubset(data.keys()):
-            raise ValueError("Response JSON is missing 'items' or 'total' fields.")
-        extra_top = set(data.keys()) - required_top
-        if extra_top:
-            raise ValueError(f"Unexpected top-level fields: {extra_top}")
-
-        required_item_fields = {"name", "quantity", "price", "category", "keywords"}
-        for item in data["items"]:
-            missing = required_item_fields - set(item.keys())
-            if missing:
-                raise ValueError(f"Item is missing required fields: {missing}")
-            extra = set(item.keys()) - required_item_fields
-            if extra:
-                raise ValueError(f"Item contains unexpected fields: {extra}")
+    def _validate_image(self, image_bytes: bytes) -> str:
+        return check_receipt_image(image_bytes)
 
     def generate_prompt(self, categories: dict[str, List[str]]) -> str:
-        if categories:
-            parts = []
-            for category, keywords in categories.items():
-                keyword_str = ", ".join(keywords)
-                parts.append(f"{category} ({keyword_str})")
-            joined = ", ".join(parts)
-            return f"Analyze the receipt image and categorize each purchased item into one of these categories: {joined}"
-        else:
-            return "Analyze the receipt image and categorize each purchased item into one category"
-
-    def _load_user_categories(self, user_id: int) -> dict[str, List[str]]:
-        categories = self.category_repository.get_by_user(
+        return generate_prompt(categories)
+
+    def _fetch_categories(self, user_id: int):
+        return self.category_repository.get_by_user(
             user_id=user_id,
             sort_by="title",
             order="asc",
         )
-        result: dict[str, List[str]] = {}
 
-        for category in categories:
-            keywords = category.keywords or []
-            result[category.title] = keywords
+    def get_category_snapshot(self, user_id: int) -> UserCategories:
+        """
+        Returns the user's categories with their version fingerprint, from the cache when possible.
+        """
+        if self.category_cache:
+            return self.category_cache.get(user_id, lambda: self._fetch_categories(user_id))
+        return UserCategories((category.id, category.title, category.keywords) for category in self._fetch_categories(user_id))
+
+    def load_user_categories(self, user_id: int) -> dict[str, List[str]]:
+        return self.get_category_snapshot(user_id).keywords_by_title()
+
+    def _prompt_fingerprint(self, prompt: str) -> str:
+        """
+        Internal method for hashing everything besides the image that shapes the model's answer.
+        """
+        preprocessing = self.image_preprocessor.fingerprint if self.image_preprocessor else "original"
+        classifier = f"classifier:{self.classifier_cache.min_confidence}" if self.classifier_cache else "model"
+        raw = "\n".join((RECEIPT_MODEL, RECEIPT_SYSTEM_INSTRUCTION, preprocessing, classifier, prompt))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
 
-        return result
+    def process_receipt_photo(self, image: UploadFile, user_id: int, categories: Optional[dict[str, List[str]]] = None):
+        check_upload_size(image)
+        return self.analyze_receipt_image(image.file.read(), user_id, categories)
 
-    def process_receipt_photo(self, image: UploadFile, user_id: int):
-        image_bytes = image.file.read()
-        self._validate_image(image_bytes)
-        categories = self._load_user_categories(user_id)
+    def analyze_receipt_image(self, image_bytes: bytes, user_id: int, categories: Optional[dict[str, List[str]]] = None) -> dict:
+        """
+        Analyzes the bytes of a receipt photo, used by the upload route and by the receipt job workers.
+        An unsupported format or too many pixels is the client's error, it is raised as a 400.
+        """
+        try:
+            mime_type = self._validate_image(image_bytes)
+        except ValueError as error:
+            raise HTTPException(status_code=STATUS_BAD_REQUEST, detail=str(error))
+        if categories is None:
+            categories = self.load_user_categories(user_id)
+        prompt = self.generate_prompt(categories)
+        return self._analyze_with_prompt(image_bytes, mime_type, user_id, categories, prompt, self._prompt_fingerprint(prompt))
+
+    def analyze_receipt_batch(
+        self,
+        images: Sequence[Tuple[Optional[str], bytes]],
+        user_id: int,
+        categories: Optional[dict[str, List[str]]] = None,
+        concurrency: int = RECEIPT_BATCH_CONCURRENCY,
+    ) -> Iterator[dict]:
+        """
+        Analyzes (filename, bytes) pairs with at most `concurrency` model calls at once and yields
+        one entry per photo as soon as it is done, so not in upload order. The categories and
+        the prompt are built once for the whole batch. A failing photo yields an error entry
+        and does not stop the others.
+        """
+        if categories is None:
+            categories = self.load_user_categories(user_id)
         prompt = self.generate_prompt(categories)
+        fingerprint = self._prompt_fingerprint(prompt)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(images))), thread_name_prefix="receipt-batch")
+        try:
+            futures = {
+                executor.submit(self._analyze_batch_image, image_bytes, user_id, categories, prompt, fingerprint): (index, filename)
+                for index, (filename, image_bytes) in enumerate(images)
+            }
+            for future in as_completed(futures):
+                index, filename = futures[future]
+                yield {"index": index, "filename": filename, **future.result()}
+        finally:
+            # the client went away or the batch is done, photos not started yet are dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _analyze_batch_image(self, image_bytes: bytes, user_id: int, categories: dict[str, List[str]], prompt: str, fingerprint: str) -> dict:
+        """
+        Internal method for analyzing one photo of a batch, errors are returned instead of raised.
+        """
+        try:
+            mime_type = self._validate_image(image_bytes)
+            return {"result": self._analyze_with_prompt(image_bytes, mime_type, user_id, categories, prompt, fingerprint)}
+        except ValueError as error:
+            return {"error": {"status_code": 400, "detail": str(error)}}
+        except HTTPException as error:
+            return {"error": {"status_code": error.status_code, "detail": error.detail}}
+        except Exception as error:
+            self.logger.error(f"Receipt batch image failed for user {user_id}: {error!r}")
+            return {"error": {"status_code": 500, "detail": "The receipt could not be processed."}}
+
+    def _analyze_with_prompt(
+        self,
+        image_bytes: bytes,
+        mime_type: str,
+        user_id: int,
+        categories: dict[str, List[str]],
+        prompt: str,
+        fingerprint: str,
+    ) -> dict:
+        if not self.result_cache:
+            return self._prepare_and_analyze(image_bytes, mime_type, categories, prompt)
 
-        for attempt in range(1, self.max_retries + 1):
-            response = self.client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=[
-                    types.Part.from_bytes(
-                        data=image_bytes,
-                        mime_type="image/jpeg",
-                    ),
-                    prompt,
-                ],
-                config=self.SYSTEM_CONFIG,
-            )
-            response_json = self.extract_json_from_response(response.text)
+        # keyed by the uploaded bytes, a cache hit skips the preprocessing as well
+        key = receipt_cache_key(user_id, image_bytes, fingerprint)
+        return self.result_cache.get_or_compute(key, lambda: self._prepare_and_analyze(image_bytes, mime_type, categories, prompt))
+
+    def _prepare_and_analyze(self, image_bytes: bytes, mime_type: str, categories: dict[str, List[str]], prompt: str) -> dict:
+        """
+        Internal method for shrinking the photo before it is sent to the model.
+        """
+        if self.image_preprocessor:
             try:
-                self._validate_receipt_response(response_json)
-                return json.loads(response_json)
-            except ValueError as e:
-                error_msg = str(e)
-                if "not a valid receipt image" in error_msg:
-                    raise HTTPException(status_code=400, detail=error_msg)
-                if attempt >= self.max_retries:
-                    raise HTTPException(status_code=500, detail=f"Failed after {self.max_retries} attempts: {error_msg}")
-                time.sleep(self.delay)
+                prepared = self.image_preprocessor.prepare(image_bytes)
+            except ValueError as error:
+                raise HTTPException(status_code=400, detail=str(error))
+            image_bytes, mime_type = prepared.data, prepared.mime_type
+        if self.classifier_cache and categories:
+            return self._analyze_with_classifier(image_bytes, mime_type, categories)
+        return self._analyze_receipt(image_bytes, mime_type, prompt)
+
+    def _analyze_receipt(self, image_bytes: bytes, mime_type: str, prompt: str) -> dict:
+        return self._run_pipeline(
+            analyze_receipt,
+            self.model_client,
+            image_bytes,
+            mime_type,
+            prompt,
+            self.max_retries,
+            self.delay,
+            self.context_cache,
+        )
+
+    def _analyze_with_classifier(self, image_bytes: bytes, mime_type: str, categories: dict[str, List[str]]) -> dict:
+        """
+        Internal method for extracting the items from the photo and categorizing them locally where the keywords are clear.
+        """
+        receipt, sent_to_model = self._run_pipeline(
+            analyze_receipt_with_classifier,
+            self.model_client,
+            image_bytes,
+            mime_type,
+            categories,
+            self.classifier_cache.get(categories),
+            self.classifier_cache.min_confidence,
+            self.max_retries,
+            self.delay,
+            self.context_cache,
+        )
+        self.classifier_cache.record(len(receipt["items"]) - sent_to_model, sent_to_model)
+        return receipt
+
+    def _run_pipeline(self, pipeline, *args):
+        """
+        Internal method for turning the errors of the receipt pipeline into HTTP errors.
+        """
+        try:
+            return pipeline(*args)
+        except NotAReceiptError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+        except InvalidReceiptResponseError as error:
+            raise HTTPException(status_code=500, detail=str(error))
+        except ModelUnavailableError as error:
+            raise HTTPException(status_code=STATUS_SERVICE_UNAVAILABLE, detail=str(error))
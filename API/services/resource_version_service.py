@@ -0,0 +1,50 @@
+from abc import ABC, abstractmethod
+
+from repositories.resource_version_repository import IResourceVersionRepository
+from utils.helpers.etag import make_etag
+
+
+class IResourceVersionService(ABC):
+    @abstractmethod
+    def get_user_expenses_etag(self, user_id: int, representation: str) -> str: ...
+
+    @abstractmethod
+    def get_user_groups_etag(self, user_id: int, representation: str) -> str: ...
+
+    @abstractmethod
+    def get_user_categories_etag(self, user_id: int, representation: str) -> str: ...
+
+    @abstractmethod
+    def get_group_users_etag(self, group_id: int, representation: str) -> str: ...
+
+
+class ResourceVersionService(IResourceVersionService):
+    """
+    Builds the ETags of the polled listings from version counters, without loading any row of the listing.
+    """
+    def __init__(self, repository: IResourceVersionRepository):
+        self.repository = repository
+
+    def get_user_expenses_etag(self, user_id: int, representation: str) -> str:
+        """
+        Method for the ETag of a user's expense listing.
+        """
+        return make_etag(representation, self.repository.get_user_expenses_versions(user_id))
+
+    def get_user_groups_etag(self, user_id: int, representation: str) -> str:
+        """
+        Method for the ETag of the groups a user is part of.
+        """
+        return make_etag(representation, self.repository.get_user_groups_versions(user_id))
+
+    def get_user_categories_etag(self, user_id: int, representation: str) -> str:
+        """
+        Method for the ETag of a user's categories.
+        """
+        return make_etag(representation, self.repository.get_user_categories_versions(user_id))
+
+    def get_group_users_etag(self, group_id: int, representation: str) -> str:
+        """
+        Method for the ETag of the member list of a group.
+        """
+        return make_etag(representation, self.repository.get_group_users_versions(group_id))
@@ -105,6 +105,14 @@ class UserGroupService(IUserGroupService):
         
         group_id = response[0]
         user_id = response[1]
+
+        # log the join event
+        if self.log_repo:
+            self.log_repo.add(
+                group_id=group_id,
+                user_id=user_id,
+                action="JOIN"
+            )
         
         return APIResponse(
             success=True,
@@ -130,10 +138,8 @@ class UserGroupService(IUserGroupService):
                 message="User is already in this group"
             )
         
-        response = self.repository.add_user_to_group_by_invitation_code(user_id, invitation_code)
-
-        group_response = GroupResponse.model_validate(response[0])
-        user_response = UserResponse.model_validate(response[1])
+        # the group is already loaded, so skip the second lookup by invitation code
+        self.repository.add_user_to_group(UserGroup(user_id=user_id, group_id=group.id))
 
         # log the join event
         if self.log_repo:
@@ -146,7 +152,7 @@ class UserGroupService(IUserGroupService):
         return APIResponse(
             success=True,
             data={
-                GROUP_FIELD: group_id,
+                GROUP_FIELD: group.id,
                 USER_FIELD: user_id,
             }
         )
@@ -212,6 +218,14 @@ class UserGroupService(IUserGroupService):
             raise HTTPException(status_code=STATUS_BAD_REQUEST, detail=f"User with id {user_id} is not part of group with id {group_id}")
         
         self.repository.remove_user_from_group(UserGroup(user_id=user_id, group_id=group_id))
+
+        # log the leave event
+        if self.log_repo:
+            self.log_repo.add(
+                group_id=group_id,
+                user_id=user_id,
+                action="LEAVE"
+            )
         
         return APIResponse(
             success=True,
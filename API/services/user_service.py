@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
+from typing import Optional
 
 from fastapi import HTTPException
 from models.user import User
+from repositories.user_group_repository import IUserGroupRepository
+from repositories.user_monthly_spend_repository import IUserMonthlySpendRepository
 from repositories.user_repository import IUserRepository
 from schemas.api_response import APIResponse
 from schemas.user import UserCreate, UserLogin, UserResponse, UserUpdate
@@ -73,12 +76,25 @@ class UserService:
     Manages user authentication and CRUDs.
     """
     
-    def __init__(self, repository: IUserRepository):
+    def __init__(self, repository: IUserRepository, spend_repository: Optional[IUserMonthlySpendRepository] = None, user_group_repository: Optional[IUserGroupRepository] = None):
         """
         Constructor method.
         """
         self.logger = Logger()
         self.repository = repository
+        self.spend_repository = spend_repository
+        self.user_group_repository = user_group_repository
+
+    def _get_spent_this_month(self, user_id: int) -> float:
+        """
+        Internal method for what the user spent in the current month, measured in Romanian time.
+        """
+        now = datetime.now(ROMANIA_TZ)
+        if self.spend_repository:
+            return self.spend_repository.get_spent(user_id, now.date().replace(day=1))
+
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        return self.repository.get_user_monthly_spent(user_id, month_start)
 
     def _validate_user(self, user_id: int = None, user_email: str = None) -> User:
         if user_id is not None:
@@ -214,6 +230,9 @@ class UserService:
         
         self._validate_user(user_id=user_id)
         
+        if self.user_group_repository:
+            # explicit instead of the foreign key cascade, so the cached member sets are invalidated
+            self.user_group_repository.remove_user_from_all_groups(user_id)
         self.repository.delete(user_id)
         
         return APIResponse(
@@ -303,9 +322,7 @@ class UserService:
     def get_spent_this_month(self, user_id: int) -> APIResponse:
         self.logger.info(f"Retrieving the amount spent this month by user with id {user_id}")
         self._validate_user(user_id=user_id)
-        now = datetime.now(ROMANIA_TZ)
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        spent = self.repository.get_user_monthly_spent(user_id, month_start)
+        spent = self._get_spent_this_month(user_id)
         return APIResponse(
             success=True,
             data={
@@ -316,9 +333,7 @@ class UserService:
     def get_remaining_budget(self, user_id: int) -> APIResponse:
         self.logger.info(f"Retrieving the remaining budget for user with id {user_id}")
         user = self._validate_user(user_id=user_id)
-        now = datetime.now(ROMANIA_TZ)
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        spent = self.repository.get_user_monthly_spent(user_id, month_start)
+        spent = self._get_spent_this_month(user_id)
         remaining = float(user.budget) - spent
         budget = float(user.budget)
         
@@ -0,0 +1,81 @@
+"""
+Shared fixtures of the database integration tests.
+
+They run against a throwaway Postgres database (the public schema is dropped and rebuilt
+from db/migrations), so they only run when TEST_DATABASE_URL points at one.
+"""
+import os
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[3] / "db" / "migrations"
+
+USERS = 50
+GROUPS = 20
+EXPENSES = 5000
+
+
+def _migration_version(path: Path) -> int:
+    return int(path.name.split("_", 1)[0])
+
+
+@pytest.fixture(scope="module")
+def engine():
+    """
+    Builds the schema from the up migrations and seeds it.
+
+    Args:
+        None
+
+    Returns:
+        Engine bound to the seeded test database
+
+    Exceptions:
+        None
+    """
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+        for migration in sorted(MIGRATIONS_DIR.glob("*.up.sql"), key=_migration_version):
+            connection.exec_driver_sql(migration.read_text())
+
+        connection.execute(text(
+            "INSERT INTO users (first_name, last_name, email, hashed_password, phone_number) "
+            "SELECT 'F', 'L', 'user' || n || '@test.com', 'x', '0700000000' FROM generate_series(1, :n) n"
+        ), {"n": USERS})
+        connection.execute(text(
+            "INSERT INTO groups (name, invitation_code) "
+            "SELECT 'group ' || n, 'code' || n FROM generate_series(1, :n) n"
+        ), {"n": GROUPS})
+        connection.execute(text(
+            "INSERT INTO users_groups (user_id, group_id) "
+            "SELECT u, g FROM generate_series(1, :users) u, generate_series(1, :groups) g WHERE (u + g) % 4 = 0"
+        ), {"users": USERS, "groups": GROUPS})
+        connection.execute(text(
+            "INSERT INTO categories (user_id, title, keywords) "
+            "SELECT u, t, ARRAY[lower(t), 'kw' || u] FROM generate_series(1, :users) u, "
+            "unnest(ARRAY['Food', 'Rent', 'Fuel', 'Fun']) t"
+        ), {"users": USERS})
+        connection.execute(text(
+            "INSERT INTO expenses (user_id, group_id, title, amount, category_id, created_at) "
+            "SELECT 1 + n % :users, CASE WHEN n % 3 = 0 THEN NULL ELSE 1 + n % :groups END, "
+            "'expense ' || n, n % 97, 1 + (n % :users) * 4, now() - n * interval '1 minute' "
+            "FROM generate_series(1, :n) n"
+        ), {"users": USERS, "groups": GROUPS, "n": EXPENSES})
+        connection.execute(text(
+            "INSERT INTO expense_payments (expense_id, user_id) "
+            "SELECT id, user_id FROM expenses WHERE id % 5 = 0"
+        ))
+        connection.execute(text(
+            "INSERT INTO group_logs (group_id, user_id, action) "
+            "SELECT group_id, user_id, 'JOIN' FROM users_groups"
+        ))
+        connection.exec_driver_sql("ANALYZE")
+
+    yield engine
+
+    engine.dispose()
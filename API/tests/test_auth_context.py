@@ -0,0 +1,177 @@
+import time
+
+import jwt
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from middleware.auth_middleware import AuthMiddleware, get_auth_context
+from utils.helpers import jwt_utils
+from utils.helpers.jwt_utils import ALGORITHM, SECRET_KEY, JwtUtils
+from utils.helpers.lru_cache import LRUCache
+
+
+@pytest.fixture(autouse=True)
+def empty_token_cache():
+    jwt_utils.verified_tokens.clear()
+    yield
+    jwt_utils.verified_tokens.clear()
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(AuthMiddleware)
+
+    @app.get("/me")
+    def me(context=Depends(get_auth_context)):
+        return {"user_id": context.require_user_id()}
+
+    @app.get("/public")
+    def public():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """
+    Tests that the oldest untouched entry is dropped once the cache is full.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the wrong entry was evicted
+    """
+    cache = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_honours_expiry():
+    """
+    Tests that entries are not served after their expiry time.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if an expired entry is returned
+    """
+    now = [100.0]
+    cache = LRUCache(max_entries=10, ttl=5, clock=lambda: now[0])
+    cache.set("ttl", 1)
+    cache.set("explicit", 2, expires_at=102)
+
+    now[0] = 103
+    assert cache.get("ttl") == 1
+    assert cache.get("explicit") is None
+
+    now[0] = 106
+    assert cache.get("ttl") is None
+
+
+def test_decode_token_is_cached_until_exp():
+    """
+    Tests that a verified token is answered from the cache and forgotten once it expires.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the cache is not used or outlives the token
+    """
+    token = JwtUtils.encode_token(7)
+
+    assert JwtUtils.decode_token(token) == 7
+    assert JwtUtils.decode_token(token) == 7
+    assert jwt_utils.verified_tokens.hits == 1
+
+    expired = jwt.encode({"sub": "7", "exp": int(time.time()) + 1}, SECRET_KEY, algorithm=ALGORITHM)
+    assert JwtUtils.decode_token(expired) == 7
+    time.sleep(1.1)
+    with pytest.raises(HTTPException) as exc:
+        JwtUtils.decode_token(expired)
+    assert exc.value.status_code == 401
+
+
+def test_tampered_token_is_rejected():
+    """
+    Tests that a token with a bad signature is neither accepted nor cached.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        HTTPException expected with status 401
+    """
+    token = JwtUtils.encode_token(7)
+    tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+
+    with pytest.raises(HTTPException) as exc:
+        JwtUtils.decode_token(tampered)
+
+    assert exc.value.status_code == 401
+    assert len(jwt_utils.verified_tokens) == 0
+
+
+def test_middleware_sets_user_context(client):
+    """
+    Tests that bearer and cookie tokens both reach the route as the user id.
+
+    Args:
+        client (TestClient) app with the middleware
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError on a wrong user id
+    """
+    token = JwtUtils.encode_token(42)
+
+    assert client.get("/me", headers={"Authorization": f"Bearer {token}"}).json() == {"user_id": 42}
+    client.cookies.set("access_token", token)
+    assert client.get("/me").json() == {"user_id": 42}
+
+
+def test_middleware_lets_public_routes_through(client):
+    """
+    Tests that missing or broken tokens only fail the routes that need a user.
+
+    Args:
+        client (TestClient) app with the middleware
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError on a wrong status code
+    """
+    assert client.get("/public", headers={"Authorization": "Bearer broken"}).status_code == 200
+
+    missing = client.get("/me")
+    assert missing.status_code == 401
+    assert missing.json()["detail"] == "Missing authentication token."
+
+    invalid = client.get("/me", headers={"Authorization": "Bearer broken"})
+    assert invalid.status_code == 401
+    assert invalid.json()["detail"] == "Invalid token."
@@ -0,0 +1,166 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from schemas.expense import ExpenseCreate
+from services.expense_service import ExpenseService
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from utils.helpers.category_cache import CategoryCache
+from utils.helpers.transaction_hooks import call_after_commit
+
+
+def _category(category_id, title, keywords):
+    return SimpleNamespace(id=category_id, title=title, keywords=keywords)
+
+
+def test_snapshot_is_loaded_once():
+    """
+    Tests that repeated reads of the same user are served without calling the loader again.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the loader runs more than once
+    """
+    cache = CategoryCache(max_users=10, ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return [_category(1, "Food", ["bread"]), _category(2, "Fuel", None)]
+
+    first = cache.get(5, loader)
+    second = cache.get(5, loader)
+
+    assert first is second
+    assert len(calls) == 1
+    assert 1 in first and 3 not in first
+    assert first.keywords_by_title() == {"Food": ["bread"], "Fuel": []}
+
+
+def test_version_follows_content():
+    """
+    Tests that the fingerprint is stable for equal categories and changes on edits.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError on an unexpected fingerprint
+    """
+    cache = CategoryCache(max_users=10, ttl=60)
+    before = cache.get(1, lambda: [_category(1, "Food", ["bread"])])
+    same = CategoryCache(max_users=10, ttl=60).get(1, lambda: [_category(1, "Food", ["bread"])])
+
+    cache.invalidate(1)
+    after = cache.get(1, lambda: [_category(1, "Food", ["bread", "milk"])])
+
+    assert before.version == same.version
+    assert before.version != after.version
+
+
+def test_invalidation_during_load_is_not_cached():
+    """
+    Tests that rows loaded while an invalidation happened are returned but not kept.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the stale snapshot is cached
+    """
+    cache = CategoryCache(max_users=10, ttl=60)
+
+    def racing_loader():
+        cache.invalidate(1)
+        return [_category(1, "Old", [])]
+
+    assert 1 in cache.get(1, racing_loader)
+    assert cache.get(1, lambda: [_category(2, "New", [])]).keywords_by_title() == {"New": []}
+
+
+def test_after_commit_callbacks_follow_the_transaction():
+    """
+    Tests that callbacks run on commit only, and are dropped on rollback.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a callback runs at the wrong time
+    """
+    calls = []
+    with Session(create_engine("sqlite://")) as db:
+        db.execute(text("SELECT 1"))
+        call_after_commit(db, lambda: calls.append("rolled back"))
+        db.rollback()
+
+        db.execute(text("SELECT 1"))
+        call_after_commit(db, lambda: calls.append("committed"))
+        assert calls == []
+        db.commit()
+
+    assert calls == ["committed"]
+
+
+class ForeignKeyViolation(Exception):
+    pgcode = "23503"
+
+
+class DeletedCategoryRepository:
+    """
+    Expense repository of a database where the inserted row hits a foreign key.
+    """
+
+    def __init__(self, constraint):
+        self.constraint = constraint
+
+    def add(self, expense):
+        orig = ForeignKeyViolation(f'insert or update on table "expenses" violates foreign key constraint "{self.constraint}"')
+        raise IntegrityError("INSERT INTO expenses ...", {}, orig)
+
+
+@pytest.mark.parametrize("constraint,status_code", [
+    ("fk_expense_category", 404),
+    ("fk_expenses_group", None),
+])
+def test_category_deleted_after_snapshot(constraint, status_code):
+    """
+    Tests that a category still listed by a cached snapshot but deleted in the database
+    fails the write with 404, while other foreign key errors are left alone.
+
+    Args:
+        constraint (str) violated constraint
+        status_code (int) expected HTTP status, None when the IntegrityError must pass through
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the stale category is not reported as missing
+    """
+    cache = CategoryCache(max_users=10, ttl=60)
+    cache.get(1, lambda: [_category(3, "Food", ["bread"])])
+    service = ExpenseService(DeletedCategoryRepository(constraint), None, None, None, category_cache=cache)
+
+    expected = HTTPException if status_code else IntegrityError
+    with pytest.raises(expected) as error:
+        service.create_expense(ExpenseCreate(title="Bread", amount=3, category_id=3), 1)
+
+    if status_code:
+        assert error.value.status_code == status_code
@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from utils.helpers.cursor import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip_datetime():
+    """
+    Tests that a created_at cursor decodes back to the same aware datetime and id.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the decoded values differ
+    """
+    created_at = datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor("created_at", "desc", created_at, 42)
+
+    assert decode_cursor(cursor, "created_at", "desc") == (created_at, 42)
+
+
+@pytest.mark.parametrize("sort_by,value", [("amount", 12.5), ("title", "Coffee"), ("category_id", 3)])
+def test_cursor_round_trip_plain_values(sort_by, value):
+    """
+    Tests that numeric and text sort values survive encoding unchanged.
+
+    Args:
+        sort_by (str) sort field of the listing
+        value (Any) sort value of the last row
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the decoded values differ
+    """
+    cursor = encode_cursor(sort_by, "asc", value, 7)
+
+    assert decode_cursor(cursor, sort_by, "ASC") == (value, 7)
+
+
+def test_decode_empty_cursor():
+    """
+    Tests that a missing cursor means the first page.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a value is returned
+    """
+    assert decode_cursor(None, "created_at", "desc") is None
+    assert decode_cursor("", "created_at", "desc") is None
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "e30", "eyJzIjoiaWQifQ"])
+def test_decode_invalid_cursor(cursor):
+    """
+    Tests that malformed cursors are rejected with a bad request.
+
+    Args:
+        cursor (str) malformed cursor
+
+    Returns:
+        None
+
+    Exceptions:
+        HTTPException expected with status 400
+    """
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, "id", "desc")
+
+    assert exc.value.status_code == 400
+
+
+def test_decode_cursor_from_other_sort():
+    """
+    Tests that a cursor cannot continue a listing with a different sort.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        HTTPException expected with status 400
+    """
+    cursor = encode_cursor("amount", "desc", 10.0, 1)
+
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, "amount", "asc")
+
+    assert exc.value.status_code == 400
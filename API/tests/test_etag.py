@@ -0,0 +1,51 @@
+from starlette.requests import Request
+from utils.helpers.etag import is_not_modified, make_etag, representation_key
+
+
+def _request(query: bytes = b"", if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/expenses/", "query_string": query, "headers": headers})
+
+
+def test_etag_follows_versions_and_representation():
+    """
+    Tests that the ETag changes with any scope version or query, and not with query order.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError on an unexpected ETag
+    """
+    versions = [("expenses:user:1", 4), ("memberships:user:1", 0)]
+    etag = make_etag(representation_key(_request(b"limit=2&order=asc")), versions)
+
+    assert etag == make_etag(representation_key(_request(b"order=asc&limit=2")), versions)
+    assert etag != make_etag(representation_key(_request(b"order=asc&limit=3")), versions)
+    assert etag != make_etag(representation_key(_request(b"limit=2&order=asc")), [("expenses:user:1", 5), ("memberships:user:1", 0)])
+    assert etag.startswith('"') and etag.endswith('"')
+
+
+def test_if_none_match():
+    """
+    Tests the If-None-Match comparison, including lists, weak tags and the wildcard.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a request is wrongly answered as not modified
+    """
+    etag = '"abc"'
+
+    assert not is_not_modified(_request(), etag)
+    assert is_not_modified(_request(if_none_match='"abc"'), etag)
+    assert is_not_modified(_request(if_none_match='"old", W/"abc"'), etag)
+    assert is_not_modified(_request(if_none_match="*"), etag)
+    assert not is_not_modified(_request(if_none_match='"old"'), etag)
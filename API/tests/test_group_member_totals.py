@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import pytest
+from schemas.expense import ExpenseCreate, ExpenseUpdate
+from services.expense_service import ExpenseService
+
+
+class MockExpenseRepository:
+    """
+    In-memory expense storage, just enough for the write paths of the service.
+    """
+
+    def __init__(self):
+        self.expenses = {}
+        self.counter = 1
+
+    def add(self, expense):
+        expense.id = self.counter
+        self.expenses[expense.id] = expense
+        self.counter += 1
+        return expense.id
+
+    def get_by_id(self, expense_id):
+        return self.expenses.get(expense_id)
+
+    def update(self, expense_id, fields):
+        for key, value in fields.items():
+            setattr(self.expenses[expense_id], key, value)
+        return expense_id
+
+    def delete(self, expense_id):
+        del self.expenses[expense_id]
+        return expense_id
+
+
+class MockTotalsRepository:
+    """
+    Records the running totals the service maintains.
+    """
+
+    def __init__(self):
+        self.totals = {}
+
+    def add_delta(self, group_id, user_id, amount_delta, count_delta):
+        total, count = self.totals.get((group_id, user_id), (0.0, 0))
+        self.totals[(group_id, user_id)] = (total + amount_delta, count + count_delta)
+
+
+class MockLookupRepository:
+    """
+    Answers the existence checks of groups and categories.
+    """
+
+    def get_by_id(self, entity_id):
+        return SimpleNamespace(id=entity_id, user_id=1)
+
+
+@pytest.fixture
+def totals_repo():
+    return MockTotalsRepository()
+
+
+@pytest.fixture
+def expense_service(totals_repo):
+    return ExpenseService(MockExpenseRepository(), MockLookupRepository(), None, MockLookupRepository(), totals_repo)
+
+
+def test_create_group_expense_adds_to_member_total(expense_service, totals_repo):
+    """
+    Tests that a group expense is added to the author's running total.
+
+    Args:
+        expense_service (ExpenseService) service under test
+        totals_repo (MockTotalsRepository) recorded totals
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the total is wrong
+    """
+    expense_service.create_expense(ExpenseCreate(title="Pizza", amount=30, category_id=1, group_id=7), 1)
+    expense_service.create_expense(ExpenseCreate(title="Drinks", amount=12.5, category_id=1, group_id=7), 1)
+
+    assert totals_repo.totals == {(7, 1): (42.5, 2)}
+
+
+def test_personal_expense_is_not_tracked(expense_service, totals_repo):
+    """
+    Tests that expenses outside a group leave the totals alone.
+
+    Args:
+        expense_service (ExpenseService) service under test
+        totals_repo (MockTotalsRepository) recorded totals
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a total was written
+    """
+    expense_service.create_expense(ExpenseCreate(title="Lunch", amount=10, category_id=1), 1)
+
+    assert totals_repo.totals == {}
+
+
+def test_update_and_delete_apply_deltas(expense_service, totals_repo):
+    """
+    Tests that changing and removing an expense move the total by the difference.
+
+    Args:
+        expense_service (ExpenseService) service under test
+        totals_repo (MockTotalsRepository) recorded totals
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the total is wrong
+    """
+    response = expense_service.create_expense(ExpenseCreate(title="Taxi", amount=20, category_id=1, group_id=7), 1)
+    expense_id = response.data["id"]
+
+    expense_service.update_expense(expense_id, ExpenseUpdate(amount=35, category_id=1), 1)
+    assert totals_repo.totals[(7, 1)] == (35.0, 1)
+
+    expense_service.delete_expense(expense_id, 1)
+    assert totals_repo.totals[(7, 1)] == (0.0, 0)
@@ -0,0 +1,86 @@
+import random
+
+import models.category  # noqa: F401
+import models.group  # noqa: F401
+import models.user  # noqa: F401
+import pytest
+from models.base import Base
+from models.expense import Expense
+from models.user_group import UserGroup
+from repositories.expense_repository import ExpenseRepository
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture
+def db():
+    """
+    In-memory database holding random group expenses and memberships, only the two tables the aggregate reads.
+
+    Args:
+        None
+
+    Returns:
+        Session over the seeded database
+
+    Exceptions:
+        None
+    """
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Expense.__table__, UserGroup.__table__])
+    rng = random.Random(7)
+    with Session(engine) as session:
+        session.add_all(
+            UserGroup(user_id=user_id, group_id=group_id)
+            for group_id in (1, 2, 3) for user_id in range(1, 8) if rng.random() < 0.6
+        )
+        session.add_all(
+            Expense(
+                user_id=rng.randint(1, 7),
+                group_id=rng.choice((1, 2, 3, None)),
+                title=f"expense {index}",
+                amount=round(rng.uniform(1, 100), 2),
+                category_id=1,
+            )
+            for index in range(300)
+        )
+        session.flush()
+        yield session
+
+
+def _previous_statistics(db: Session, group_id: int, user_id: int):
+    """
+    The statistics as they were computed before the aggregate: every expense of the group
+    loaded and summed in Python, the members counted separately.
+    """
+    group_expenses = [expense for expense in db.query(Expense) if expense.group_id == group_id]
+    total_group_spend = sum(expense.amount for expense in group_expenses)
+    my_total_paid = sum(expense.amount for expense in group_expenses if expense.user_id == user_id)
+    member_count = sum(1 for member in db.query(UserGroup) if member.group_id == group_id)
+    return total_group_spend, my_total_paid, member_count
+
+
+@pytest.mark.parametrize("group_id", [1, 2, 3, 4])
+@pytest.mark.parametrize("user_id", [1, 4, 99])
+def test_aggregate_matches_previous_statistics(db, group_id, user_id):
+    """
+    Tests that the one statement aggregate returns the same totals and member count as summing
+    the loaded expenses did, also for a user who paid nothing and a group without expenses.
+
+    Args:
+        db (Session) seeded database
+        group_id (int) group whose statistics are read
+        user_id (int) user the statistics are for
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a total or the member count differs
+    """
+    total_group_spend, my_total_paid, member_count = ExpenseRepository(db).get_group_statistics(group_id, user_id)
+    expected_spend, expected_paid, expected_members = _previous_statistics(db, group_id, user_id)
+
+    assert total_group_spend == pytest.approx(expected_spend)
+    assert my_total_paid == pytest.approx(expected_paid)
+    assert member_count == expected_members
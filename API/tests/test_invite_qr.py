@@ -0,0 +1,60 @@
+from utils.helpers.invite_qr import InviteQRCache, invite_qr_etag, invite_qr_version
+
+
+def test_qr_is_rendered_once_per_code_and_format():
+    """
+    Tests that repeated requests for the same QR code are served from the cache.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the image is rendered again or has the wrong type
+    """
+    cache = InviteQRCache(max_entries=10)
+
+    png = cache.get("ABC123", "png")
+    svg = cache.get("ABC123", "svg")
+
+    assert cache.get("ABC123", "png") is png
+    assert png.content.startswith(b"\x89PNG") and png.media_type == "image/png"
+    assert b"<svg" in svg.content and svg.media_type == "image/svg+xml"
+    assert cache.stats()["misses"] == 2 and cache.stats()["hits"] == 1
+
+
+def test_etag_depends_on_code_and_format():
+    """
+    Tests that each code and format gets its own ETag.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError on colliding ETags
+    """
+    assert invite_qr_etag("ABC123", "png") == invite_qr_etag("ABC123", "png")
+    assert invite_qr_etag("ABC123", "png") != invite_qr_etag("ABC123", "svg")
+    assert invite_qr_etag("ABC123", "png") != invite_qr_etag("XYZ789", "png")
+
+
+def test_url_version_follows_the_invitation_code():
+    """
+    Tests that the version of the image URLs is stable for a code and changes with it.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a replaced code keeps the version of the old one
+    """
+    assert invite_qr_version("ABC123") == invite_qr_version("ABC123")
+    assert invite_qr_version("ABC123") != invite_qr_version("XYZ789")
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+from utils.helpers.keyword_classifier import (
+    KeywordAutomaton,
+    KeywordClassifier,
+    KeywordClassifierCache,
+)
+from utils.helpers.model_client import FakeModelClient
+from utils.helpers.receipt_pipeline import analyze_receipt_with_classifier
+
+CATEGORIES = {
+    "Lactate": ["lapte", "iaurt", "branza"],
+    "Panificatie": ["paine", "franzela"],
+    "Desert": ["iaurt grecesc cu miere", "ciocolata"],
+}
+
+
+def test_automaton_finds_overlapping_patterns():
+    """
+    Tests that the automaton reports every occurrence, including patterns inside other patterns.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if an occurrence is missing
+    """
+    automaton = KeywordAutomaton(["he", "she", "his", "hers"])
+
+    assert sorted(automaton.find("ushers")) == [(0, 4), (1, 4), (3, 6)]
+
+
+@pytest.mark.parametrize("name,category,confident", [
+    ("Lapte Zuzu 1.5%", "Lactate", True),
+    ("LAPTELE BUNICII", "Lactate", True),
+    ("Pâine albă feliată", "Panificatie", True),
+    ("Iaurt grecesc cu miere 150g", "Desert", True),
+    ("Iaurt cu ciocolata", None, False),
+    ("Detergent vase", None, False),
+    ("Laptop", None, False),
+])
+def test_classify(name, category, confident):
+    """
+    Tests whole words, inflected forms, diacritics, nested keywords and ties between categories.
+
+    Args:
+        name (str) item name from a receipt
+        category (str) expected confident category, None when the model must decide
+        confident (bool) whether the item is categorized locally
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the verdict is wrong
+    """
+    classification = KeywordClassifier(CATEGORIES).classify(name)
+
+    assert classification.is_confident(0.8) == confident
+    if confident:
+        assert classification.category == category
+
+
+def test_cache_builds_once_per_category_version():
+    """
+    Tests that the same categories reuse the classifier and edited categories build a new one.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a classifier is rebuilt or reused wrongly
+    """
+    cache = KeywordClassifierCache(max_entries=10)
+
+    first = cache.get(CATEGORIES)
+
+    assert cache.get(dict(CATEGORIES)) is first
+    assert cache.get({**CATEGORIES, "Desert": ["prajitura"]}) is not first
+
+
+def test_only_ambiguous_items_are_sent_to_the_model():
+    """
+    Tests that confident items take their category and keywords locally and a single text-only
+    call categorizes the rest, in order.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a confident item reaches the model or an answer is misplaced
+    """
+    extracted = {
+        "items": [
+            {"name": "Lapte 3.5%", "quantity": 1, "price": 8, "category": "", "keywords": []},
+            {"name": "Baterii AA", "quantity": 1, "price": 20, "category": "", "keywords": []},
+            {"name": "Paine neagra", "quantity": 1, "price": 5, "category": "", "keywords": []},
+        ],
+        "total": 33,
+    }
+    categorized = {"items": [{"name": "Baterii AA", "category": "Casa", "keywords": ["baterii"]}]}
+    fake = FakeModelClient(responses=[json.dumps(extracted), json.dumps(categorized)])
+    prompts = []
+    generate = fake.generate
+    fake.generate = lambda image_bytes, mime_type, prompt, config, timeout=None: (
+        prompts.append((image_bytes, prompt)) or generate(image_bytes, mime_type, prompt, config, timeout)
+    )
+
+    receipt, sent_to_model = analyze_receipt_with_classifier(
+        fake, b"img", "image/jpeg", CATEGORIES, KeywordClassifier(CATEGORIES), 0.8, delay=0
+    )
+
+    assert sent_to_model == 1
+    assert [item["category"] for item in receipt["items"]] == ["Lactate", "Casa", "Panificatie"]
+    assert receipt["items"][0]["keywords"] == CATEGORIES["Lactate"]
+    assert prompts[1][0] is None
+    assert "Baterii AA" in prompts[1][1] and "Lapte 3.5%" not in prompts[1][1]
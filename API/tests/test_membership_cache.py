@@ -0,0 +1,207 @@
+from models.user_group import UserGroup
+from repositories.user_group_repository import CachedUserGroupRepository
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from utils.helpers.membership_cache import InMemoryMembershipBackend, MembershipCache
+from utils.helpers.read_your_writes import USE_PRIMARY
+
+
+class SharedMemoryBackend(InMemoryMembershipBackend):
+    """
+    In-process stand-in for a backend every worker shares, such as redis.
+    """
+    shared = True
+
+
+def _session() -> Session:
+    db = Session(create_engine("sqlite://"))
+    db.execute(text("CREATE TABLE users_groups (user_id INTEGER, group_id INTEGER, PRIMARY KEY (user_id, group_id))"))
+    db.execute(text("INSERT INTO users_groups VALUES (1, 10), (2, 10), (3, 20)"))
+    db.commit()
+    return db
+
+
+def test_members_are_loaded_once_per_group():
+    """
+    Tests that membership checks and member counts of a group share a single query.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a check reaches the database again
+    """
+    cache = MembershipCache(SharedMemoryBackend(max_groups=10, ttl=60))
+    with _session() as db:
+        repository = CachedUserGroupRepository(db, cache)
+
+        assert repository.is_member(1, 10)
+        assert not repository.is_member(3, 10)
+        assert repository.get_nr_of_users_from_group(10) == 2
+
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_membership_changes_invalidate_on_commit():
+    """
+    Tests that joining and leaving a group refresh the cached members once committed.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a stale member set is served after the commit
+    """
+    cache = MembershipCache(SharedMemoryBackend(max_groups=10, ttl=60))
+    with _session() as db:
+        repository = CachedUserGroupRepository(db, cache)
+        assert repository.get_nr_of_users_from_group(10) == 2
+
+        repository.add_user_to_group(UserGroup(user_id=3, group_id=10))
+        db.commit()
+        assert repository.is_member(3, 10)
+        assert repository.get_nr_of_users_from_group(10) == 3
+
+        repository.remove_user_from_group(UserGroup(user_id=1, group_id=10))
+        db.rollback()
+        assert repository.is_member(1, 10)
+
+        repository.remove_user_from_group(UserGroup(user_id=1, group_id=10))
+        db.commit()
+        assert not repository.is_member(1, 10)
+
+
+def test_invalidation_during_load_is_not_cached():
+    """
+    Tests that members loaded while the group was invalidated are not kept.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the stale member set is cached
+    """
+    cache = MembershipCache(InMemoryMembershipBackend(max_groups=10, ttl=60))
+
+    def racing_loader():
+        cache.invalidate(10)
+        return [1]
+
+    assert cache.get(10, racing_loader) == frozenset({1})
+    assert cache.get(10, lambda: [1, 2]) == frozenset({1, 2})
+
+
+def test_per_worker_cache_does_not_authorize():
+    """
+    Tests that a member set cached by one worker is not trusted for a membership check,
+    since another worker may have removed the member without this worker noticing.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a removed member still passes the check
+    """
+    cache = MembershipCache(InMemoryMembershipBackend(max_groups=10, ttl=60))
+    with _session() as db:
+        repository = CachedUserGroupRepository(db, cache)
+        assert repository.get_nr_of_users_from_group(10) == 2
+
+        # removed by another worker, whose invalidation this worker never sees
+        db.execute(text("DELETE FROM users_groups WHERE user_id = 1 AND group_id = 10"))
+        db.commit()
+
+        assert not repository.is_member(1, 10)
+        assert repository.get_nr_of_users_from_group(10) == 2
+
+
+def test_cached_non_member_is_confirmed_by_the_database():
+    """
+    Tests that a user missing from the cached set is looked up before being refused,
+    and that a set found stale this way is dropped.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the stale set refuses a member or is kept
+    """
+    cache = MembershipCache(SharedMemoryBackend(max_groups=10, ttl=60))
+    with _session() as db:
+        repository = CachedUserGroupRepository(db, cache)
+        assert not repository.is_member(3, 10)
+
+        db.execute(text("INSERT INTO users_groups VALUES (3, 10)"))
+        db.commit()
+
+        assert repository.is_member(3, 10)
+        assert repository.get_nr_of_users_from_group(10) == 3
+
+
+def test_session_pinned_to_primary_skips_the_cache():
+    """
+    Tests that a session reading its own writes answers membership from the database.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the cached set is used
+    """
+    cache = MembershipCache(SharedMemoryBackend(max_groups=10, ttl=60))
+    with _session() as db:
+        repository = CachedUserGroupRepository(db, cache)
+        assert repository.is_member(1, 10)
+
+        db.execute(text("DELETE FROM users_groups WHERE user_id = 1 AND group_id = 10"))
+        db.commit()
+        db.info[USE_PRIMARY] = True
+
+        assert not repository.is_member(1, 10)
+
+
+def test_removing_a_user_from_all_groups_invalidates_each_group():
+    """
+    Tests that deleting every membership of a user, as deleting the user does,
+    refreshes the member sets of all of their groups once committed.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a group keeps the deleted user
+    """
+    cache = MembershipCache(SharedMemoryBackend(max_groups=10, ttl=60))
+    with _session() as db:
+        db.execute(text("INSERT INTO users_groups VALUES (1, 20)"))
+        db.commit()
+        repository = CachedUserGroupRepository(db, cache)
+        assert repository.is_member(1, 10) and repository.is_member(1, 20)
+
+        assert sorted(repository.remove_user_from_all_groups(1)) == [10, 20]
+        db.commit()
+
+        assert repository.get_nr_of_users_from_group(10) == 1
+        assert repository.get_nr_of_users_from_group(20) == 1
@@ -0,0 +1,252 @@
+import httpx
+import pytest
+from fastapi import HTTPException
+from google.genai import errors as genai_errors
+from google.genai import types
+from services.receipt_service import ReceiptService
+from utils.helpers.model_client import (
+    CircuitBreaker,
+    FakeModelClient,
+    GeminiModelClient,
+    ModelUnavailableError,
+    ResilientModelClient,
+    backoff_delay,
+)
+
+CONFIG = types.GenerateContentConfig()
+RECEIPT = '{"items": [], "total": 12}'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _overloaded():
+    return genai_errors.ServerError(503, {"error": {"message": "overloaded"}})
+
+
+def _resilient(fake, clock, breaker=None, **kwargs):
+    breaker = breaker or CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    return ResilientModelClient(fake, breaker, sleep=clock.sleep, clock=clock, **kwargs)
+
+
+def test_transient_failures_are_retried_with_backoff():
+    """
+    Tests that overloaded answers and timeouts are retried and the later answer returned.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the retry does not happen or does not wait
+    """
+    clock = FakeClock()
+    fake = FakeModelClient(responses=[RECEIPT], failures=[_overloaded(), httpx.ReadTimeout("slow")])
+
+    assert _resilient(fake, clock, base_delay=1).generate(b"img", "image/jpeg", "prompt", CONFIG) == RECEIPT
+    assert fake.calls == 3
+    assert 0 < clock.now <= 3
+
+
+def test_client_errors_are_not_retried():
+    """
+    Tests that a rejected request is raised at once and does not trip the breaker.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the request is retried
+    """
+    clock = FakeClock()
+    fake = FakeModelClient(failures=[genai_errors.ClientError(400, {"error": {"message": "bad image"}})])
+    client = _resilient(fake, clock)
+
+    with pytest.raises(genai_errors.ClientError):
+        client.generate(b"img", "image/jpeg", "prompt", CONFIG)
+
+    assert fake.calls == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_fails_fast_during_an_outage_and_recovers():
+    """
+    Tests that the breaker opens after repeated failures, rejects calls without reaching the
+    model while open, and closes after a successful trial call.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the breaker does not follow the outage
+    """
+    clock = FakeClock()
+    fake = FakeModelClient(responses=[RECEIPT], failures=[_overloaded()] * 3)
+    client = _resilient(fake, clock, base_delay=0.1)
+
+    with pytest.raises(ModelUnavailableError):
+        client.generate(b"img", "image/jpeg", "prompt", CONFIG)
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(ModelUnavailableError):
+        client.generate(b"img", "image/jpeg", "prompt", CONFIG)
+    assert fake.calls == 3
+
+    clock.now += 30
+    assert client.generate(b"img", "image/jpeg", "prompt", CONFIG) == RECEIPT
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+class ContextFailingModelClient(FakeModelClient):
+    """
+    Fails context creations with `context_failures` in turn and records the timeout of each.
+    """
+
+    def __init__(self, context_failures, **kwargs):
+        super().__init__(**kwargs)
+        self.context_failures = list(context_failures)
+        self.context_timeouts = []
+
+    def create_cached_context(self, system_instruction, context, ttl_seconds, timeout=None):
+        self.context_timeouts.append(timeout)
+        if self.context_failures:
+            raise self.context_failures.pop(0)
+        return super().create_cached_context(system_instruction, context, ttl_seconds, timeout)
+
+
+def test_context_creation_is_bounded_and_counted_by_the_breaker():
+    """
+    Tests that creating a cached context gets the attempt timeout, that transient failures
+    open the breaker like failed calls, and that a successful creation closes it again.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the creation is unbounded or invisible to the breaker
+    """
+    clock = FakeClock()
+    fake = ContextFailingModelClient([_overloaded(), httpx.ReadTimeout("slow")], responses=[RECEIPT])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    client = _resilient(fake, clock, breaker, attempt_timeout=5)
+
+    for _ in range(2):
+        with pytest.raises((genai_errors.ServerError, httpx.ReadTimeout)):
+            client.create_cached_context("instruction", "categories", 3600)
+    assert fake.context_timeouts == [5, 5]
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(ModelUnavailableError):
+        client.create_cached_context("instruction", "categories", 3600)
+    assert len(fake.context_timeouts) == 2
+
+    clock.now += 30
+    assert client.create_cached_context("instruction", "categories", 3600, timeout=1) in fake.contexts
+    assert fake.context_timeouts[-1] == 1
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_deadline_bounds_the_whole_call():
+    """
+    Tests that attempts stop once the deadline is spent, and each attempt gets the time left.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the call runs past its deadline
+    """
+    fake = FakeModelClient(latency=0.05, responses=[RECEIPT])
+    breaker = CircuitBreaker(failure_threshold=10, reset_timeout=30)
+    client = ResilientModelClient(fake, breaker, max_attempts=5, attempt_timeout=0.02, deadline=0.1, base_delay=0.01)
+
+    with pytest.raises(ModelUnavailableError):
+        client.generate(b"img", "image/jpeg", "prompt", CONFIG)
+
+    assert 1 <= fake.calls < 5
+
+
+def test_backoff_grows_and_is_capped():
+    """
+    Tests the upper bound of the jittered delay.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the delay does not double or exceeds the cap
+    """
+    assert [backoff_delay(attempt, 0.5, 3, rng=lambda: 1.0) for attempt in range(1, 5)] == [0.5, 1.0, 2.0, 3]
+    assert backoff_delay(3, 0.5, 3, rng=lambda: 0.0) == 0
+
+
+def test_service_reports_outage_as_unavailable():
+    """
+    Tests that the receipt service answers 503 when the model is unavailable.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if another status is returned
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    service = ReceiptService(None, model_client=_resilient(FakeModelClient(), clock, breaker))
+
+    with pytest.raises(HTTPException) as error:
+        service._analyze_receipt(b"img", "image/jpeg", "prompt")
+
+    assert error.value.status_code == 503
+
+
+def test_api_key_is_read_when_connecting(monkeypatch):
+    """
+    Tests that a client built before the environment was loaded picks up API_KEY on connect.
+
+    Args:
+        monkeypatch (MonkeyPatch) sets API_KEY after the client is built
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the key of import time is used
+    """
+    monkeypatch.delenv("API_KEY", raising=False)
+    client = GeminiModelClient("gemini-2.5-flash")
+    monkeypatch.setenv("API_KEY", "key-from-dotenv")
+
+    client.open()
+
+    assert client.client._api_client.api_key == "key-from-dotenv"
+    client.close()
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+
+from sqlalchemy.util import greenlet_spawn
+from utils.helpers.offload import run_cpu_bound
+from utils.helpers.password_util import PasswordUtil
+
+
+def test_cpu_bound_work_leaves_the_event_loop_in_a_greenlet():
+    """
+    Tests that work wrapped in run_cpu_bound runs on another thread when called from a
+    run_db_call greenlet, while the event loop keeps serving other tasks.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the work runs on the event loop thread or blocks it
+    """
+    release = threading.Event()
+    ticks = []
+
+    def blocking_work():
+        # only returns once the event loop has run the ticker in the meantime
+        assert release.wait(5)
+        return threading.get_ident()
+
+    async def ticker():
+        for _ in range(3):
+            ticks.append(threading.get_ident())
+            await asyncio.sleep(0)
+        release.set()
+
+    async def run():
+        return await asyncio.gather(greenlet_spawn(run_cpu_bound, blocking_work), ticker())
+
+    worker_thread, _ = asyncio.run(run())
+
+    assert len(ticks) == 3
+    assert worker_thread != ticks[0]
+
+
+def test_password_util_runs_in_a_greenlet_and_in_place():
+    """
+    Tests that hashing and verifying work both inside the async greenlet and in a plain thread.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a password does not verify against its hash
+    """
+    hashed = asyncio.run(greenlet_spawn(PasswordUtil.hash_password, "secret"))
+
+    assert asyncio.run(greenlet_spawn(PasswordUtil.verify_password, "secret", hashed))
+    assert PasswordUtil.verify_password("secret", hashed)
+    assert not PasswordUtil.verify_password("other", hashed)
+    assert run_cpu_bound(threading.get_ident) == threading.get_ident()
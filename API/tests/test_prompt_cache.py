@@ -0,0 +1,165 @@
+import threading
+import time
+
+import pytest
+from utils.helpers.model_client import FakeModelClient
+from utils.helpers.prompt_cache import PromptContextCache
+from utils.helpers.receipt_pipeline import (
+    RECEIPT_CACHED_PROMPT,
+    analyze_receipt,
+    generate_prompt,
+)
+
+RECEIPT = '{"items": [], "total": 0}'
+CATEGORIES = {f"Category {index}": [f"keyword {index}-{word}" for word in range(10)] for index in range(40)}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FailingModelClient(FakeModelClient):
+    def create_cached_context(self, system_instruction, context, ttl_seconds, timeout=None):
+        raise ConnectionError("Injected failure.")
+
+
+class SlowModelClient(FakeModelClient):
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def create_cached_context(self, system_instruction, context, ttl_seconds, timeout=None):
+        self.started.set()
+        self.release.wait(5)
+        return super().create_cached_context(system_instruction, context, ttl_seconds, timeout)
+
+
+def test_contexts_are_keyed_by_content():
+    """
+    Tests that the same category list reuses its context, an edited list gets a new one
+    and a context is replaced before the model expires it.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a context is created too often or reused after an edit
+    """
+    fake = FakeModelClient()
+    clock = Clock()
+    cache = PromptContextCache(fake, ttl_seconds=3600, min_tokens=0, clock=clock)
+
+    first = cache.get("instruction", "categories A")
+
+    assert cache.get("instruction", "categories A") == first
+    assert cache.get("instruction", "categories B") != first
+    clock.now += 3600 * 0.95
+    assert cache.get("instruction", "categories A") not in (None, first)
+    assert len(fake.contexts) == 3
+
+
+@pytest.mark.parametrize("client,min_tokens,retried", [
+    (FakeModelClient(), 1024, False),
+    (FailingModelClient(), 0, True),
+])
+def test_inline_fallback(client, min_tokens, retried):
+    """
+    Tests that a block below the model's minimum stays inline for good and a failed creation
+    is only tried again after the retry period.
+
+    Args:
+        client (IModelClient) model client
+        min_tokens (int) smallest block worth caching
+        retried (bool) whether the creation is tried again later
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a context is returned or created at the wrong time
+    """
+    clock = Clock()
+    cache = PromptContextCache(client, min_tokens=min_tokens, retry_seconds=60, clock=clock)
+
+    assert cache.get("instruction", "short") is None
+    assert cache.get("instruction", "short") is None
+    clock.now += 61
+    cache.get("instruction", "short")
+
+    stats = cache.stats()
+    assert stats["contexts_created"] == 0
+    assert stats["failed"] == (2 if retried else 0)
+    assert stats["too_small"] == (0 if retried else 1)
+
+
+def test_cached_context_saves_tokens_and_latency():
+    """
+    Tests that a call with a cached context only sends the short prompt, and that the usage
+    stats report the tokens and latency it saved against the inline call.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the cached call resends the instruction or saves nothing
+    """
+    fake = FakeModelClient(responses=[RECEIPT], token_latency=0.01)
+    prompts = []
+    generate = fake.generate
+    fake.generate = lambda image_bytes, mime_type, prompt, config, timeout=None: (
+        prompts.append((prompt, config)) or generate(image_bytes, mime_type, prompt, config, timeout)
+    )
+    cache = PromptContextCache(fake, min_tokens=1024)
+    prompt = generate_prompt(CATEGORIES)
+
+    analyze_receipt(fake, b"img", "image/jpeg", prompt, delay=0)
+    analyze_receipt(fake, b"img", "image/jpeg", prompt, delay=0, context_cache=cache)
+
+    assert prompts[1][0] == RECEIPT_CACHED_PROMPT
+    assert prompts[1][1].system_instruction is None and prompts[1][1].cached_content in fake.contexts
+    usage = fake.usage_stats()
+    assert usage["saved_tokens_per_call"] > 1000
+    assert usage["saved_latency_ms_per_call"] > 0
+
+
+def test_waiters_fall_back_to_inline_when_creation_is_slow():
+    """
+    Tests that a call waiting for another call's context creation gives up after the wait
+    bound and sends its prompt inline, while the creation itself still completes.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the waiter blocks for the whole creation or the context is lost
+    """
+    slow = SlowModelClient()
+    cache = PromptContextCache(slow, min_tokens=0, wait_seconds=0.05)
+    names = []
+    owner = threading.Thread(target=lambda: names.append(cache.get("instruction", "categories")))
+    owner.start()
+    assert slow.started.wait(5)
+
+    started = time.monotonic()
+    assert cache.get("instruction", "categories") is None
+    assert time.monotonic() - started < 1
+
+    slow.release.set()
+    owner.join(5)
+    assert names[0] in slow.contexts
+    assert cache.get("instruction", "categories") == names[0]
+    assert cache.stats()["wait_timeouts"] == 1
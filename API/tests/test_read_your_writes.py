@@ -0,0 +1,95 @@
+import time
+
+from utils.helpers.read_your_writes import RecentWriters, RedisRecentWriters
+
+
+class FakeRedis:
+    """
+    The two redis commands the registry uses, with expiry.
+    """
+
+    def __init__(self):
+        self.keys = {}
+
+    def set(self, key, value, px):
+        self.keys[key] = time.monotonic() + px / 1000
+
+    def exists(self, key):
+        return int(self.keys.get(key, 0) > time.monotonic())
+
+
+class BrokenRedis:
+    def set(self, key, value, px):
+        raise ConnectionError("redis is down")
+
+    def exists(self, key):
+        raise ConnectionError("redis is down")
+
+
+def test_write_on_one_worker_pins_reads_on_another():
+    """
+    Tests that a writer marked by one worker is seen as recent by another worker sharing
+    the registry, until the window ends.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the other worker would read the replica inside the window
+    """
+    client = FakeRedis()
+    writing_worker = RedisRecentWriters(client, window=0.05)
+    reading_worker = RedisRecentWriters(client, window=0.05)
+
+    writing_worker.mark(7)
+
+    assert reading_worker.is_recent(7)
+    assert not reading_worker.is_recent(8)
+    time.sleep(0.06)
+    assert not reading_worker.is_recent(7)
+
+
+def test_unreachable_registry_reads_from_the_primary():
+    """
+    Tests that a registry that cannot be reached never fails the request and sends reads
+    to the primary.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if an error escapes or the replica is chosen
+    """
+    writers = RedisRecentWriters(BrokenRedis(), window=5)
+
+    writers.mark(7)
+
+    assert writers.is_recent(7)
+    assert not writers.is_recent(None)
+
+
+def test_per_process_registry_is_not_shared():
+    """
+    Tests that the in-process registry honours its window and does not claim to be shared.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the window or the shared flag is wrong
+    """
+    writers = RecentWriters(window=0.05)
+    writers.mark(7)
+
+    assert writers.is_recent(7) and not writers.shared
+    time.sleep(0.06)
+    assert not writers.is_recent(7)
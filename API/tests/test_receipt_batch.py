@@ -0,0 +1,73 @@
+import io
+import threading
+import time
+
+from PIL import Image
+from services.receipt_service import ReceiptService
+
+
+class MockCategoryRepository:
+    def __init__(self):
+        self.calls = 0
+
+    def get_by_user(self, user_id, sort_by, order):
+        self.calls += 1
+        return []
+
+
+class BatchReceiptService(ReceiptService):
+    """
+    Replaces the model call with a short sleep and records how many calls overlap.
+    """
+
+    def __init__(self, category_repository):
+        super().__init__(category_repository)
+        self._lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.prompts = set()
+
+    def _analyze_receipt(self, image_bytes, mime_type, prompt):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.prompts.add(prompt)
+        time.sleep(0.05)
+        with self._lock:
+            self.running -= 1
+        return {"items": [], "total": len(image_bytes)}
+
+
+def _png() -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (10, 10)).save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_batch_respects_concurrency_and_reports_each_image():
+    """
+    Tests that a batch shares one category lookup and prompt, never runs more model calls than
+    the limit, and reports a broken image without failing the others.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the limit is exceeded or an image is missing from the results
+    """
+    repository = MockCategoryRepository()
+    service = BatchReceiptService(repository)
+    images = [(f"receipt-{index}.png", _png()) for index in range(6)] + [("notes.txt", b"not an image")]
+
+    entries = list(service.analyze_receipt_batch(images, user_id=1, concurrency=2))
+
+    assert sorted(entry["index"] for entry in entries) == list(range(7))
+    assert repository.calls == 1
+    assert len(service.prompts) == 1
+    assert service.max_running == 2
+    broken = next(entry for entry in entries if entry["filename"] == "notes.txt")
+    assert broken["error"]["status_code"] == 400
+    assert all("result" in entry for entry in entries if entry is not broken)
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+from utils.helpers.receipt_cache import ReceiptResultCache, receipt_cache_key
+
+
+def test_repeat_upload_is_served_from_cache():
+    """
+    Tests that the same image and prompt reach the model once, and that callers get independent copies.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the model is called again
+    """
+    cache = ReceiptResultCache(max_entries=10, ttl=60)
+    calls = []
+
+    def analyze():
+        calls.append(1)
+        return {"items": [{"name": "bread"}], "total": 3}
+
+    key = receipt_cache_key(1, b"image", "prompt")
+    first = cache.get_or_compute(key, analyze)
+    first["total"] = 99
+
+    assert cache.get_or_compute(key, analyze) == {"items": [{"name": "bread"}], "total": 3}
+    assert len(calls) == 1
+    assert key != receipt_cache_key(1, b"image", "other categories")
+    assert key != receipt_cache_key(2, b"image", "prompt")
+
+
+def test_failures_are_not_cached():
+    """
+    Tests that a failed analysis is retried on the next upload.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the failure is cached
+    """
+    cache = ReceiptResultCache(max_entries=10, ttl=60)
+
+    def fail():
+        raise ValueError("model unavailable")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("key", fail)
+
+    assert cache.get_or_compute("key", lambda: {"items": [], "total": 0}) == {"items": [], "total": 0}
+
+
+def test_concurrent_duplicates_share_one_call():
+    """
+    Tests that an identical upload arriving mid-analysis waits for the running call.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the model is called twice
+    """
+    cache = ReceiptResultCache(max_entries=10, ttl=60)
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def slow_analyze():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"items": [], "total": 1}
+
+    first = threading.Thread(target=lambda: results.append(cache.get_or_compute("key", slow_analyze)))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=lambda: results.append(cache.get_or_compute("key", slow_analyze)))
+    second.start()
+    while cache.stats()["joined_in_flight"] == 0:
+        time.sleep(0.001)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"items": [], "total": 1}] * 2
@@ -0,0 +1,154 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from schemas.expense import ReceiptExpensesCreate
+from services.expense_service import ExpenseService
+
+
+class MockExpenseRepository:
+    """
+    Records the bulk inserts of the service.
+    """
+
+    def __init__(self):
+        self.inserts = []
+
+    def add_many(self, rows):
+        self.inserts.append(rows)
+        start = 100 * len(self.inserts)
+        return list(range(start, start + len(rows)))
+
+
+class MockCategoryRepository:
+    """
+    Holds one user's categories and records the bulk inserts and after commit callbacks.
+    """
+
+    def __init__(self, categories):
+        self.categories = categories
+        self.inserts = []
+        self.callbacks = []
+
+    def get_by_user(self, user_id, sort_by, order):
+        return self.categories
+
+    def add_many(self, rows):
+        self.inserts.append(rows)
+        return list(range(50, 50 + len(rows)))
+
+    def after_commit(self, callback):
+        self.callbacks.append(callback)
+
+
+class MockGroupRepository:
+    def get_by_id(self, group_id):
+        return SimpleNamespace(id=group_id) if group_id == 7 else None
+
+
+class MockTotalsRepository:
+    def __init__(self):
+        self.deltas = []
+
+    def add_delta(self, group_id, user_id, amount_delta, count_delta):
+        self.deltas.append((group_id, user_id, amount_delta, count_delta))
+
+
+class MockCategoryCache:
+    def __init__(self):
+        self.invalidated = []
+
+    def invalidate(self, user_id):
+        self.invalidated.append(user_id)
+
+
+@pytest.fixture
+def repositories():
+    categories = [SimpleNamespace(id=1, title="Food", keywords=["bread", "milk"])]
+    return MockExpenseRepository(), MockCategoryRepository(categories), MockTotalsRepository(), MockCategoryCache()
+
+
+@pytest.fixture
+def expense_service(repositories):
+    expenses, categories, totals, cache = repositories
+    return ExpenseService(expenses, MockGroupRepository(), None, categories, totals, cache)
+
+
+def test_receipt_creates_missing_categories_and_all_expenses(expense_service, repositories):
+    """
+    Tests that existing categories are matched by title, each new category is inserted once
+    without keywords another category owns, and all expenses go out in one insert.
+
+    Args:
+        expense_service (ExpenseService) service under test
+        repositories (tuple) recording repositories and cache
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a category is duplicated or an expense is missing
+    """
+    expenses, categories, totals, cache = repositories
+    receipt = ReceiptExpensesCreate(group_id=7, items=[
+        {"name": "Bread", "quantity": 1, "price": 3, "category": "food ", "keywords": ["bread"]},
+        {"name": "Soap", "quantity": 2, "price": 7.5, "category": "Cleaning", "keywords": ["soap", "milk", "soap"]},
+        {"name": "Sponge", "quantity": 1, "price": 2, "category": "cleaning", "keywords": ["sponge"]},
+    ])
+
+    response = expense_service.create_expenses_from_receipt(receipt, 1)
+
+    assert categories.inserts == [[{"user_id": 1, "title": "Cleaning", "keywords": ["soap"]}]]
+    assert [row["category_id"] for row in expenses.inserts[0]] == [1, 50, 50]
+    assert response.data == {"expense_ids": [100, 101, 102], "created_categories": {"Cleaning": 50}}
+    assert totals.deltas == [(7, 1, 12.5, 3)]
+
+    categories.callbacks[0]()
+    assert cache.invalidated == [1]
+
+
+def test_receipt_with_known_categories_inserts_no_category(expense_service, repositories):
+    """
+    Tests that a receipt whose categories all exist only inserts expenses.
+
+    Args:
+        expense_service (ExpenseService) service under test
+        repositories (tuple) recording repositories and cache
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a category is inserted or the cache invalidated
+    """
+    expenses, categories, _, _ = repositories
+    receipt = ReceiptExpensesCreate(items=[{"name": "Milk", "price": 4, "category": "Food"}])
+
+    expense_service.create_expenses_from_receipt(receipt, 1)
+
+    assert categories.inserts == [] and categories.callbacks == []
+    assert len(expenses.inserts[0]) == 1 and expenses.inserts[0][0]["group_id"] is None
+
+
+def test_unknown_group_inserts_nothing(expense_service, repositories):
+    """
+    Tests that a receipt for a missing group is refused before anything is written.
+
+    Args:
+        expense_service (ExpenseService) service under test
+        repositories (tuple) recording repositories and cache
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the group is not checked first
+    """
+    expenses, categories, _, _ = repositories
+    receipt = ReceiptExpensesCreate(group_id=8, items=[{"name": "Soap", "price": 7, "category": "Cleaning"}])
+
+    with pytest.raises(HTTPException) as error:
+        expense_service.create_expenses_from_receipt(receipt, 1)
+
+    assert error.value.status_code == 404
+    assert expenses.inserts == [] and categories.inserts == []
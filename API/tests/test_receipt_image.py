@@ -0,0 +1,106 @@
+import io
+
+import pytest
+from PIL import Image
+from utils.helpers.receipt_image import ReceiptImagePreprocessor, prepare_receipt_image
+
+
+def _photo(size=(4000, 3000), image_format="JPEG", orientation=None) -> bytes:
+    image = Image.new("RGB", size, (250, 250, 240))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    output = io.BytesIO()
+    image.save(output, format=image_format, exif=exif)
+    return output.getvalue()
+
+
+def test_large_photo_is_shrunk_and_reencoded():
+    """
+    Tests that a 12 megapixel PNG comes out as a JPEG within the maximum dimension.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the photo is not resized or not converted
+    """
+    prepared = prepare_receipt_image(_photo(image_format="PNG"), max_dimension=1024)
+
+    assert prepared.mime_type == "image/jpeg"
+    assert (prepared.width, prepared.height) == (1024, 768)
+    with Image.open(io.BytesIO(prepared.data)) as image:
+        assert image.format == "JPEG"
+
+
+def test_exif_orientation_is_applied():
+    """
+    Tests that a photo taken in portrait but stored in landscape is rotated upright.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the orientation is ignored
+    """
+    prepared = prepare_receipt_image(_photo(size=(800, 600), orientation=6), max_dimension=2048)
+
+    assert (prepared.width, prepared.height) == (600, 800)
+
+
+@pytest.mark.parametrize("grayscale,output_format,mode,mime_type", [
+    (True, "jpeg", "L", "image/jpeg"),
+    (False, "webp", "RGB", "image/webp"),
+])
+def test_output_settings(grayscale, output_format, mode, mime_type):
+    """
+    Tests the grayscale and WebP settings.
+
+    Args:
+        grayscale (bool) whether the photo is converted to grayscale
+        output_format (str) format the photo is re-encoded to
+        mode (str) expected Pillow mode of the result
+        mime_type (str) expected mime type of the result
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a setting is ignored
+    """
+    prepared = prepare_receipt_image(_photo(), max_dimension=1024, grayscale=grayscale, output_format=output_format)
+
+    assert prepared.mime_type == mime_type
+    with Image.open(io.BytesIO(prepared.data)) as image:
+        assert image.mode == mode
+
+
+def test_preprocessor_runs_in_process_pool():
+    """
+    Tests that the preprocessor returns the prepared photo from its worker processes
+    and rejects bytes that are not an image.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the pool does not return the prepared photo
+    """
+    preprocessor = ReceiptImagePreprocessor(workers=1, max_dimension=512)
+    try:
+        prepared = preprocessor.prepare(_photo())
+        assert (prepared.width, prepared.height) == (512, 384)
+
+        with pytest.raises(ValueError):
+            preprocessor.prepare(b"not an image")
+    finally:
+        preprocessor.shutdown()
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from services.receipt_job_service import ReceiptJobService
+
+
+class MockReceiptJobRepository:
+    """
+    Records how the service closes a claimed job.
+    """
+
+    def __init__(self, job=None):
+        self.job = job
+        self.outcomes = []
+
+    def get_by_id(self, job_id):
+        return self.job if self.job and self.job.id == job_id else None
+
+    def complete(self, job, result):
+        self.outcomes.append(("complete", result))
+        return True
+
+    def fail(self, job, error):
+        self.outcomes.append(("fail", error))
+        return True
+
+    def release(self, job, error):
+        self.outcomes.append(("release", error))
+        return True
+
+
+class MockReceiptService:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def analyze_receipt_image(self, image_bytes, user_id, categories=None):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+def _job(attempts=1):
+    return SimpleNamespace(id=1, user_id=5, image=b"img", attempts=attempts, status="running")
+
+
+@pytest.mark.parametrize("outcome,attempts,expected", [
+    ({"items": [], "total": 0}, 1, "complete"),
+    (HTTPException(status_code=400, detail="The provided image is not a valid receipt image."), 1, "fail"),
+    (HTTPException(status_code=503, detail="The receipt model is unavailable, try again later."), 1, "release"),
+    (ConnectionError("model unavailable"), 1, "release"),
+    (ConnectionError("model unavailable"), 3, "fail"),
+])
+def test_run_job_records_outcome(outcome, attempts, expected):
+    """
+    Tests that results complete the job, analysis errors fail it, and transient errors
+    requeue it until the attempts run out.
+
+    Args:
+        outcome (dict or Exception) what the analysis returns or raises
+        attempts (int) attempt number of the claim
+        expected (str) repository call the job should end with
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the job is closed the wrong way
+    """
+    repository = MockReceiptJobRepository()
+    service = ReceiptJobService(repository, MockReceiptService(outcome), max_attempts=3)
+
+    service.run_job(_job(attempts))
+
+    assert [name for name, _ in repository.outcomes] == [expected]
+
+
+def test_jobs_of_other_users_are_hidden():
+    """
+    Tests that a user cannot read another user's job.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the job is returned
+    """
+    service = ReceiptJobService(MockReceiptJobRepository(_job()))
+
+    with pytest.raises(HTTPException) as error:
+        service.get_job(1, user_id=6)
+
+    assert error.value.status_code == 404
+
+
+def test_broken_upload_is_rejected_before_queueing():
+    """
+    Tests that bytes that are not an image never reach the queue.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the upload is accepted
+    """
+    service = ReceiptJobService(MockReceiptJobRepository())
+
+    with pytest.raises(HTTPException) as error:
+        service.submit_job(b"not an image", 5)
+
+    assert error.value.status_code == 400
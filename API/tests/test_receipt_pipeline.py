@@ -0,0 +1,83 @@
+import pytest
+from utils.helpers.model_client import FakeModelClient, GeminiModelClient
+from utils.helpers.receipt_pipeline import (
+    InvalidReceiptResponseError,
+    NotAReceiptError,
+    analyze_receipt,
+    generate_prompt,
+)
+
+RECEIPT = '{"items": [{"name": "bread", "quantity": 1, "price": 3, "category": "Food", "keywords": ["bread"]}], "total": 3}'
+
+
+def test_invalid_answers_are_asked_again():
+    """
+    Tests that an answer off the schema is retried and a fenced valid answer is parsed.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the valid answer is not returned
+    """
+    fake = FakeModelClient(responses=['{"items": []}', f"```json\n{RECEIPT}\n```"])
+
+    receipt = analyze_receipt(fake, b"img", "image/jpeg", generate_prompt({"Food": ["bread"]}), delay=0)
+
+    assert receipt["total"] == 3
+    assert fake.calls == 2
+
+
+@pytest.mark.parametrize("responses,error,calls", [
+    (["{}"], NotAReceiptError, 1),
+    (["not json"], InvalidReceiptResponseError, 3),
+])
+def test_failed_answers(responses, error, calls):
+    """
+    Tests that an empty answer stops at once and invalid answers stop after max_retries.
+
+    Args:
+        responses (list) answers of the model
+        error (type) expected exception
+        calls (int) expected number of model calls
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the wrong exception is raised or the model is called too often
+    """
+    fake = FakeModelClient(responses=responses)
+
+    with pytest.raises(error):
+        analyze_receipt(fake, b"img", "image/jpeg", "prompt", max_retries=3, delay=0)
+
+    assert fake.calls == calls
+
+
+def test_gemini_client_keeps_one_sdk_client_until_closed():
+    """
+    Tests that the SDK client is built once and rebuilt only after close().
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a new SDK client is built per call
+    """
+    client = GeminiModelClient("gemini-2.5-flash", api_key="test-key", max_connections=4)
+    client.open()
+    first = client.client
+
+    client.open()
+    assert client.client is first
+
+    client.close()
+    assert client.client is not first
+    client.close()
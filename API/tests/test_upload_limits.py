@@ -0,0 +1,154 @@
+import io
+import os
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.testclient import TestClient
+from middleware.body_size_middleware import BodySizeLimitMiddleware
+from PIL import Image
+from utils.helpers.receipt_image import check_receipt_image, check_upload_size
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_body_size=100, limits={"/upload": 1000})
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/upload")
+    async def upload(image: UploadFile = File(...)):
+        check_upload_size(image, max_bytes=500)
+        return {"size": len(await image.read())}
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path,body,status_code", [
+    ("/echo", b"x" * 100, 200),
+    ("/echo", b"x" * 101, 413),
+    ("/upload", b"x" * 2000, 413),
+])
+def test_declared_length_is_checked(path, body, status_code):
+    """
+    Tests that a Content-Length above the limit of the path is refused.
+
+    Args:
+        path (str) requested path
+        body (bytes) request body
+        status_code (int) expected status
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the limit is not applied
+    """
+    assert _client().post(path, content=body).status_code == status_code
+
+
+def test_streamed_body_is_cut_off():
+    """
+    Tests that a chunked body without Content-Length is refused once it crosses the limit.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the whole body is accepted
+    """
+    chunks = (b"x" * 40 for _ in range(5))
+
+    response = _client().post("/echo", content=chunks)
+
+    assert response.status_code == 413
+
+
+def test_large_file_in_small_request_is_refused():
+    """
+    Tests the per-file limit for a file that fits in the request limit.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the file is accepted
+    """
+    client = _client()
+
+    assert client.post("/upload", files={"image": ("r.jpg", b"x" * 400)}).json() == {"size": 400}
+    assert client.post("/upload", files={"image": ("r.jpg", b"x" * 600)}).status_code == 413
+
+
+def test_image_dimensions_are_checked_from_header():
+    """
+    Tests that images with too many pixels, including decompression bombs, are refused
+    and that unsupported formats are rejected.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if an image is accepted
+    """
+    output = io.BytesIO()
+    Image.new("RGB", (100, 100)).save(output, format="PNG")
+    assert check_receipt_image(output.getvalue()) == "image/png"
+    with pytest.raises(ValueError, match="too large"):
+        check_receipt_image(output.getvalue(), max_pixels=5000)
+
+    bomb = io.BytesIO()
+    Image.new("1", (12000, 12000)).save(bomb, format="PNG")
+    assert len(bomb.getvalue()) < 100_000
+    with pytest.raises(ValueError, match="too large"):
+        check_receipt_image(bomb.getvalue())
+
+    icon = io.BytesIO()
+    Image.new("RGB", (16, 16)).save(icon, format="ICO")
+    with pytest.raises(ValueError, match="not valid"):
+        check_receipt_image(icon.getvalue())
+
+
+def test_oversized_image_is_a_bad_request(monkeypatch):
+    """
+    Tests that POST /receipt/process-receipt answers 400 for an image with too many pixels,
+    before the model is called.
+
+    Args:
+        monkeypatch (MonkeyPatch) provides a database URL for importing the routes
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the image is not refused as the client's error
+    """
+    # the routes build the engine when imported, it never connects in this test
+    monkeypatch.setenv("DATABASE_URL", os.getenv("DATABASE_URL", "postgresql://localhost/expenses"))
+    from dependencies.di import get_current_user_id, get_receipt_service
+    from routes.receipt_routes import router
+    from services.receipt_service import ReceiptService
+
+    app = FastAPI()
+    app.include_router(router, prefix="/receipt")
+    category_repository = SimpleNamespace(get_by_user=lambda **_: [])
+    app.dependency_overrides[get_current_user_id] = lambda: 1
+    app.dependency_overrides[get_receipt_service] = lambda: ReceiptService(category_repository, model_client=SimpleNamespace())
+
+    bomb = io.BytesIO()
+    Image.new("1", (12000, 12000)).save(bomb, format="PNG")
+    response = TestClient(app).post("/receipt/process-receipt", files={"image": ("r.png", bomb.getvalue(), "image/png")})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "The provided image is too large."}
@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from schemas.expense import ExpenseCreate, ExpenseUpdate
+from services.category_service import CategoryService
+from services.expense_service import ExpenseService
+from services.group_service import GroupService
+from services.user_service import UserService
+
+from tests.test_group_member_totals import MockExpenseRepository, MockLookupRepository
+
+
+class MockSpendRepository:
+    """
+    Records the monthly spend deltas the service sends, keyed by the created_at it passed.
+    """
+
+    def __init__(self):
+        self.deltas = []
+        self.spent = 0.0
+
+    def add_delta(self, user_id, created_at, amount_delta, count_delta):
+        self.deltas.append((user_id, created_at, amount_delta, count_delta))
+
+    def subtract_group_expenses(self, group_id):
+        self.deltas.append(("group", group_id))
+
+    def subtract_category_expenses(self, category_id):
+        self.deltas.append(("category", category_id))
+
+    def get_spent(self, user_id, month):
+        self.month = month
+        return self.spent
+
+
+def test_expense_writes_move_the_monthly_spend():
+    """
+    Tests that create, update and delete send their deltas, the later ones against the expense's own month.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if a delta is missing or wrong
+    """
+    spend_repo = MockSpendRepository()
+    expense_repo = MockExpenseRepository()
+    service = ExpenseService(expense_repo, MockLookupRepository(), None, MockLookupRepository(), spend_repository=spend_repo)
+
+    expense_id = service.create_expense(ExpenseCreate(title="Taxi", amount=20, category_id=1), 1).data["id"]
+    created_at = datetime(2025, 1, 31, 22, 30, tzinfo=timezone.utc)
+    expense_repo.expenses[expense_id].created_at = created_at
+
+    service.update_expense(expense_id, ExpenseUpdate(amount=35, category_id=1), 1)
+    service.delete_expense(expense_id, 1)
+
+    assert spend_repo.deltas == [
+        (1, None, 20, 1),
+        (1, created_at, 15, 0),
+        (1, created_at, -35, -1),
+    ]
+
+
+def test_remaining_budget_reads_the_counter():
+    """
+    Tests that the budget endpoint reads the current month's counter instead of summing expenses.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the spend is not taken from the counter
+    """
+    spend_repo = MockSpendRepository()
+    spend_repo.spent = 40.0
+    user_repo = SimpleNamespace(get_by_id=lambda user_id: SimpleNamespace(id=user_id, budget=100))
+    service = UserService(user_repo, spend_repo)
+
+    data = service.get_remaining_budget(1).data
+
+    assert data["remaining_budget"] == 60.0
+    assert spend_repo.month.day == 1
+
+
+def test_cascading_deletes_take_their_expenses_out_first():
+    """
+    Tests that deleting a group or a category takes its expenses out of the monthly spend
+    before the delete that cascades to them.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    Exceptions:
+        AssertionError if the spend is not adjusted, or only after the delete
+    """
+    spend_repo = MockSpendRepository()
+    group_repo = SimpleNamespace(
+        get_by_id=lambda group_id: SimpleNamespace(id=group_id),
+        delete=lambda group_id: spend_repo.deltas.append(("deleted group", group_id)) or group_id,
+    )
+    category_repo = SimpleNamespace(
+        get_by_id=lambda category_id: SimpleNamespace(id=category_id, user_id=1),
+        delete=lambda category_id: spend_repo.deltas.append(("deleted category", category_id)),
+    )
+
+    GroupService(group_repo, spend_repository=spend_repo).delete_group(4)
+    CategoryService(category_repo, spend_repository=spend_repo).delete_category(7, 1)
+
+    assert spend_repo.deltas == [("group", 4), ("deleted group", 4), ("category", 7), ("deleted category", 7)]
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from utils.helpers.lru_cache import LRUCache
+
+
+class UserCategories:
+    """
+    Immutable snapshot of one user's categories, safe to share between requests.
+    """
+
+    def __init__(self, categories: Iterable[Tuple[int, str, List[str]]]):
+        self.by_id: Dict[int, Tuple[str, Tuple[str, ...]]] = {
+            category_id: (title, tuple(keywords or ()))
+            for category_id, title, keywords in sorted(categories, key=lambda category: category[1])
+        }
+        raw = json.dumps(sorted([category_id, title, list(keywords)] for category_id, (title, keywords) in self.by_id.items()))
+        # changes whenever a category is added, renamed, re-keyworded or removed
+        self.version = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    def __contains__(self, category_id: int) -> bool:
+        return category_id in self.by_id
+
+    def keywords_by_title(self) -> Dict[str, List[str]]:
+        return {title: list(keywords) for title, keywords in self.by_id.values()}
+
+
+class CategoryCache:
+    """
+    Per-user category snapshots, bounded by number of users and by age.
+
+    The cache lives in each worker process. Writes invalidate it after they commit, other
+    workers pick the change up when their entry expires, so keep the ttl short.
+    """
+
+    def __init__(self, max_users: int, ttl: float):
+        self._entries = LRUCache(max_users, ttl=ttl)
+        self._lock = threading.Lock()
+        self._invalidations = 0
+
+    def get(self, user_id: int, loader: Callable[[], Iterable]) -> UserCategories:
+        """
+        Returns the user's categories, calling loader (which returns Category rows) on a miss.
+        """
+        snapshot = self._entries.get(user_id)
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            invalidations = self._invalidations
+        snapshot = UserCategories((category.id, category.title, category.keywords) for category in loader())
+
+        with self._lock:
+            # an invalidation during the load may mean the rows are already stale, do not keep them
+            if invalidations == self._invalidations:
+                self._entries.set(user_id, snapshot)
+
+        return snapshot
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._invalidations += 1
+            self._entries.pop(user_id)
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+
+category_cache = CategoryCache(
+    max_users=int(os.getenv("CATEGORY_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("CATEGORY_CACHE_TTL", "60")),
+)
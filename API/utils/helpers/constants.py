@@ -4,12 +4,18 @@ GROUP_FIELD = "group"
 PASSWORD_FIELD = "password"
 HASHED_PASSWORD_FIELD = "hashed_password"
 EMAIL_FIELD = "email"
+STATUS_ACCEPTED = 202
+STATUS_NOT_MODIFIED = 304
 STATUS_BAD_REQUEST = 400
 STATUS_NOT_FOUND = 404
 STATUS_FORBIDDEN = 403
+STATUS_PAYLOAD_TOO_LARGE = 413
 STATUS_INTERNAL_SERVER_ERROR = 500
+STATUS_SERVICE_UNAVAILABLE = 503
 EXPENSE_FIELD = "expense"
 ID_FIELD = "id"
+EXPENSE_IDS_FIELD = "expense_ids"
+CREATED_CATEGORIES_FIELD = "created_categories"
 BUDGET_FIELD = "budget"
 SPENT_THIS_MONTH = "spent_this_month"
 REMAINING_BUDGET = "remaining_budget"
@@ -0,0 +1,48 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from fastapi import HTTPException
+from utils.helpers.constants import STATUS_BAD_REQUEST
+
+
+def encode_cursor(sort_by: str, order: str, value: Any, row_id: int) -> str:
+    """
+    Builds an opaque cursor pointing right after the row with the given (sort value, id).
+    """
+    payload = {"s": sort_by, "o": order, "id": row_id}
+    if isinstance(value, datetime):
+        payload["dt"] = value.isoformat()
+    else:
+        payload["v"] = value
+
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], sort_by: str, order: str) -> Optional[Tuple[Any, int]]:
+    """
+    Converts a cursor back into the (sort value, id) of the last row of the previous page.
+    A cursor only continues the listing it was issued for, so the sort has to match.
+    """
+    if not cursor:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        row_id = int(payload["id"])
+        value = datetime.fromisoformat(payload["dt"]) if "dt" in payload else payload["v"]
+        cursor_sort_by, cursor_order = payload["s"], payload["o"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=STATUS_BAD_REQUEST, detail="Invalid cursor.")
+
+    if cursor_sort_by != sort_by or cursor_order != order.lower():
+        raise HTTPException(
+            status_code=STATUS_BAD_REQUEST,
+            detail="Cursor does not match the requested sort_by and order."
+        )
+
+    return value, row_id
@@ -0,0 +1,51 @@
+import hashlib
+from typing import Iterable, Tuple
+
+from fastapi import Request, Response
+from utils.helpers.constants import STATUS_NOT_MODIFIED
+
+# clients may keep the body but must revalidate it before every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def representation_key(request: Request) -> str:
+    """
+    Identifies the representation being served: path plus the query parameters in a stable order.
+    """
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def make_etag(representation: str, versions: Iterable[Tuple[str, int]]) -> str:
+    """
+    Builds a strong ETag from the representation and the versions of the scopes it depends on.
+    """
+    digest = hashlib.sha256(representation.encode("utf-8"))
+    for scope, version in versions:
+        digest.update(f"|{scope}={version}".encode("utf-8"))
+
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Checks If-None-Match against the current ETag. GET uses the weak comparison, so W/ tags match too.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    if "*" in candidates:
+        return True
+
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def not_modified_response(etag: str, cache_control: str = CACHE_CONTROL) -> Response:
+    return Response(status_code=STATUS_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
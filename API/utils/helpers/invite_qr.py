@@ -0,0 +1,100 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import qrcode
+import qrcode.image.svg
+from utils.helpers.lru_cache import LRUCache
+
+QR_MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+
+class QRImage:
+    """
+    Rendered invite QR code. The ETag only depends on the invitation code and the format.
+    """
+
+    def __init__(self, invitation_code: str, image_format: str, content: bytes):
+        self.content = content
+        self.media_type = QR_MEDIA_TYPES[image_format]
+        self.etag = invite_qr_etag(invitation_code, image_format)
+
+
+def invite_qr_etag(invitation_code: str, image_format: str) -> str:
+    digest = hashlib.sha256(f"{image_format}:{invitation_code}".encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def invite_qr_version(invitation_code: str) -> str:
+    """
+    Version of the image URLs (`?v=`): changes with the invitation code, so a URL that
+    carries it can be cached for long without ever showing a replaced code.
+    """
+    return hashlib.sha256(invitation_code.encode("utf-8")).hexdigest()[:16]
+
+
+def render_invite_qr(invitation_code: str, image_format: str) -> bytes:
+    """
+    Renders the QR code of an invitation code. CPU bound, a few milliseconds per image.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(invitation_code)
+    qr.make(fit=True)
+
+    if image_format == "svg":
+        img = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+        buffer = io.BytesIO()
+        img.save(buffer)
+    else:
+        img = qr.make_image(fill_color="black", back_color="white")
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+
+    return buffer.getvalue()
+
+
+class InviteQRCache:
+    """
+    Rendered QR codes by (invitation code, format). Invitation codes never change, so entries
+    never go stale and only the LRU bound applies.
+    """
+
+    def __init__(self, max_entries: int, prerender_workers: int = 1):
+        self._entries = LRUCache(max_entries)
+        self._executor = ThreadPoolExecutor(max_workers=prerender_workers, thread_name_prefix="invite-qr")
+
+    def get(self, invitation_code: str, image_format: str) -> QRImage:
+        """
+        Returns the QR code, rendering it on a miss. Call it off the event loop.
+        """
+        key = (invitation_code, image_format)
+        image = self._entries.get(key)
+        if image is None:
+            image = QRImage(invitation_code, image_format, render_invite_qr(invitation_code, image_format))
+            self._entries.set(key, image)
+
+        return image
+
+    def prerender(self, invitation_code: str) -> None:
+        """
+        Renders the QR codes of a new group in the background, so the first request is a hit.
+        """
+        for image_format in QR_MEDIA_TYPES:
+            self._executor.submit(self.get, invitation_code, image_format)
+
+    def stats(self) -> dict:
+        return self._entries.stats()
+
+
+invite_qr_cache = InviteQRCache(int(os.getenv("INVITE_QR_CACHE_SIZE", "5000")))
+# renders both formats after a group is created, off by default since most groups never show their QR
+INVITE_QR_PRERENDER = os.getenv("INVITE_QR_PRERENDER", "false").lower() in ("1", "true", "yes")
@@ -1,15 +1,20 @@
+import hashlib
 import os
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 import jwt
 from fastapi import HTTPException, Request
+from utils.helpers.lru_cache import LRUCache
 
 ROMANIA_TZ = ZoneInfo("Europe/Bucharest")
 SECRET_KEY = os.getenv("JWT_SECRET", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 72  
 
+# token hash -> user id of tokens whose signature was already checked, entries expire with the token
+verified_tokens = LRUCache(int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")))
+
 class JwtUtils:
     @staticmethod
     def encode_token(user_id: int) -> str:
@@ -27,26 +32,39 @@ class JwtUtils:
     def decode_token(token: str) -> int:
         """
         Decodes the jwt token with the secret key.
+        A token seen before is answered from the cache until its exp, without checking the signature again.
         """
+        token_hash = hashlib.sha256(token.encode("utf-8")).digest()
+        user_id = verified_tokens.get(token_hash)
+        if user_id is not None:
+            return user_id
+
         try:
             payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return int(payload["sub"])
+            user_id = int(payload["sub"])
+            verified_tokens.set(token_hash, user_id, expires_at=payload.get("exp"))
+            return user_id
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Token expired.")
         except jwt.InvalidTokenError:
             raise HTTPException(status_code=401, detail="Invalid token.")
 
     @staticmethod
-    def auth_wrapper(request: Request):
+    def get_token(request: Request) -> str | None:
         """
-        Returns the id of the logged in user.
+        Returns the raw token sent as bearer header or cookie, without verifying it.
         """
         auth_header = request.headers.get("Authorization")
-        token = None
         if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-        elif "access_token" in request.cookies:
-            token = request.cookies["access_token"]
+            return auth_header.split(" ")[1]
+        return request.cookies.get("access_token")
+
+    @staticmethod
+    def auth_wrapper(request: Request):
+        """
+        Returns the id of the logged in user.
+        """
+        token = JwtUtils.get_token(request)
 
         if not token:
             raise HTTPException(status_code=401, detail="Missing authentication token.")
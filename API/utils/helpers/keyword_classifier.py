@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.helpers.lru_cache import LRUCache
+
+# shorter keywords must match a whole word, longer ones also match inflected forms ("lapte" in "laptele")
+MIN_PREFIX_KEYWORD_LENGTH = 4
+MAX_INFLECTION_SUFFIX = 3
+
+_NOT_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercases, drops diacritics (so "pâine" matches "paine") and turns everything that is not
+    a letter or a digit into single spaces.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NOT_ALPHANUMERIC.sub(" ", stripped).strip()
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a fixed set of patterns. find() reports every occurrence
+    of every pattern in one pass over the text, however many patterns there are.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self.patterns = list(patterns)
+
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = next_node
+            self._output[node].append(index)
+
+        # breadth first, so the fail link of a node is final before its children need it;
+        # the root's children keep failing to the root
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Returns (pattern index, end position) for every occurrence, end exclusive.
+        """
+        matches = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for index in self._output[node]:
+                matches.append((index, position + 1))
+        return matches
+
+
+class ItemClassification:
+    """
+    Local verdict for one item name. `confidence` is the share of the matched keyword weight
+    that points at `category`: 1.0 when every match agrees, 0.0 when nothing matched.
+    """
+
+    def __init__(self, category: Optional[str], confidence: float, scores: Dict[str, int]):
+        self.category = category
+        self.confidence = confidence
+        self.scores = scores
+
+    def is_confident(self, min_confidence: float) -> bool:
+        return self.category is not None and self.confidence >= min_confidence
+
+
+class KeywordClassifier:
+    """
+    Classifies item names into one user's categories from their titles and keywords,
+    without asking the model. A match must start at a word; each distinct keyword counts
+    once, weighted by its length, so "iaurt grecesc" outweighs "iaurt".
+    """
+
+    def __init__(self, categories: Dict[str, Sequence[str]]):
+        self.keywords: Dict[str, Tuple[str, ...]] = {title: tuple(keywords) for title, keywords in categories.items()}
+        categories_by_pattern: Dict[str, set] = {}
+        for title, keywords in self.keywords.items():
+            for phrase in (title, *keywords):
+                pattern = normalize_text(phrase)
+                if pattern:
+                    categories_by_pattern.setdefault(pattern, set()).add(title)
+
+        # a leading space anchors every pattern to the start of a word
+        self._patterns = list(categories_by_pattern)
+        self._categories = [sorted(categories_by_pattern[pattern]) for pattern in self._patterns]
+        self._automaton = KeywordAutomaton([" " + pattern for pattern in self._patterns])
+
+    def classify(self, name: str) -> ItemClassification:
+        text = " " + normalize_text(name) + " "
+        spans = []
+        for index, end in self._automaton.find(text):
+            # a keyword ending inside a word counts as an inflected form when it is long enough
+            if text[end] == " " or (
+                len(self._patterns[index]) >= MIN_PREFIX_KEYWORD_LENGTH
+                and text.index(" ", end) - end <= MAX_INFLECTION_SUFFIX
+            ):
+                spans.append((end - len(self._patterns[index]), end, index))
+
+        # "iaurt" inside a matched "iaurt grecesc" is not a second opinion
+        matched = {
+            index for start, end, index in spans
+            if not any(other_start <= start and end <= other_end and (other_start, other_end) != (start, end)
+                       for other_start, other_end, _ in spans)
+        }
+
+        scores: Dict[str, int] = {}
+        for index in matched:
+            for title in self._categories[index]:
+                scores[title] = scores.get(title, 0) + len(self._patterns[index])
+        if not scores:
+            return ItemClassification(None, 0.0, scores)
+
+        best = max(sorted(scores), key=scores.get)
+        return ItemClassification(best, round(scores[best] / sum(scores.values()), 4), scores)
+
+
+class KeywordClassifierCache:
+    """
+    Built classifiers keyed by the content of the category set, so each user's automaton is
+    built once per category version and per worker. Items below `min_confidence` go to the model.
+    Also counts where item categories came from.
+    """
+
+    def __init__(self, max_entries: int, min_confidence: float = 0.8):
+        self.min_confidence = min_confidence
+        self._entries = LRUCache(max_entries)
+        self._lock = threading.Lock()
+        self.items_local = 0
+        self.items_model = 0
+
+    def get(self, categories: Dict[str, Sequence[str]]) -> KeywordClassifier:
+        raw = json.dumps(sorted((title, list(keywords)) for title, keywords in categories.items()))
+        key = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        classifier = self._entries.get(key)
+        if classifier is None:
+            classifier = KeywordClassifier(categories)
+            self._entries.set(key, classifier)
+        return classifier
+
+    def record(self, local: int, model: int) -> None:
+        with self._lock:
+            self.items_local += local
+            self.items_model += model
+
+    def stats(self) -> dict:
+        with self._lock:
+            items = self.items_local + self.items_model
+            return {
+                **self._entries.stats(),
+                "items_classified_locally": self.items_local,
+                "items_sent_to_model": self.items_model,
+                "local_ratio": round(self.items_local / items, 4) if items else 0.0,
+            }
+
+
+# off: every photo is categorized by the model in one call, as before
+RECEIPT_LOCAL_CLASSIFIER = os.getenv("RECEIPT_LOCAL_CLASSIFIER", "true").lower() in ("1", "true", "yes")
+
+keyword_classifier_cache = KeywordClassifierCache(
+    max_entries=int(os.getenv("RECEIPT_CLASSIFIER_CACHE_SIZE", "10000")),
+    min_confidence=float(os.getenv("RECEIPT_CLASSIFIER_MIN_CONFIDENCE", "0.8")),
+)
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, FrozenSet, Iterable, Optional
+
+from utils.helpers.lru_cache import LRUCache
+
+
+class IMembershipBackend(ABC):
+    """
+    Storage for the member sets of groups. Implementations must be safe to share between threads.
+
+    Every group has a version that invalidate bumps. A loader reads the version before it
+    queries, and set_if_current drops its result if the group was invalidated meanwhile.
+    """
+    # True when every worker sees the same entries and invalidations
+    shared = False
+
+    @abstractmethod
+    def get(self, group_id: int) -> Optional[FrozenSet[int]]: ...
+
+    @abstractmethod
+    def version(self, group_id: int) -> int: ...
+
+    @abstractmethod
+    def set_if_current(self, group_id: int, version: int, members: FrozenSet[int]) -> None: ...
+
+    @abstractmethod
+    def invalidate(self, group_id: int) -> None: ...
+
+    @abstractmethod
+    def stats(self) -> dict: ...
+
+
+class InMemoryMembershipBackend(IMembershipBackend):
+    """
+    Per worker backend. Other workers see a change when their entry expires.
+    """
+
+    def __init__(self, max_groups: int, ttl: float):
+        self._entries = LRUCache(max_groups, ttl=ttl)
+        self._versions: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, group_id: int) -> Optional[FrozenSet[int]]:
+        return self._entries.get(group_id)
+
+    def version(self, group_id: int) -> int:
+        with self._lock:
+            return self._versions.get(group_id, 0)
+
+    def set_if_current(self, group_id: int, version: int, members: FrozenSet[int]) -> None:
+        with self._lock:
+            if self._versions.get(group_id, 0) == version:
+                self._entries.set(group_id, members)
+
+    def invalidate(self, group_id: int) -> None:
+        with self._lock:
+            self._versions[group_id] = self._versions.get(group_id, 0) + 1
+            self._entries.pop(group_id)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._entries.stats()}
+
+
+class RedisMembershipBackend(IMembershipBackend):
+    """
+    Backend shared by every worker, so an invalidation is seen everywhere at once.
+    Needs the optional `redis` package.
+    """
+    shared = True
+
+    # stores the members only while the version key still holds the version the loader read
+    SET_IF_CURRENT = """
+    if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+        redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    end
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = "group_members:"):
+        self.client = client
+        self.ttl = int(ttl)
+        self.prefix = prefix
+        self._set_if_current = client.register_script(self.SET_IF_CURRENT)
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float) -> "RedisMembershipBackend":
+        try:
+            import redis
+        except ImportError as error:
+            raise RuntimeError("MEMBERSHIP_CACHE_URL points at redis, install the `redis` package.") from error
+
+        return cls(redis.Redis.from_url(url), ttl)
+
+    def _version_key(self, group_id: int) -> str:
+        return f"{self.prefix}{group_id}:version"
+
+    def get(self, group_id: int) -> Optional[FrozenSet[int]]:
+        raw = self.client.get(f"{self.prefix}{group_id}")
+        if raw is None:
+            return None
+        return frozenset(json.loads(raw))
+
+    def version(self, group_id: int) -> int:
+        return int(self.client.get(self._version_key(group_id)) or 0)
+
+    def set_if_current(self, group_id: int, version: int, members: FrozenSet[int]) -> None:
+        self._set_if_current(
+            keys=[f"{self.prefix}{group_id}", self._version_key(group_id)],
+            args=[version, json.dumps(sorted(members)), self.ttl],
+        )
+
+    def invalidate(self, group_id: int) -> None:
+        # the version key has no expiry, an expired one would let a load that started before it be kept
+        with self.client.pipeline() as pipe:
+            pipe.incr(self._version_key(group_id))
+            pipe.delete(f"{self.prefix}{group_id}")
+            pipe.execute()
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class MembershipCache:
+    """
+    Member set of each group, answering membership checks and member counts without a query.
+    """
+
+    def __init__(self, backend: IMembershipBackend):
+        self.backend = backend
+
+    @property
+    def shared(self) -> bool:
+        return self.backend.shared
+
+    def get(self, group_id: int, loader: Callable[[], Iterable[int]]) -> FrozenSet[int]:
+        """
+        Returns the user ids of the group, calling loader on a miss.
+        """
+        members = self.backend.get(group_id)
+        if members is not None:
+            return members
+
+        version = self.backend.version(group_id)
+        members = frozenset(loader())
+        # an invalidation during the load may mean the ids are already stale, the backend does not keep them then
+        self.backend.set_if_current(group_id, version, members)
+
+        return members
+
+    def invalidate(self, group_id: int) -> None:
+        self.backend.invalidate(group_id)
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+def _build_backend() -> IMembershipBackend:
+    ttl = float(os.getenv("MEMBERSHIP_CACHE_TTL", "300"))
+    url = os.getenv("MEMBERSHIP_CACHE_URL")
+    if url:
+        return RedisMembershipBackend.from_url(url, ttl)
+    return InMemoryMembershipBackend(int(os.getenv("MEMBERSHIP_CACHE_SIZE", "10000")), ttl)
+
+
+membership_cache = MembershipCache(_build_backend())
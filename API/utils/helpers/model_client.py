@@ -0,0 +1,545 @@
+import math
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Optional, Sequence
+
+import httpx
+from google import genai
+from google.genai import errors as genai_errors
+from google.genai import types
+
+RECEIPT_MODEL = os.getenv("RECEIPT_MODEL", "gemini-2.5-flash")
+
+# answers worth asking again: rate limited, overloaded or a gateway that gave up
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class ModelUnavailableError(Exception):
+    """
+    The model could not answer in time, or the circuit breaker is open.
+    """
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Returns True for failures a later attempt may not hit again.
+    """
+    if isinstance(error, genai_errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError, ConnectionError, TimeoutError))
+
+
+# what the model bills for one image of up to 384x384, larger ones are tiled
+IMAGE_TOKENS = 258
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Rough token count of a text, about four characters per token.
+    """
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, rng: Callable[[], float] = random.random) -> float:
+    """
+    Exponential backoff with full jitter: a random delay between 0 and base_delay * 2^(attempt - 1),
+    capped at max_delay, so callers that failed together do not retry together.
+    """
+    return min(max_delay, base_delay * 2 ** (attempt - 1)) * rng()
+
+
+class ModelUsage:
+    """
+    Input tokens and latency of the model calls of one client, split into calls that
+    referenced a cached context and calls that sent everything inline. Input tokens
+    include the cached ones, `uncached` is what was actually sent and billed in full.
+    """
+
+    MODES = ("inline", "cached")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {mode: {"calls": 0, "input": 0, "cached": 0, "latency": 0.0} for mode in self.MODES}
+
+    def record(self, cached_context: bool, input_tokens: int, cached_tokens: int, latency: float) -> None:
+        with self._lock:
+            totals = self._totals["cached" if cached_context else "inline"]
+            totals["calls"] += 1
+            totals["input"] += input_tokens
+            totals["cached"] += cached_tokens
+            totals["latency"] += latency
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {}
+            for mode, totals in self._totals.items():
+                calls = totals["calls"] or 1
+                stats[mode] = {
+                    "calls": totals["calls"],
+                    "avg_input_tokens": round(totals["input"] / calls, 1),
+                    "avg_uncached_tokens": round((totals["input"] - totals["cached"]) / calls, 1),
+                    "avg_latency_ms": round(totals["latency"] * 1000 / calls, 3),
+                }
+
+        if stats["inline"]["calls"] and stats["cached"]["calls"]:
+            stats["saved_tokens_per_call"] = round(
+                stats["inline"]["avg_uncached_tokens"] - stats["cached"]["avg_uncached_tokens"], 1
+            )
+            stats["saved_latency_ms_per_call"] = round(
+                stats["inline"]["avg_latency_ms"] - stats["cached"]["avg_latency_ms"], 3
+            )
+        return stats
+
+
+class IModelClient(ABC):
+    """
+    Sends one receipt photo and prompt to the model and returns the raw answer text.
+    Without image_bytes only the prompt is sent. Implementations must be safe to share between threads.
+    """
+    def open(self) -> None:
+        """
+        Sets up connections ahead of the first call, called from the API lifespan.
+        """
+
+    def close(self) -> None:
+        """
+        Releases the connections, called when the API shuts down.
+        """
+
+    def create_cached_context(
+        self,
+        system_instruction: str,
+        context: str,
+        ttl_seconds: int,
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        Stores the instruction and a static prompt block with the model for `ttl_seconds` and
+        returns the name to pass as `cached_content`, or None when the backend cannot cache.
+        """
+        return None
+
+    def usage_stats(self) -> dict:
+        return {}
+
+    @abstractmethod
+    def generate(
+        self,
+        image_bytes: Optional[bytes],
+        mime_type: Optional[str],
+        prompt: str,
+        config: types.GenerateContentConfig,
+        timeout: Optional[float] = None,
+    ) -> str: ...
+
+
+class GeminiModelClient(IModelClient):
+    """
+    IModelClient over the google-genai SDK. One SDK client and one pool of up to
+    `max_connections` keep-alive connections serve every call of the process, so the TLS
+    handshake is paid once per connection instead of once per receipt.
+
+    The API opens it in its lifespan; scripts and workers that skip open() get it on the
+    first call, and processes that never call the model do not need an API key.
+    """
+
+    def __init__(self, model: str, api_key: Optional[str] = None, max_connections: int = 20):
+        self.model = model
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self._client: Optional[genai.Client] = None
+        self._http: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+        self.usage = ModelUsage()
+
+    def _api_key(self) -> Optional[str]:
+        # read when connecting, so a .env loaded after this module was imported still counts
+        return self.api_key or os.getenv("API_KEY")
+
+    def open(self) -> None:
+        # without a key the API still starts, receipt calls then fail with the SDK's error
+        if self._api_key():
+            self._connect()
+
+    def _connect(self) -> None:
+        with self._lock:
+            if self._client is not None:
+                return
+            self._http = httpx.Client(
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+            self._client = genai.Client(
+                api_key=self._api_key(),
+                # the SDK retries on its own by default, ResilientModelClient owns the retries
+                http_options=types.HttpOptions(
+                    httpx_client=self._http,
+                    retry_options=types.HttpRetryOptions(attempts=1),
+                ),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            client, http = self._client, self._http
+            self._client = self._http = None
+        if client is not None:
+            client.close()
+        if http is not None:
+            http.close()
+
+    @property
+    def client(self) -> genai.Client:
+        if self._client is None:
+            self._connect()
+        return self._client
+
+    def generate(
+        self,
+        image_bytes: Optional[bytes],
+        mime_type: Optional[str],
+        prompt: str,
+        config: types.GenerateContentConfig,
+        timeout: Optional[float] = None,
+    ) -> str:
+        if timeout is not None:
+            http_options = types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+            config = config.model_copy(update={"http_options": http_options})
+
+        started = time.perf_counter()
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=[types.Part.from_bytes(data=image_bytes, mime_type=mime_type), prompt] if image_bytes else [prompt],
+            config=config,
+        )
+        usage = response.usage_metadata
+        if usage is not None:
+            self.usage.record(
+                config.cached_content is not None,
+                usage.prompt_token_count or 0,
+                usage.cached_content_token_count or 0,
+                time.perf_counter() - started,
+            )
+        return response.text
+
+    def create_cached_context(
+        self,
+        system_instruction: str,
+        context: str,
+        ttl_seconds: int,
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        config = types.CreateCachedContentConfig(
+            system_instruction=system_instruction,
+            contents=[context],
+            ttl=f"{ttl_seconds}s",
+        )
+        if timeout is not None:
+            config.http_options = types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+
+        cached_content = self.client.caches.create(model=self.model, config=config)
+        return cached_content.name
+
+    def usage_stats(self) -> dict:
+        return self.usage.stats()
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive transient failures and rejects calls for
+    `reset_timeout` seconds. After that a single trial call is let through (half open):
+    success closes the breaker, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Returns whether a call may go out now.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial_running = False
+            if self._state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.opened += 1
+                self._state = self.OPEN
+                self._opened_at = self.clock()
+
+    def stats(self) -> dict:
+        state = self.state
+        with self._lock:
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "times_opened": self.opened,
+                "rejected_calls": self.rejected,
+            }
+
+
+class ResilientModelClient(IModelClient):
+    """
+    Wraps an IModelClient with a deadline for the whole call, a timeout per attempt,
+    exponential backoff with jitter between attempts and a circuit breaker shared by every
+    caller of the process. Only transient failures are retried and counted by the breaker,
+    anything else is raised as is. Raises ModelUnavailableError when the model cannot answer.
+    """
+
+    def __init__(
+        self,
+        client: IModelClient,
+        breaker: CircuitBreaker,
+        max_attempts: int = 3,
+        attempt_timeout: float = 30,
+        deadline: float = 60,
+        base_delay: float = 0.5,
+        max_delay: float = 8,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.client = client
+        self.breaker = breaker
+        self.max_attempts = max_attempts
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.clock = clock
+
+    def generate(
+        self,
+        image_bytes: Optional[bytes],
+        mime_type: Optional[str],
+        prompt: str,
+        config: types.GenerateContentConfig,
+        timeout: Optional[float] = None,
+    ) -> str:
+        deadline = self.clock() + (timeout if timeout is not None else self.deadline)
+        last_error: Optional[Exception] = None
+
+        for attempt in range(1, self.max_attempts + 1):
+            remaining = deadline - self.clock()
+            if remaining <= 0:
+                break
+            if not self.breaker.allow():
+                raise ModelUnavailableError("The receipt model is unavailable, try again later.")
+
+            try:
+                text = self.client.generate(image_bytes, mime_type, prompt, config, min(self.attempt_timeout, remaining))
+            except Exception as error:
+                if not is_transient_error(error):
+                    # our request was wrong, the model itself is fine
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                last_error = error
+            else:
+                self.breaker.record_success()
+                return text
+
+            if attempt < self.max_attempts:
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                if self.clock() + delay >= deadline:
+                    break
+                self.sleep(delay)
+
+        raise ModelUnavailableError("The receipt model did not answer in time, try again later.") from last_error
+
+    def open(self) -> None:
+        self.client.open()
+
+    def close(self) -> None:
+        self.client.close()
+
+    def create_cached_context(
+        self,
+        system_instruction: str,
+        context: str,
+        ttl_seconds: int,
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        Creates the context in a single attempt bounded like one generate attempt: a failed
+        creation only means sending the prompt inline for a while. The outcome counts on the
+        breaker like any other call.
+        """
+        if not self.breaker.allow():
+            raise ModelUnavailableError("The receipt model is unavailable, try again later.")
+
+        attempt_timeout = self.attempt_timeout if timeout is None else min(self.attempt_timeout, timeout)
+        try:
+            name = self.client.create_cached_context(system_instruction, context, ttl_seconds, attempt_timeout)
+        except Exception as error:
+            if is_transient_error(error):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+
+        self.breaker.record_success()
+        return name
+
+    def usage_stats(self) -> dict:
+        return self.client.usage_stats()
+
+    def stats(self) -> dict:
+        return {**self.breaker.stats(), "usage": self.usage_stats()}
+
+
+class FakeModelClient(IModelClient):
+    """
+    Stand-in for the model in tests and local runs. Answers with `responses` in turn, after
+    `latency` seconds, and raises `failures` in turn first (None lets that call through),
+    then fails at random with `failure_rate`.
+
+    Cached contexts are kept in memory like the model keeps them: a call that references one
+    is billed its tokens as cached, and `token_latency` seconds per 1000 uncached input tokens
+    are added to every call, so the savings of context caching can be measured offline.
+    """
+
+    def __init__(
+        self,
+        responses: Sequence[str] = ('{"items": [], "total": 0}',),
+        latency: float = 0.0,
+        failures: Sequence[Optional[Exception]] = (),
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+        token_latency: float = 0.0,
+    ):
+        self.responses = list(responses)
+        self.latency = latency
+        self.failures = list(failures)
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.token_latency = token_latency
+        self.calls = 0
+        self.contexts: dict = {}
+        self.usage = ModelUsage()
+        self._lock = threading.Lock()
+
+    def create_cached_context(
+        self,
+        system_instruction: str,
+        context: str,
+        ttl_seconds: int,
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        with self._lock:
+            name = f"cachedContents/fake-{len(self.contexts) + 1}"
+            self.contexts[name] = (system_instruction, context)
+        return name
+
+    def usage_stats(self) -> dict:
+        return self.usage.stats()
+
+    def generate(
+        self,
+        image_bytes: Optional[bytes],
+        mime_type: Optional[str],
+        prompt: str,
+        config: types.GenerateContentConfig,
+        timeout: Optional[float] = None,
+    ) -> str:
+        with self._lock:
+            call = self.calls
+            self.calls += 1
+            failure = self.failures[call] if call < len(self.failures) else None
+            if failure is None and self.random.random() < self.failure_rate:
+                failure = genai_errors.ServerError(503, {"error": {"message": "Injected failure."}})
+            context = self.contexts.get(config.cached_content) if config.cached_content else None
+
+        if config.cached_content and context is None:
+            raise genai_errors.ClientError(404, {"error": {"message": "Cached content not found."}})
+        cached_tokens = sum(estimate_tokens(text) for text in context) if context else 0
+        uncached_tokens = estimate_tokens(config.system_instruction) + estimate_tokens(prompt)
+        if image_bytes:
+            uncached_tokens += IMAGE_TOKENS
+
+        latency = self.latency + self.token_latency * uncached_tokens / 1000
+        if latency:
+            if timeout is not None and latency > timeout:
+                time.sleep(timeout)
+                raise httpx.ReadTimeout("Injected latency exceeded the timeout.")
+            time.sleep(latency)
+        if failure is not None:
+            raise failure
+        self.usage.record(context is not None, cached_tokens + uncached_tokens, cached_tokens, latency)
+        return self.responses[call % len(self.responses)]
+
+
+def build_receipt_model_client(model: str) -> ResilientModelClient:
+    """
+    Builds the process wide model client from RECEIPT_MODEL_* settings. RECEIPT_MODEL_BACKEND=fake
+    answers every photo with an empty receipt after RECEIPT_MODEL_FAKE_LATENCY seconds and fails
+    RECEIPT_MODEL_FAKE_FAILURE_RATE of the calls, for load tests without the real model.
+    """
+    if os.getenv("RECEIPT_MODEL_BACKEND", "gemini").lower() == "fake":
+        client = FakeModelClient(
+            latency=float(os.getenv("RECEIPT_MODEL_FAKE_LATENCY", "0")),
+            failure_rate=float(os.getenv("RECEIPT_MODEL_FAKE_FAILURE_RATE", "0")),
+            token_latency=float(os.getenv("RECEIPT_MODEL_FAKE_TOKEN_LATENCY", "0")),
+        )
+    else:
+        client = GeminiModelClient(
+            model,
+            os.getenv("API_KEY"),
+            max_connections=int(os.getenv("RECEIPT_MODEL_MAX_CONNECTIONS", "20")),
+        )
+
+    breaker = CircuitBreaker(
+        failure_threshold=int(os.getenv("RECEIPT_MODEL_BREAKER_FAILURES", "5")),
+        reset_timeout=float(os.getenv("RECEIPT_MODEL_BREAKER_RESET_SECONDS", "30")),
+    )
+    return ResilientModelClient(
+        client,
+        breaker,
+        max_attempts=int(os.getenv("RECEIPT_MODEL_MAX_ATTEMPTS", "3")),
+        attempt_timeout=float(os.getenv("RECEIPT_MODEL_TIMEOUT_SECONDS", "30")),
+        deadline=float(os.getenv("RECEIPT_MODEL_DEADLINE_SECONDS", "60")),
+        base_delay=float(os.getenv("RECEIPT_MODEL_BACKOFF_SECONDS", "0.5")),
+    )
+
+
+receipt_model_client = build_receipt_model_client(RECEIPT_MODEL)
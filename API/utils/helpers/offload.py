@@ -0,0 +1,14 @@
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+
+def run_cpu_bound(fn, *args, **kwargs):
+    """
+    Runs CPU heavy work of a service call (e.g. bcrypt) without holding the event loop.
+    In async DB mode services run in a greenlet on the event loop (see database.run_db_call),
+    so the work goes to the threadpool and the greenlet waits for it; otherwise the caller
+    already runs in a worker thread and the work runs in place.
+    """
+    if in_greenlet():
+        return await_only(run_in_threadpool(fn, *args, **kwargs))
+    return fn(*args, **kwargs)
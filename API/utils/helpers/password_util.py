@@ -1,16 +1,22 @@
 import bcrypt
+from utils.helpers.offload import run_cpu_bound
 
 
 class PasswordUtil:
     """
     Provides password hashing and verification utilities.
+    A bcrypt call takes 100-300 ms of CPU, both run off the event loop in async DB mode.
     """
     @staticmethod
-    def hash_password(password: str) -> str:
+    def _hash_password(password: str) -> str:
         salt = bcrypt.gensalt()
         hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
         return hashed.decode("utf-8")
 
+    @staticmethod
+    def hash_password(password: str) -> str:
+        return run_cpu_bound(PasswordUtil._hash_password, password)
+
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
\ No newline at end of file
+        return run_cpu_bound(bcrypt.checkpw, plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
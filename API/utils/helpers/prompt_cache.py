@@ -0,0 +1,160 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Optional
+
+from utils.helpers.lru_cache import LRUCache
+from utils.helpers.model_client import (
+    IModelClient,
+    estimate_tokens,
+    receipt_model_client,
+)
+
+# an empty name stands for "use the inline prompt", remembered like a created context
+_INLINE = ""
+
+
+class PromptContextCache:
+    """
+    Model side cached contexts: a system instruction plus the static block of a prompt (the
+    user's category list), stored once with the model and then referenced by name, so each
+    call only sends and pays for what changes per call.
+
+    Contexts are content addressed: the key is a hash of the instruction and the block, so
+    editing a category yields a new key and the old context is never referenced again; it
+    expires on the model side after `ttl_seconds`. Blocks below `min_tokens` (the model's
+    minimum for cached content) are sent inline, and so is everything for a while after a
+    failed creation. Callers that need the same context at once wait for one creation, for at
+    most `wait_seconds`, then send their prompt inline instead of waiting any longer.
+    """
+
+    # a context is replaced before the model could expire it under a running call
+    REFRESH_MARGIN = 0.1
+
+    def __init__(
+        self,
+        model_client: IModelClient,
+        ttl_seconds: int = 3600,
+        min_tokens: int = 1024,
+        max_entries: int = 10000,
+        retry_seconds: float = 300,
+        wait_seconds: float = 2,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.model_client = model_client
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.retry_seconds = retry_seconds
+        self.wait_seconds = wait_seconds
+        self.clock = clock
+        self._entries = LRUCache(max_entries, clock=clock)
+        self._lock = threading.Lock()
+        self._in_flight: dict = {}
+        self.created = 0
+        self.too_small = 0
+        self.failed = 0
+        self.joined = 0
+        self.wait_timeouts = 0
+
+    @staticmethod
+    def context_key(system_instruction: str, context: str) -> str:
+        raw = "\0".join((system_instruction, context))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, system_instruction: str, context: str) -> Optional[str]:
+        """
+        Returns the name of the cached context to pass as `cached_content`, or None when the
+        instruction and the block have to be sent inline.
+        """
+        key = self.context_key(system_instruction, context)
+        name = self._entries.get(key)
+        if name is not None:
+            return name or None
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.joined += 1
+
+        if not owner:
+            try:
+                return future.result(timeout=self.wait_seconds) or None
+            except FutureTimeoutError:
+                # the creation is slow, this call does not wait for it
+                with self._lock:
+                    self.wait_timeouts += 1
+                return None
+
+        try:
+            name = self._create(system_instruction, context)
+            future.set_result(name)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+        return name or None
+
+    def _create(self, system_instruction: str, context: str) -> str:
+        """
+        Internal method for creating a context and remembering the outcome under its key.
+        """
+        key = self.context_key(system_instruction, context)
+        now = self.clock()
+        if estimate_tokens(system_instruction) + estimate_tokens(context) < self.min_tokens:
+            with self._lock:
+                self.too_small += 1
+            # the content decides this, it stays too small for as long as it exists
+            self._entries.set(key, _INLINE, expires_at=now + self.ttl_seconds)
+            return _INLINE
+
+        try:
+            name = self.model_client.create_cached_context(system_instruction, context, self.ttl_seconds)
+        except Exception:
+            # a failed creation must not fail the receipt, it goes inline for a while
+            with self._lock:
+                self.failed += 1
+            self._entries.set(key, _INLINE, expires_at=now + self.retry_seconds)
+            return _INLINE
+
+        if name is None:
+            # the backend has no context caching
+            self._entries.set(key, _INLINE, expires_at=now + self.ttl_seconds)
+            return _INLINE
+
+        with self._lock:
+            self.created += 1
+        self._entries.set(key, name, expires_at=now + self.ttl_seconds * (1 - self.REFRESH_MARGIN))
+        return name
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = {
+                "contexts_created": self.created,
+                "too_small": self.too_small,
+                "failed": self.failed,
+                "joined_in_flight": self.joined,
+                "wait_timeouts": self.wait_timeouts,
+            }
+        return {**self._entries.stats(), **counters}
+
+
+# off: the instruction and the category list are sent with every call
+RECEIPT_PROMPT_CACHE = os.getenv("RECEIPT_PROMPT_CACHE", "true").lower() in ("1", "true", "yes")
+
+prompt_context_cache = PromptContextCache(
+    receipt_model_client,
+    ttl_seconds=int(os.getenv("RECEIPT_PROMPT_CACHE_TTL_SECONDS", "3600")),
+    min_tokens=int(os.getenv("RECEIPT_PROMPT_CACHE_MIN_TOKENS", "1024")),
+    max_entries=int(os.getenv("RECEIPT_PROMPT_CACHE_SIZE", "10000")),
+    wait_seconds=float(os.getenv("RECEIPT_PROMPT_CACHE_WAIT_SECONDS", "2")),
+)
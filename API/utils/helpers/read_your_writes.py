@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from utils.helpers.logger import Logger
+
+# session.info key set once a session has to read from the primary
+USE_PRIMARY = "use_primary"
+
+
+class IRecentWriters(ABC):
+    """
+    Remembers who wrote to the primary in the last `window` seconds, so their reads
+    can skip the replica until it has caught up.
+    """
+    # True when every worker process sees the same writers
+    shared = False
+
+    @abstractmethod
+    def mark(self, key) -> None: ...
+
+    @abstractmethod
+    def is_recent(self, key) -> bool: ...
+
+
+class RecentWriters(IRecentWriters):
+    """
+    Per worker registry. It only holds with a single worker process: with several, the
+    next request of a writer usually lands on a worker that did not see the write.
+    """
+
+    def __init__(self, window: float, max_entries: int = 100_000):
+        self.window = window
+        self.max_entries = max_entries
+        self._writes: dict = {}
+        self._lock = threading.Lock()
+
+    def mark(self, key) -> None:
+        if key is None or self.window <= 0:
+            return
+        with self._lock:
+            if len(self._writes) >= self.max_entries:
+                self._prune()
+            self._writes[key] = time.monotonic() + self.window
+
+    def is_recent(self, key) -> bool:
+        if key is None:
+            return False
+        with self._lock:
+            expires_at = self._writes.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._writes[key]
+                return False
+            return True
+
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, expires_at in self._writes.items() if expires_at < now]:
+            del self._writes[key]
+
+
+class RedisRecentWriters(IRecentWriters):
+    """
+    Registry shared by every worker: a key per writer that redis expires after the window.
+    Needs the optional `redis` package.
+    """
+    shared = True
+
+    def __init__(self, client, window: float, prefix: str = "recent_writer:"):
+        self.client = client
+        self.window = window
+        self.prefix = prefix
+        self.logger = Logger()
+
+    @classmethod
+    def from_url(cls, url: str, window: float) -> "RedisRecentWriters":
+        try:
+            import redis
+        except ImportError as error:
+            raise RuntimeError("DB_READ_YOUR_WRITES_URL points at redis, install the `redis` package.") from error
+
+        return cls(redis.Redis.from_url(url), window)
+
+    def mark(self, key) -> None:
+        if key is None or self.window <= 0:
+            return
+        try:
+            self.client.set(f"{self.prefix}{key}", 1, px=max(1, int(self.window * 1000)))
+        except Exception as error:
+            # the write is committed already, failing the response would not undo it
+            self.logger.warning(f"Could not mark writer {key} as recent: {error}")
+
+    def is_recent(self, key) -> bool:
+        if key is None:
+            return False
+        try:
+            return bool(self.client.exists(f"{self.prefix}{key}"))
+        except Exception:
+            # without the registry, reading from the primary is the safe choice
+            return True
+
+
+def build_recent_writers(window: float) -> IRecentWriters:
+    """
+    Shares the registry through DB_READ_YOUR_WRITES_URL, or the redis of the membership
+    cache when only MEMBERSHIP_CACHE_URL is set, and keeps it per process otherwise.
+    """
+    url = os.getenv("DB_READ_YOUR_WRITES_URL") or os.getenv("MEMBERSHIP_CACHE_URL")
+    if url:
+        return RedisRecentWriters.from_url(url, window)
+    return RecentWriters(window)
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable
+
+from utils.helpers.lru_cache import LRUCache
+
+
+def receipt_cache_key(user_id: int, image_bytes: bytes, prompt_fingerprint: str) -> str:
+    """
+    Content address of a receipt analysis: who asked, the exact image bytes and everything
+    the model is told about the user's categories.
+    """
+    image_digest = hashlib.sha256(image_bytes).hexdigest()
+    return f"{user_id}:{image_digest}:{prompt_fingerprint}"
+
+
+class ReceiptResultCache:
+    """
+    Validated model answers by content address, bounded by size and age.
+
+    Identical uploads that arrive while the first one is still being analysed wait for
+    its answer instead of calling the model again. Only successful analyses are kept.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self._entries = LRUCache(max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+        self._in_flight: dict = {}
+        self.joined = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], dict]) -> dict:
+        cached = self._entries.get(key)
+        if cached is not None:
+            return json.loads(cached)
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.joined += 1
+
+        if not owner:
+            return json.loads(future.result())
+
+        try:
+            # stored as text, every caller gets its own copy of the result
+            result = json.dumps(compute())
+            self._entries.set(key, result)
+            future.set_result(result)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+        return json.loads(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {**self._entries.stats(), "joined_in_flight": self.joined, "in_flight": in_flight}
+
+
+receipt_result_cache = ReceiptResultCache(
+    int(os.getenv("RECEIPT_CACHE_SIZE", "1000")),
+    float(os.getenv("RECEIPT_CACHE_TTL", "86400")),
+)
@@ -0,0 +1,190 @@
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from PIL import ExifTags, Image, ImageOps
+from utils.helpers.constants import STATUS_PAYLOAD_TOO_LARGE
+
+RECEIPT_IMAGE_FORMATS = {"jpeg": "image/jpeg", "webp": "image/webp"}
+# formats an upload may use, Image.open never tries the other plugins
+RECEIPT_UPLOAD_FORMATS = ("JPEG", "PNG", "WEBP", "GIF", "BMP", "TIFF")
+RECEIPT_UPLOAD_MAX_BYTES = int(os.getenv("RECEIPT_UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+RECEIPT_IMAGE_MAX_PIXELS = int(os.getenv("RECEIPT_IMAGE_MAX_PIXELS", "50000000"))
+
+# Pillow refuses to decode anything above twice this limit, in this process and in the preprocessing ones
+Image.MAX_IMAGE_PIXELS = RECEIPT_IMAGE_MAX_PIXELS
+
+
+def check_upload_size(upload: UploadFile, max_bytes: int = RECEIPT_UPLOAD_MAX_BYTES) -> None:
+    """
+    Rejects an uploaded file above `max_bytes` before it is read into memory. The file itself
+    is spooled to disk by the multipart parser, BodySizeLimitMiddleware bounds the whole request.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(
+            status_code=STATUS_PAYLOAD_TOO_LARGE,
+            detail=f"Images can be at most {max_bytes // (1024 * 1024)} MB.",
+        )
+
+
+def check_receipt_image(image_bytes: bytes, max_pixels: int = RECEIPT_IMAGE_MAX_PIXELS) -> str:
+    """
+    Returns the mime type of an uploaded image. Only the header is parsed, the format and
+    the dimensions are checked before a single pixel is decoded.
+    Raises ValueError when the bytes are not a supported image or have too many pixels.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes), formats=RECEIPT_UPLOAD_FORMATS) as image:
+            image_format = image.format
+            width, height = image.size
+    except Image.DecompressionBombError:
+        raise ValueError("The provided image is too large.")
+    except Exception:
+        raise ValueError("The provided image is not valid.")
+
+    if width * height > max_pixels:
+        raise ValueError("The provided image is too large.")
+
+    # multi-picture JPEGs from phones are plain JPEGs to the model
+    if image_format == "MPO":
+        return "image/jpeg"
+    return Image.MIME.get(image_format, "image/jpeg")
+
+
+class PreparedImage:
+    """
+    Image bytes as they are sent to the model.
+    """
+
+    def __init__(self, data: bytes, mime_type: str, width: int, height: int):
+        self.data = data
+        self.mime_type = mime_type
+        self.width = width
+        self.height = height
+
+
+def prepare_receipt_image(
+    image_bytes: bytes,
+    max_dimension: int,
+    grayscale: bool = False,
+    output_format: str = "jpeg",
+    quality: int = 85,
+) -> PreparedImage:
+    """
+    Applies the EXIF orientation, shrinks the longest side to `max_dimension` and re-encodes
+    the photo as a compact JPEG or WebP. Runs in the preprocessing processes, so it only takes
+    and returns picklable values. Raises ValueError when the bytes are not an image.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes), formats=RECEIPT_UPLOAD_FORMATS) as image:
+            source_mime = Image.MIME.get(image.format, "image/jpeg")
+            source_size = image.size
+            rotated = image.getexif().get(ExifTags.Base.Orientation, 1) != 1
+            mode = "L" if grayscale else "RGB"
+            # lets the JPEG decoder scale by 1/2, 1/4 or 1/8 instead of decoding all 12 megapixels
+            image.draft(mode, (max_dimension, max_dimension))
+
+            prepared = ImageOps.exif_transpose(image)
+            prepared.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+            changed = rotated or prepared.size != source_size or prepared.mode != mode
+            if prepared.mode != mode:
+                prepared = prepared.convert(mode)
+
+            output = io.BytesIO()
+            prepared.save(output, format=output_format.upper(), quality=quality, optimize=True)
+            width, height = prepared.size
+    except Image.DecompressionBombError:
+        raise ValueError("The provided image is too large.")
+    except Exception:
+        raise ValueError("The provided image is not valid.")
+
+    # a small photo that needed no rotation or resize can be smaller as uploaded than re-encoded
+    if not changed and source_mime in RECEIPT_IMAGE_FORMATS.values() and len(image_bytes) <= output.tell():
+        return PreparedImage(image_bytes, source_mime, width, height)
+
+    return PreparedImage(output.getvalue(), RECEIPT_IMAGE_FORMATS[output_format], width, height)
+
+
+class ReceiptImagePreprocessor:
+    """
+    Runs prepare_receipt_image in a pool of `workers` processes, so decoding and resizing
+    large photos neither holds the GIL of the API process nor blocks its event loop.
+    With `workers` set to 0 the work is done in the calling thread.
+
+    The pool is started on first use with the "spawn" method, children never inherit
+    the API's threads or database connections.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_dimension: int = 2048,
+        grayscale: bool = False,
+        output_format: str = "jpeg",
+        quality: int = 85,
+    ):
+        if output_format not in RECEIPT_IMAGE_FORMATS:
+            raise ValueError(f"Unsupported receipt image format: {output_format}")
+        self.workers = workers
+        self.max_dimension = max_dimension
+        self.grayscale = grayscale
+        self.output_format = output_format
+        self.quality = quality
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Describes the settings, a change of settings changes what the model sees.
+        """
+        color = "gray" if self.grayscale else "rgb"
+        return f"{self.max_dimension}:{color}:{self.output_format}:{self.quality}"
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def prepare(self, image_bytes: bytes) -> PreparedImage:
+        """
+        Method for preparing an uploaded photo for the model, blocks until it is done.
+        """
+        args = (image_bytes, self.max_dimension, self.grayscale, self.output_format, self.quality)
+        if self.workers <= 0:
+            return prepare_receipt_image(*args)
+
+        executor = self._get_executor()
+        try:
+            return executor.submit(prepare_receipt_image, *args).result()
+        except BrokenProcessPool:
+            # a child died (e.g. killed for memory), start a fresh pool for the next upload
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+receipt_image_preprocessor = ReceiptImagePreprocessor(
+    workers=int(os.getenv("RECEIPT_IMAGE_WORKERS", "2")),
+    max_dimension=int(os.getenv("RECEIPT_IMAGE_MAX_DIMENSION", "2048")),
+    grayscale=os.getenv("RECEIPT_IMAGE_GRAYSCALE", "false").lower() in ("1", "true", "yes"),
+    output_format=os.getenv("RECEIPT_IMAGE_FORMAT", "jpeg").lower(),
+    quality=int(os.getenv("RECEIPT_IMAGE_QUALITY", "85")),
+)
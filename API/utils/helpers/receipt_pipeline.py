@@ -0,0 +1,309 @@
+import json
+import re
+import textwrap
+import time
+from typing import Callable, List, Optional, Tuple
+
+from google.genai import types
+from utils.helpers.keyword_classifier import KeywordClassifier
+from utils.helpers.model_client import IModelClient, backoff_delay
+from utils.helpers.prompt_cache import PromptContextCache
+
+# dedented, the indentation would otherwise be tokenized and billed on every call
+RECEIPT_SYSTEM_INSTRUCTION = textwrap.dedent("""
+        You are a receipt-processing assistant.
+        Your task is to analyze a photo of a receipt and extract only the purchased items, then categorize each item into one of the categories provided in the user prompt.
+        The categories will be provided in this format: category (a list of relevant keywords for this category), category ...
+        A keyword may be one word or a sentence describing the category.
+        You must output a single valid JSON object with the following structure:
+        {
+          "items": [
+            {
+              "name": string,
+              "quantity": number,
+              "price": number,
+              "category": string,
+              "keywords": List(string)
+            }
+          ],
+          "total": number
+        }
+
+        Rules:
+        - Output ONLY JSON. No explanations. No commentary. No text outside the JSON.
+        - Output STRICT valid JSON (double quotes, no trailing commas, correct types).
+        - Do not include any fields other than those defined in the JSON schema.
+        - Prices, totals, and quantities must be numeric values only (no currency symbols).
+        - If the receipt does not specify quantity, use 1.
+        - If the receipt breaks an item into multiple lines, merge them into one coherent item.
+        - If there are multiple totals (e.g., subtotal, total with tax), always choose the total that includes taxes.
+        - The semantic meaning of the category always takes precedence over keyword matches. Keywords help, but only when the category meaning aligns with the actual type of the item.
+        - If an item matches one of the provided categories, add it in the response, along with its keywords; Do NOT generate any additional keywords for this category and make sure to include all of the provided keywords.
+        - If an item clearly does not match any provided category, you may create one new category, but:
+            - Name it concisely (1–2 words).
+            - Make it a general category that could reasonably include similar items, avoiding overly specific or niche categories.
+            - Generate 5 relevant keywords for the category to include in the response.
+            - Only create a new category if absolutely necessary; prefer mapping items to broader existing categories whenever possible.
+        - If a field is missing or ambiguous, deduce it cautiously from surrounding information.
+        - If there is no receipt in the provided image, return an empty JSON.
+        """).strip()
+
+# built once per process and shared by every caller, the config never changes
+RECEIPT_SYSTEM_CONFIG = types.GenerateContentConfig(system_instruction=RECEIPT_SYSTEM_INSTRUCTION)
+
+RECEIPT_ITEM_FIELDS = {"name", "quantity", "price", "category", "keywords"}
+
+# asks the photo call for the items only, their categories are decided afterwards
+RECEIPT_EXTRACTION_PROMPT = (
+    "Analyze the receipt image and list every purchased item. Do not categorize the items: "
+    'set "category" to an empty string and "keywords" to an empty list for every item.'
+)
+
+# sent with the photo when the instruction and the category list come from a cached context
+RECEIPT_CACHED_PROMPT = "Analyze this receipt image as instructed."
+
+RECEIPT_CATEGORIZE_INSTRUCTION = textwrap.dedent("""
+        You are a receipt-processing assistant.
+        Your task is to categorize purchased items, given by their names on a receipt, into one of the categories provided in the user prompt.
+        The categories will be provided in this format: category (a list of relevant keywords for this category), category ...
+        You must output a single valid JSON object with the following structure:
+        {
+          "items": [
+            {
+              "name": string,
+              "category": string,
+              "keywords": List(string)
+            }
+          ]
+        }
+
+        Rules:
+        - Output ONLY JSON. No explanations. No commentary. No text outside the JSON.
+        - Output STRICT valid JSON (double quotes, no trailing commas, correct types).
+        - Return exactly one entry per given item, in the given order, with the name unchanged.
+        - The semantic meaning of the category always takes precedence over keyword matches. Keywords help, but only when the category meaning aligns with the actual type of the item.
+        - If an item matches one of the provided categories, use it along with its keywords; Do NOT generate any additional keywords for this category and make sure to include all of the provided keywords.
+        - If an item clearly does not match any provided category, you may create one new category, but:
+            - Name it concisely (1–2 words).
+            - Make it a general category that could reasonably include similar items, avoiding overly specific or niche categories.
+            - Generate 5 relevant keywords for the category to include in the response.
+            - Only create a new category if absolutely necessary; prefer mapping items to broader existing categories whenever possible.
+        """).strip()
+
+RECEIPT_CATEGORIZE_CONFIG = types.GenerateContentConfig(system_instruction=RECEIPT_CATEGORIZE_INSTRUCTION)
+
+
+class NotAReceiptError(ValueError):
+    """
+    The model found no receipt in the photo.
+    """
+
+
+class InvalidReceiptResponseError(ValueError):
+    """
+    The model kept answering with something that is not valid receipt JSON.
+    """
+
+
+def extract_json_from_response(text: str) -> str:
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL | re.IGNORECASE)
+    if fenced:
+        return fenced.group(1).strip()
+    return text.strip()
+
+
+def validate_receipt_response(response_json: str) -> dict:
+    """
+    Parses and checks an answer of the model, returns the receipt.
+    Raises NotAReceiptError for an empty answer and ValueError for anything off the schema.
+    """
+    try:
+        data = json.loads(response_json)
+    except json.JSONDecodeError:
+        raise ValueError("Response JSON is not valid.")
+    if not data:
+        raise NotAReceiptError("The provided image is not a valid receipt image.")
+
+    required_top = {"items", "total"}
+    if not required_top.issubset(data.keys()):
+        raise ValueError("Response JSON is missing 'items' or 'total' fields.")
+    extra_top = set(data.keys()) - required_top
+    if extra_top:
+        raise ValueError(f"Unexpected top-level fields: {extra_top}")
+
+    for item in data["items"]:
+        missing = RECEIPT_ITEM_FIELDS - set(item.keys())
+        if missing:
+            raise ValueError(f"Item is missing required fields: {missing}")
+        extra = set(item.keys()) - RECEIPT_ITEM_FIELDS
+        if extra:
+            raise ValueError(f"Item contains unexpected fields: {extra}")
+
+    return data
+
+
+def _format_categories(categories: dict[str, List[str]]) -> str:
+    parts = []
+    for category, keywords in categories.items():
+        # repeated and blank keywords only cost tokens
+        unique = [keyword for keyword in dict.fromkeys(keyword.strip() for keyword in keywords) if keyword]
+        parts.append(f"{category} ({', '.join(unique)})" if unique else category)
+    return ", ".join(parts)
+
+
+def generate_prompt(categories: dict[str, List[str]]) -> str:
+    if categories:
+        joined = _format_categories(categories)
+        return f"Analyze the receipt image and categorize each purchased item into one of these categories: {joined}"
+    else:
+        return "Analyze the receipt image and categorize each purchased item into one category"
+
+
+def generate_categorize_context(categories: dict[str, List[str]]) -> str:
+    return f"Categorize each of these purchased items into one of these categories: {_format_categories(categories)}"
+
+
+def _list_items(names: List[str]) -> str:
+    listed = "\n".join(f"- {name}" for name in names)
+    return f"Items:\n{listed}"
+
+
+def generate_categorize_prompt(names: List[str], categories: dict[str, List[str]]) -> str:
+    return f"{generate_categorize_context(categories)}\n{_list_items(names)}"
+
+
+def _prompt_and_config(
+    context_cache: Optional[PromptContextCache],
+    config: types.GenerateContentConfig,
+    context: str,
+    inline_prompt: str,
+    cached_prompt: str,
+) -> Tuple[str, types.GenerateContentConfig]:
+    """
+    Internal method for referencing the instruction and the static `context` block from the
+    model side cache when there is one, the call then only sends `cached_prompt`.
+    """
+    name = context_cache.get(config.system_instruction, context) if context_cache else None
+    if name is None:
+        return inline_prompt, config
+    # the instruction lives in the cached context, the model refuses it twice
+    return cached_prompt, config.model_copy(update={"system_instruction": None, "cached_content": name})
+
+
+def validate_categorize_response(response_json: str, count: int) -> List[dict]:
+    """
+    Parses an answer of the categorize call, returns one {name, category, keywords} per item.
+    """
+    try:
+        data = json.loads(response_json)
+    except json.JSONDecodeError:
+        raise ValueError("Response JSON is not valid.")
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or len(items) != count:
+        raise ValueError(f"Expected {count} categorized items.")
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("category"), str) or not isinstance(item.get("keywords"), list):
+            raise ValueError("Categorized item is missing 'category' or 'keywords'.")
+    return items
+
+
+def _ask_until_valid(
+    model_client: IModelClient,
+    image_bytes: Optional[bytes],
+    mime_type: Optional[str],
+    prompt: str,
+    config: types.GenerateContentConfig,
+    validate: Callable[[str], object],
+    max_retries: int,
+    delay: float,
+):
+    """
+    Asks the model and asks again, after a jittered backoff, while `validate` rejects the answer.
+    """
+    for attempt in range(1, max_retries + 1):
+        response_text = model_client.generate(image_bytes, mime_type, prompt, config)
+        try:
+            return validate(extract_json_from_response(response_text))
+        except NotAReceiptError:
+            raise
+        except ValueError as error:
+            if attempt >= max_retries:
+                raise InvalidReceiptResponseError(f"Failed after {max_retries} attempts: {error}")
+            time.sleep(backoff_delay(attempt, delay, delay * 4))
+
+
+def analyze_receipt(
+    model_client: IModelClient,
+    image_bytes: bytes,
+    mime_type: str,
+    prompt: str,
+    max_retries: int = 3,
+    delay: float = 0.5,
+    context_cache: Optional[PromptContextCache] = None,
+) -> dict:
+    """
+    Sends the photo to the model and asks again while the answer is not valid receipt JSON.
+    With a `context_cache` the instruction and the prompt are referenced from the model side.
+    Raises NotAReceiptError, InvalidReceiptResponseError after `max_retries` answers,
+    and lets ModelUnavailableError of the client through.
+    """
+    prompt, config = _prompt_and_config(context_cache, RECEIPT_SYSTEM_CONFIG, prompt, prompt, RECEIPT_CACHED_PROMPT)
+    return _ask_until_valid(
+        model_client, image_bytes, mime_type, prompt, config, validate_receipt_response, max_retries, delay
+    )
+
+
+def analyze_receipt_with_classifier(
+    model_client: IModelClient,
+    image_bytes: bytes,
+    mime_type: str,
+    categories: dict[str, List[str]],
+    classifier: KeywordClassifier,
+    min_confidence: float,
+    max_retries: int = 3,
+    delay: float = 0.5,
+    context_cache: Optional[PromptContextCache] = None,
+) -> Tuple[dict, int]:
+    """
+    Extracts the items from the photo without the category list in the prompt, categorizes
+    every item the keyword classifier is confident about locally and sends only the other names,
+    as text, to the model. Returns the receipt and how many items the model categorized.
+    Raises the same errors as analyze_receipt.
+    """
+    receipt = analyze_receipt(
+        model_client, image_bytes, mime_type, RECEIPT_EXTRACTION_PROMPT, max_retries, delay, context_cache
+    )
+
+    ambiguous = []
+    for item in receipt["items"]:
+        classification = classifier.classify(str(item["name"]))
+        if classification.is_confident(min_confidence):
+            item["category"] = classification.category
+            item["keywords"] = list(categories[classification.category])
+        else:
+            ambiguous.append(item)
+
+    if ambiguous:
+        names = [str(item["name"]) for item in ambiguous]
+        prompt, config = _prompt_and_config(
+            context_cache,
+            RECEIPT_CATEGORIZE_CONFIG,
+            generate_categorize_context(categories),
+            generate_categorize_prompt(names, categories),
+            _list_items(names),
+        )
+        categorized = _ask_until_valid(
+            model_client,
+            None,
+            None,
+            prompt,
+            config,
+            lambda response_json: validate_categorize_response(response_json, len(names)),
+            max_retries,
+            delay,
+        )
+        for item, answer in zip(ambiguous, categorized):
+            item["category"] = answer["category"]
+            item["keywords"] = answer["keywords"]
+
+    return receipt, len(ambiguous)
@@ -0,0 +1,25 @@
+from typing import Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+AFTER_COMMIT = "after_commit_callbacks"
+
+
+def call_after_commit(db: Session, callback: Callable[[], None]) -> None:
+    """
+    Runs the callback once the session's current transaction commits, and drops it on rollback.
+    Caches use it so they are only invalidated once the new data is visible to other sessions.
+    """
+    db.info.setdefault(AFTER_COMMIT, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session):
+    for callback in session.info.pop(AFTER_COMMIT, []):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_commit(session):
+    session.info.pop(AFTER_COMMIT, None)
@@ -0,0 +1,181 @@
+"""
+Bounded pool of threads processing the receipt_jobs queue.
+
+The API starts one pool per process from its lifespan (RECEIPT_JOB_WORKERS threads, 0 disables it).
+To process jobs in a separate process instead, run from the API directory:
+    python -m workers.receipt_job_worker
+"""
+import os
+import signal
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, List
+
+from database import SessionLocal
+from repositories.category_repository import CategoryRepository
+from repositories.receipt_job_repository import ReceiptJobRepository
+from services.receipt_job_service import IReceiptJobService, ReceiptJobService
+from services.receipt_service import ReceiptService
+from sqlalchemy.orm import Session
+from utils.helpers.category_cache import category_cache
+from utils.helpers.keyword_classifier import (
+    RECEIPT_LOCAL_CLASSIFIER,
+    keyword_classifier_cache,
+)
+from utils.helpers.logger import Logger
+from utils.helpers.model_client import receipt_model_client
+from utils.helpers.prompt_cache import RECEIPT_PROMPT_CACHE, prompt_context_cache
+from utils.helpers.receipt_cache import receipt_result_cache
+from utils.helpers.receipt_image import receipt_image_preprocessor
+
+RECEIPT_JOB_WORKERS = int(os.getenv("RECEIPT_JOB_WORKERS", "2"))
+RECEIPT_JOB_POLL_SECONDS = float(os.getenv("RECEIPT_JOB_POLL_SECONDS", "2"))
+RECEIPT_JOB_LEASE_SECONDS = float(os.getenv("RECEIPT_JOB_LEASE_SECONDS", "300"))
+RECEIPT_JOB_MAX_ATTEMPTS = int(os.getenv("RECEIPT_JOB_MAX_ATTEMPTS", "3"))
+RECEIPT_JOB_RETENTION_HOURS = float(os.getenv("RECEIPT_JOB_RETENTION_HOURS", "24"))
+CLEANUP_INTERVAL_SECONDS = 600
+
+
+def build_receipt_job_service(db: Session) -> IReceiptJobService:
+    receipt_service = ReceiptService(
+        CategoryRepository(db), category_cache, receipt_result_cache, receipt_image_preprocessor, receipt_model_client,
+        keyword_classifier_cache if RECEIPT_LOCAL_CLASSIFIER else None,
+        prompt_context_cache if RECEIPT_PROMPT_CACHE else None,
+    )
+    return ReceiptJobService(
+        ReceiptJobRepository(db),
+        receipt_service,
+        lease_seconds=RECEIPT_JOB_LEASE_SECONDS,
+        max_attempts=RECEIPT_JOB_MAX_ATTEMPTS,
+        retention=timedelta(hours=RECEIPT_JOB_RETENTION_HOURS),
+    )
+
+
+class ReceiptJobWorkerPool:
+    """
+    Each thread claims one job at a time with its own session, so at most `workers` model calls
+    run at once per process. Idle threads poll every `poll_interval` seconds, notify() wakes them
+    early when this process queued a job.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        poll_interval: float,
+        session_factory: Callable[[], Session] = SessionLocal,
+        service_factory: Callable[[Session], IReceiptJobService] = build_receipt_job_service,
+    ):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.session_factory = session_factory
+        self.service_factory = service_factory
+        self.logger = Logger()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._next_cleanup = 0.0
+        self._cleanup_lock = threading.Lock()
+
+    def start(self) -> None:
+        if self._threads or self.workers <= 0:
+            return
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"receipt-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.logger.info(f"Started {self.workers} receipt job workers")
+
+    def stop(self, timeout: float = 30) -> None:
+        """
+        Lets every thread finish its current job. A job still running after the timeout is
+        picked up again by another worker once its lease expires.
+        """
+        self._stop.set()
+        self._wake.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                processed = self.process_one()
+            except Exception as error:
+                self.logger.error(f"Receipt job worker error: {error!r}")
+                processed = False
+
+            if not processed:
+                self._clean_up_if_due()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def process_one(self) -> bool:
+        """
+        Claims and runs a single job, returns False when the queue is empty.
+        Each step commits before the next one, so no transaction is open during the model call:
+        an idle transaction would hold a pooled connection and its snapshot for the whole call.
+        """
+        db = self.session_factory()
+        try:
+            service = self.service_factory(db)
+            job = service.claim_job()
+            db.commit()
+            if job is None:
+                return False
+
+            categories = service.load_categories(job)
+            db.commit()
+
+            service.run_job(job, categories)
+            db.commit()
+            return True
+        except:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _clean_up_if_due(self) -> None:
+        with self._cleanup_lock:
+            if time.monotonic() < self._next_cleanup:
+                return
+            self._next_cleanup = time.monotonic() + CLEANUP_INTERVAL_SECONDS
+
+        db = self.session_factory()
+        try:
+            failed, deleted = self.service_factory(db).clean_up()
+            db.commit()
+            if failed or deleted:
+                self.logger.info(f"Receipt jobs clean up: {failed} abandoned jobs failed, {deleted} finished jobs deleted")
+        except Exception as error:
+            db.rollback()
+            self.logger.error(f"Receipt job clean up failed: {error!r}")
+        finally:
+            db.close()
+
+
+receipt_job_workers = ReceiptJobWorkerPool(RECEIPT_JOB_WORKERS, RECEIPT_JOB_POLL_SECONDS)
+
+
+def main() -> None:
+    pool = ReceiptJobWorkerPool(max(RECEIPT_JOB_WORKERS, 1), RECEIPT_JOB_POLL_SECONDS)
+    stopped = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stopped.set())
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+
+    receipt_model_client.open()
+    pool.start()
+    stopped.wait()
+    pool.stop()
+    receipt_image_preprocessor.shutdown()
+    receipt_model_client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+-- Indexes matched to the repository queries. Listings order by (sort column, id),
+-- a btree is read backwards for DESC so one index serves both directions.
+-- Plain CREATE INDEX: migrate sends the file as one multi-statement batch, which CONCURRENTLY does not allow.
+
+-- ExpenseRepository.get_by_group, group statistics
+CREATE INDEX IF NOT EXISTS ix_expenses_group_created_id
+    ON expenses (group_id, created_at, id);
+
+-- ExpenseRepository.get_by_user (own expenses), UserRepository.get_user_monthly_spent (index only scan)
+CREATE INDEX IF NOT EXISTS ix_expenses_user_created_id
+    ON expenses (user_id, created_at, id) INCLUDE (amount);
+
+-- ExpenseRepository.get_all default sort
+CREATE INDEX IF NOT EXISTS ix_expenses_created_id
+    ON expenses (created_at, id);
+
+-- category filter, ON DELETE of a category
+CREATE INDEX IF NOT EXISTS ix_expenses_category
+    ON expenses (category_id);
+
+-- CategoryRepository.get_by_user (sorted by title) and the title check of get_by_title_or_keywords
+CREATE INDEX IF NOT EXISTS ix_categories_user_title
+    ON categories (user_id, title);
+
+-- CategoryRepository.get_by_title_or_keywords, keywords && ARRAY[...]
+CREATE INDEX IF NOT EXISTS ix_categories_keywords
+    ON categories USING GIN (keywords);
+
+-- GroupLogRepository.get_by_group
+CREATE INDEX IF NOT EXISTS ix_group_logs_group_created
+    ON group_logs (group_id, created_at);
+
+-- UserGroupRepository.get_users_by_group / get_nr_of_users_from_group, the primary key leads with user_id
+CREATE INDEX IF NOT EXISTS ix_users_groups_group_user
+    ON users_groups (group_id, user_id);
+
+-- ON DELETE of a user, the primary key leads with expense_id
+CREATE INDEX IF NOT EXISTS ix_expense_payments_user
+    ON expense_payments (user_id);
@@ -0,0 +1,9 @@
+DROP INDEX IF EXISTS ix_expense_payments_user;
+DROP INDEX IF EXISTS ix_users_groups_group_user;
+DROP INDEX IF EXISTS ix_group_logs_group_created;
+DROP INDEX IF EXISTS ix_categories_keywords;
+DROP INDEX IF EXISTS ix_categories_user_title;
+DROP INDEX IF EXISTS ix_expenses_category;
+DROP INDEX IF EXISTS ix_expenses_created_id;
+DROP INDEX IF EXISTS ix_expenses_user_created_id;
+DROP INDEX IF EXISTS ix_expenses_group_created_id;
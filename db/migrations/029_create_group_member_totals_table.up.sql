@@ -0,0 +1,28 @@
+-- Running totals per (group, member), kept up to date by the expense service.
+-- One row per member instead of one per group, so concurrent expenses from different
+-- members of the same group never wait on the same row lock.
+CREATE TABLE IF NOT EXISTS group_member_totals (
+    group_id INT NOT NULL,
+    user_id INT NOT NULL,
+    total_paid DOUBLE PRECISION NOT NULL DEFAULT 0,
+    expense_count INT NOT NULL DEFAULT 0,
+
+    CONSTRAINT pk_group_member_totals PRIMARY KEY (group_id, user_id),
+    CONSTRAINT fk_group_member_totals_group FOREIGN KEY (group_id)
+        REFERENCES groups(id) ON DELETE CASCADE,
+    CONSTRAINT fk_group_member_totals_user FOREIGN KEY (user_id)
+        REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS ix_group_member_totals_user
+    ON group_member_totals (user_id);
+
+-- backfill from the existing expenses
+INSERT INTO group_member_totals (group_id, user_id, total_paid, expense_count)
+SELECT group_id, user_id, SUM(amount), COUNT(*)
+FROM expenses
+WHERE group_id IS NOT NULL
+GROUP BY group_id, user_id
+ON CONFLICT (group_id, user_id) DO UPDATE
+SET total_paid = EXCLUDED.total_paid,
+    expense_count = EXCLUDED.expense_count;
@@ -0,0 +1 @@
+DROP TABLE IF EXISTS group_member_totals;
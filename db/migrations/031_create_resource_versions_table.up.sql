@@ -0,0 +1,103 @@
+-- Version counters behind the ETags of the list endpoints.
+-- Triggers bump a scope whenever a row it covers changes, whatever the write path
+-- (services, scripts, ON DELETE CASCADE), so a fingerprint never misses an edit.
+-- Versions come from one sequence, so a scope never reuses an old version.
+CREATE SEQUENCE IF NOT EXISTS resource_version_seq;
+
+CREATE TABLE IF NOT EXISTS resource_versions (
+    scope VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION bump_resource_version(changed_scope TEXT) RETURNS VOID AS $$
+BEGIN
+    IF changed_scope IS NULL THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO resource_versions (scope, version)
+    VALUES (changed_scope, nextval('resource_version_seq'))
+    ON CONFLICT (scope) DO UPDATE SET version = EXCLUDED.version;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_expense_versions() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM bump_resource_version('expenses:user:' || NEW.user_id);
+        PERFORM bump_resource_version('expenses:group:' || NEW.group_id);
+    END IF;
+    IF TG_OP = 'DELETE' OR OLD.user_id IS DISTINCT FROM NEW.user_id THEN
+        PERFORM bump_resource_version('expenses:user:' || OLD.user_id);
+    END IF;
+    IF TG_OP = 'DELETE' OR OLD.group_id IS DISTINCT FROM NEW.group_id THEN
+        PERFORM bump_resource_version('expenses:group:' || OLD.group_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_membership_versions() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM bump_resource_version('memberships:user:' || NEW.user_id);
+        PERFORM bump_resource_version('memberships:group:' || NEW.group_id);
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM bump_resource_version('memberships:user:' || OLD.user_id);
+        PERFORM bump_resource_version('memberships:group:' || OLD.group_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_category_versions() RETURNS TRIGGER AS $$
+BEGIN
+    -- expense listings filter on category titles of any member, they follow the global scope
+    PERFORM bump_resource_version('categories');
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM bump_resource_version('categories:user:' || NEW.user_id);
+    END IF;
+    IF TG_OP = 'DELETE' OR OLD.user_id IS DISTINCT FROM NEW.user_id THEN
+        PERFORM bump_resource_version('categories:user:' || OLD.user_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_row_version() RETURNS TRIGGER AS $$
+BEGIN
+    -- TG_ARGV[0] is the scope prefix of the table, e.g. 'group:'
+    IF TG_OP = 'DELETE' THEN
+        PERFORM bump_resource_version(TG_ARGV[0] || OLD.id);
+    ELSE
+        PERFORM bump_resource_version(TG_ARGV[0] || NEW.id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_expenses_resource_versions ON expenses;
+CREATE TRIGGER trg_expenses_resource_versions
+    AFTER INSERT OR UPDATE OR DELETE ON expenses
+    FOR EACH ROW EXECUTE FUNCTION bump_expense_versions();
+
+DROP TRIGGER IF EXISTS trg_users_groups_resource_versions ON users_groups;
+CREATE TRIGGER trg_users_groups_resource_versions
+    AFTER INSERT OR UPDATE OR DELETE ON users_groups
+    FOR EACH ROW EXECUTE FUNCTION bump_membership_versions();
+
+DROP TRIGGER IF EXISTS trg_categories_resource_versions ON categories;
+CREATE TRIGGER trg_categories_resource_versions
+    AFTER INSERT OR UPDATE OR DELETE ON categories
+    FOR EACH ROW EXECUTE FUNCTION bump_category_versions();
+
+DROP TRIGGER IF EXISTS trg_groups_resource_versions ON groups;
+CREATE TRIGGER trg_groups_resource_versions
+    AFTER INSERT OR UPDATE OR DELETE ON groups
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version('group:');
+
+DROP TRIGGER IF EXISTS trg_users_resource_versions ON users;
+CREATE TRIGGER trg_users_resource_versions
+    AFTER INSERT OR UPDATE OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION bump_row_version('user:');
@@ -0,0 +1,14 @@
+DROP TRIGGER IF EXISTS trg_users_resource_versions ON users;
+DROP TRIGGER IF EXISTS trg_groups_resource_versions ON groups;
+DROP TRIGGER IF EXISTS trg_categories_resource_versions ON categories;
+DROP TRIGGER IF EXISTS trg_users_groups_resource_versions ON users_groups;
+DROP TRIGGER IF EXISTS trg_expenses_resource_versions ON expenses;
+
+DROP FUNCTION IF EXISTS bump_row_version();
+DROP FUNCTION IF EXISTS bump_category_versions();
+DROP FUNCTION IF EXISTS bump_membership_versions();
+DROP FUNCTION IF EXISTS bump_expense_versions();
+DROP FUNCTION IF EXISTS bump_resource_version(TEXT);
+
+DROP TABLE IF EXISTS resource_versions;
+DROP SEQUENCE IF EXISTS resource_version_seq;
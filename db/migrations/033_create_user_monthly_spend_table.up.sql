@@ -0,0 +1,22 @@
+-- Running spend per user and calendar month, kept up to date by the expense service.
+-- Months follow Europe/Bucharest, the timezone the budget endpoints use.
+CREATE TABLE IF NOT EXISTS user_monthly_spend (
+    user_id INT NOT NULL,
+    month DATE NOT NULL,
+    total_spent DOUBLE PRECISION NOT NULL DEFAULT 0,
+    expense_count INT NOT NULL DEFAULT 0,
+
+    CONSTRAINT pk_user_monthly_spend PRIMARY KEY (user_id, month),
+    CONSTRAINT fk_user_monthly_spend_user FOREIGN KEY (user_id)
+        REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- backfill from the existing expenses; created_at is a plain TIMESTAMP in the server's time zone
+INSERT INTO user_monthly_spend (user_id, month, total_spent, expense_count)
+SELECT user_id, date_trunc('month', created_at::timestamptz AT TIME ZONE 'Europe/Bucharest')::date, SUM(amount), COUNT(*)
+FROM expenses
+WHERE user_id IS NOT NULL
+GROUP BY 1, 2
+ON CONFLICT (user_id, month) DO UPDATE
+SET total_spent = EXCLUDED.total_spent,
+    expense_count = EXCLUDED.expense_count;
@@ -0,0 +1,36 @@
+-- Receipt analyses queued by POST /receipt/jobs and processed by the API's worker pool.
+-- A running job holds a lease (locked_until); when its worker dies the lease expires and
+-- another worker claims it again, up to the attempt limit.
+CREATE TABLE IF NOT EXISTS receipt_jobs (
+    id SERIAL PRIMARY KEY,
+    user_id INT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    image BYTEA,
+    mime_type VARCHAR(64) NOT NULL,
+    result JSONB,
+    error TEXT,
+    attempts INT NOT NULL DEFAULT 0,
+    locked_until TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+
+    CONSTRAINT fk_receipt_jobs_user FOREIGN KEY (user_id)
+        REFERENCES users(id) ON DELETE CASCADE,
+    CONSTRAINT ck_receipt_jobs_status CHECK (status IN ('queued', 'running', 'succeeded', 'failed'))
+);
+
+-- the claim query: oldest queued job first
+CREATE INDEX IF NOT EXISTS ix_receipt_jobs_queued
+    ON receipt_jobs (created_at, id) WHERE status = 'queued';
+
+-- running jobs whose lease expired
+CREATE INDEX IF NOT EXISTS ix_receipt_jobs_running_lease
+    ON receipt_jobs (locked_until) WHERE status = 'running';
+
+-- retention cleanup of finished jobs
+CREATE INDEX IF NOT EXISTS ix_receipt_jobs_finished
+    ON receipt_jobs (finished_at) WHERE status IN ('succeeded', 'failed');
+
+CREATE INDEX IF NOT EXISTS ix_receipt_jobs_user
+    ON receipt_jobs (user_id);
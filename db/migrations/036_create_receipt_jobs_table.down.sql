@@ -0,0 +1 @@
+DROP TABLE IF EXISTS receipt_jobs;
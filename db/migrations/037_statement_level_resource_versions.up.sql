@@ -0,0 +1,164 @@
+-- Resource version triggers fire once per statement instead of once per row.
+-- A bulk insert of 200 expenses bumped the same scopes 200 times, each bump an upsert that
+-- locks the scope row until commit. Each statement now bumps every scope it touched once,
+-- in scope order, so concurrent writers take those locks in the same order.
+-- Category versions are per user only: a rename bumps the expense scopes of the expenses
+-- filed under the category, instead of a global 'categories' scope every listing depended on.
+
+DROP TRIGGER IF EXISTS trg_expenses_resource_versions ON expenses;
+DROP TRIGGER IF EXISTS trg_users_groups_resource_versions ON users_groups;
+DROP TRIGGER IF EXISTS trg_categories_resource_versions ON categories;
+DROP TRIGGER IF EXISTS trg_groups_resource_versions ON groups;
+DROP TRIGGER IF EXISTS trg_users_resource_versions ON users;
+
+DROP FUNCTION IF EXISTS bump_row_version();
+DROP FUNCTION IF EXISTS bump_category_versions();
+DROP FUNCTION IF EXISTS bump_membership_versions();
+DROP FUNCTION IF EXISTS bump_expense_versions();
+DROP FUNCTION IF EXISTS bump_resource_version(TEXT);
+
+DELETE FROM resource_versions WHERE scope = 'categories';
+
+CREATE OR REPLACE FUNCTION bump_resource_versions(changed_scopes TEXT[]) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO resource_versions (scope, version)
+    SELECT scope, nextval('resource_version_seq')
+    FROM (SELECT DISTINCT unnest(changed_scopes) AS scope) changed
+    WHERE scope IS NOT NULL
+    ORDER BY scope
+    ON CONFLICT (scope) DO UPDATE SET version = EXCLUDED.version;
+END;
+$$ LANGUAGE plpgsql;
+
+-- The triggers below are declared per event, each with the transition tables its event has:
+-- new_rows for INSERT and UPDATE, old_rows for UPDATE and DELETE.
+
+CREATE OR REPLACE FUNCTION bump_expense_versions() RETURNS TRIGGER AS $$
+DECLARE
+    scopes TEXT[] := '{}';
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        scopes := scopes || ARRAY(
+            SELECT unnest(ARRAY['expenses:user:' || user_id, 'expenses:group:' || group_id]) FROM new_rows
+        );
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        scopes := scopes || ARRAY(
+            SELECT unnest(ARRAY['expenses:user:' || user_id, 'expenses:group:' || group_id]) FROM old_rows
+        );
+    END IF;
+    PERFORM bump_resource_versions(scopes);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_membership_versions() RETURNS TRIGGER AS $$
+DECLARE
+    scopes TEXT[] := '{}';
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        scopes := scopes || ARRAY(
+            SELECT unnest(ARRAY['memberships:user:' || user_id, 'memberships:group:' || group_id]) FROM new_rows
+        );
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        scopes := scopes || ARRAY(
+            SELECT unnest(ARRAY['memberships:user:' || user_id, 'memberships:group:' || group_id]) FROM old_rows
+        );
+    END IF;
+    PERFORM bump_resource_versions(scopes);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_category_versions() RETURNS TRIGGER AS $$
+DECLARE
+    scopes TEXT[] := '{}';
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        scopes := scopes || ARRAY(SELECT 'categories:user:' || user_id FROM new_rows);
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        scopes := scopes || ARRAY(SELECT 'categories:user:' || user_id FROM old_rows);
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        -- expense listings filter on category titles; deleting a category deletes its expenses,
+        -- which bumps their scopes through the expenses trigger
+        scopes := scopes || ARRAY(
+            SELECT unnest(ARRAY['expenses:user:' || expenses.user_id, 'expenses:group:' || expenses.group_id])
+            FROM new_rows
+            JOIN old_rows ON old_rows.id = new_rows.id
+            JOIN expenses ON expenses.category_id = new_rows.id
+            WHERE new_rows.title IS DISTINCT FROM old_rows.title
+        );
+    END IF;
+    PERFORM bump_resource_versions(scopes);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_row_versions() RETURNS TRIGGER AS $$
+DECLARE
+    scopes TEXT[] := '{}';
+BEGIN
+    -- TG_ARGV[0] is the scope prefix of the table, e.g. 'group:'
+    IF TG_OP <> 'DELETE' THEN
+        scopes := scopes || ARRAY(SELECT TG_ARGV[0] || id FROM new_rows);
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        scopes := scopes || ARRAY(SELECT TG_ARGV[0] || id FROM old_rows);
+    END IF;
+    PERFORM bump_resource_versions(scopes);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_expenses_resource_versions_insert
+    AFTER INSERT ON expenses REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_expense_versions();
+CREATE TRIGGER trg_expenses_resource_versions_update
+    AFTER UPDATE ON expenses REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_expense_versions();
+CREATE TRIGGER trg_expenses_resource_versions_delete
+    AFTER DELETE ON expenses REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_expense_versions();
+
+CREATE TRIGGER trg_users_groups_resource_versions_insert
+    AFTER INSERT ON users_groups REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_membership_versions();
+CREATE TRIGGER trg_users_groups_resource_versions_update
+    AFTER UPDATE ON users_groups REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_membership_versions();
+CREATE TRIGGER trg_users_groups_resource_versions_delete
+    AFTER DELETE ON users_groups REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_membership_versions();
+
+CREATE TRIGGER trg_categories_resource_versions_insert
+    AFTER INSERT ON categories REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_category_versions();
+CREATE TRIGGER trg_categories_resource_versions_update
+    AFTER UPDATE ON categories REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_category_versions();
+CREATE TRIGGER trg_categories_resource_versions_delete
+    AFTER DELETE ON categories REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_category_versions();
+
+CREATE TRIGGER trg_groups_resource_versions_insert
+    AFTER INSERT ON groups REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_row_versions('group:');
+CREATE TRIGGER trg_groups_resource_versions_update
+    AFTER UPDATE ON groups REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_row_versions('group:');
+CREATE TRIGGER trg_groups_resource_versions_delete
+    AFTER DELETE ON groups REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_row_versions('group:');
+
+CREATE TRIGGER trg_users_resource_versions_insert
+    AFTER INSERT ON users REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_row_versions('user:');
+CREATE TRIGGER trg_users_resource_versions_update
+    AFTER UPDATE ON users REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_row_versions('user:');
+CREATE TRIGGER trg_users_resource_versions_delete
+    AFTER DELETE ON users REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_row_versions('user:');
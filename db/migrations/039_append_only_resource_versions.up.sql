@@ -0,0 +1,50 @@
+-- Resource version bumps append a row instead of upserting the scope's counter.
+-- The upsert of 037 locked the 'expenses:group:<id>' row until the writer committed, so every
+-- write to one group waited for the previous one, even when the rows it touched did not conflict.
+-- Inserts never wait on each other: the version of a scope is its folded counter in
+-- resource_versions plus the number of changes appended since, read in one snapshot.
+-- Each committed change adds at least one, so a version never repeats and never goes back.
+CREATE TABLE IF NOT EXISTS resource_version_changes (
+    id BIGSERIAL PRIMARY KEY,
+    scope VARCHAR(64) NOT NULL,
+    changes BIGINT NOT NULL DEFAULT 1
+);
+
+CREATE INDEX IF NOT EXISTS ix_resource_version_changes_scope
+    ON resource_version_changes (scope) INCLUDE (changes);
+
+-- same signature as 037, so the statement level triggers keep calling it unchanged
+CREATE OR REPLACE FUNCTION bump_resource_versions(changed_scopes TEXT[]) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO resource_version_changes (scope)
+    SELECT DISTINCT scope
+    FROM unnest(changed_scopes) AS scope
+    WHERE scope IS NOT NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Moves committed changes into resource_versions, keeping every scope's version as it was.
+-- Only this fold locks the counters; run it from cron (python -m scripts.fold_resource_versions).
+-- Concurrent folds are safe: a change deleted by one is skipped by the other.
+CREATE OR REPLACE FUNCTION fold_resource_version_changes(batch_size INTEGER) RETURNS INTEGER AS $$
+DECLARE
+    folded_rows INTEGER;
+BEGIN
+    WITH folded AS (
+        DELETE FROM resource_version_changes
+        WHERE id IN (SELECT id FROM resource_version_changes ORDER BY id LIMIT batch_size)
+        RETURNING scope, changes
+    ), totals AS (
+        SELECT scope, sum(changes) AS changes, count(*) AS rows
+        FROM folded
+        GROUP BY scope
+    ), upserted AS (
+        INSERT INTO resource_versions (scope, version)
+        SELECT scope, changes FROM totals ORDER BY scope
+        ON CONFLICT (scope) DO UPDATE SET version = resource_versions.version + EXCLUDED.version
+    )
+    SELECT coalesce(sum(rows), 0) INTO folded_rows FROM totals;
+
+    RETURN folded_rows;
+END;
+$$ LANGUAGE plpgsql;
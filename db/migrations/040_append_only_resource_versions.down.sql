@@ -0,0 +1,22 @@
+-- Back to the upserting bump of 037. Pending changes are folded first and the sequence is moved
+-- past every folded counter, so no scope gets a version it already had.
+
+SELECT fold_resource_version_changes(2147483647);
+SELECT setval('resource_version_seq', greatest(
+    (SELECT last_value FROM resource_version_seq),
+    (SELECT coalesce(max(version), 1) FROM resource_versions)
+));
+
+CREATE OR REPLACE FUNCTION bump_resource_versions(changed_scopes TEXT[]) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO resource_versions (scope, version)
+    SELECT scope, nextval('resource_version_seq')
+    FROM (SELECT DISTINCT unnest(changed_scopes) AS scope) changed
+    WHERE scope IS NOT NULL
+    ORDER BY scope
+    ON CONFLICT (scope) DO UPDATE SET version = EXCLUDED.version;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP FUNCTION IF EXISTS fold_resource_version_changes(INTEGER);
+DROP TABLE IF EXISTS resource_version_changes;